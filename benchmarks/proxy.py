@@ -0,0 +1,207 @@
+"""Benchmark of the proxy hot path against a local stub upstream.
+
+Usage:
+    python benchmarks/proxy.py
+    python benchmarks/proxy.py --requests 2000 --concurrency 1 8 32 --save baseline.json
+    python benchmarks/proxy.py --compare baseline.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+settings.configure(
+    ALLOWED_HOSTS=["*"],
+    INSTALLED_APPS=["django.contrib.auth", "django.contrib.contenttypes", "rest_framework"],
+    DATABASES={},
+    REST_FRAMEWORK={"DEFAULT_AUTHENTICATION_CLASSES": (), "DEFAULT_PERMISSION_CLASSES": ()},
+)
+django.setup()
+
+from django.contrib.auth.models import AnonymousUser  # noqa: E402
+from django.core.files.uploadedfile import SimpleUploadedFile  # noqa: E402
+from django.test.client import RequestFactory  # noqa: E402
+
+from microservice_request.services import ConnectionService, MicroServiceConnect  # noqa: E402
+
+SMALL_BODY = json.dumps({"id": 1, "title": "Awesome product", "price": "9.99"}).encode()
+LARGE_BODY = json.dumps(
+    [{"id": i, "title": f"Product {i}", "tags": ["a", "b", "c"]} for i in range(20000)]
+).encode()
+UPLOAD = b"x" * 1024 * 1024
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body are separate writes, with Nagle and delayed ACK every call waits ~40 ms
+    disable_nagle_algorithm = True
+    routes = {"/small/": SMALL_BODY, "/large/": LARGE_BODY}
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def _reply(self, status: int, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding") == "chunked":
+            chunks = []
+            while size := int(self.rfile.readline().strip(), 16):
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            self.rfile.readline()
+            return b"".join(chunks)
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_GET(self) -> None:
+        if self.path.startswith("/error/"):
+            return self._reply(500, b'{"detail": "error"}')
+        self._reply(200, self.routes.get(self.path.split("?")[0], SMALL_BODY))
+
+    def do_POST(self) -> None:
+        body = self._read_body()
+        self._reply(201, json.dumps({"received": len(body)}).encode())
+
+
+class StubService(ConnectionService):
+    pool_maxsize = 64
+
+
+class StubStreamUploadService(StubService):
+    stream_upload = True
+
+
+class StubProxyService(MicroServiceConnect):
+    pool_maxsize = 64
+
+
+def start_stub_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def build_scenarios(upstream: str) -> Dict[str, Callable[[], object]]:
+    StubService.service = StubProxyService.service = upstream
+    factory = RequestFactory()
+
+    def proxy_get():
+        request = factory.get("/api/v1/products/")
+        request.user = AnonymousUser()
+        return StubProxyService(request, "/small/").service_response()
+
+    def send_file(service_class=StubService):
+        upload = SimpleUploadedFile("file.bin", UPLOAD)
+        return service_class("/upload/").service_response(
+            "send_file", files={"file": upload}, data={"a": "b"}
+        )
+
+    return {
+        "get_small": lambda: StubService("/small/").service_response("get"),
+        "get_large": lambda: StubService("/large/").service_response("get"),
+        "post_small": lambda: StubService("/items/").service_response("post", json={"title": "New"}),
+        "send_file": send_file,
+        "send_file_stream": lambda: send_file(StubStreamUploadService),
+        "error": lambda: StubService("/error/").service_response("get"),
+        "proxy_get": proxy_get,
+    }
+
+
+def percentile(values: List[float], percent: float) -> float:
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(percent / 100 * len(values)) - 1))
+    return values[index]
+
+
+def run(call: Callable[[], object], requests: int, concurrency: int) -> Dict[str, float]:
+    def timed(_) -> float:
+        started = time.perf_counter()
+        call()
+        return time.perf_counter() - started
+
+    call()  # warm up connection pool
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(timed, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    for _ in range(min(requests, 20)):
+        call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "peak_memory_kb": peak / 1024,
+    }
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict]) -> None:
+    print(f"\n{'benchmark':<24}{'rps':>12}{'p50':>12}{'p99':>12}{'memory':>12}")
+    for name, current in results.items():
+        if (previous := baseline.get(name)) is None:
+            continue
+        diffs = [
+            (current[key] - previous[key]) / previous[key] * 100 if previous[key] else 0.0
+            for key in ("rps", "p50_ms", "p99_ms", "peak_memory_kb")
+        ]
+        print(f"{name:<24}" + "".join(f"{diff:>+11.1f}%" for diff in diffs))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--requests", type=int, default=500, help="requests per benchmark")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--only", nargs="+", help="run selected scenarios only")
+    parser.add_argument("--save", help="save results to json file")
+    parser.add_argument("--compare", help="compare results with saved json file")
+    args = parser.parse_args()
+
+    server = start_stub_server()
+    scenarios = build_scenarios(f"http://127.0.0.1:{server.server_address[1]}")
+    results: Dict[str, dict] = {}
+    print(f"{'benchmark':<24}{'rps':>12}{'p50, ms':>12}{'p99, ms':>12}{'memory, KB':>12}")
+    for name, call in scenarios.items():
+        if args.only and name not in args.only:
+            continue
+        for concurrency in args.concurrency:
+            key = f"{name}[c={concurrency}]"
+            result = results[key] = run(call, args.requests, concurrency)
+            print(
+                f"{key:<24}{result['rps']:>12.1f}{result['p50_ms']:>12.2f}"
+                f"{result['p99_ms']:>12.2f}{result['peak_memory_kb']:>12.1f}"
+            )
+    server.shutdown()
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file))
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
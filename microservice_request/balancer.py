@@ -0,0 +1,161 @@
+import itertools
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+from .exceptions import EndpointUnavailable
+
+logger = logging.getLogger(__name__)
+
+Resolver = Callable[[], Sequence[str]]
+
+
+class Endpoint:
+    """Upstream instance with its load and health state"""
+
+    __slots__ = ("url", "outstanding", "latency", "failures", "ejected_until")
+
+    def __init__(self, url: str):
+        self.url: str = url
+        self.outstanding: int = 0
+        self.latency: Optional[float] = None
+        self.failures: int = 0
+        self.ejected_until: float = 0.0
+
+    def is_ejected(self, now: float) -> bool:
+        return self.ejected_until > now
+
+    def __repr__(self) -> str:
+        return f"Endpoint({self.url!r}, outstanding={self.outstanding})"
+
+
+class LoadBalancer:
+    """Client-side load balancing between instances of one upstream.
+
+    `endpoints` is a list of base urls or a resolver callable returning it, resolver results are cached
+    for `resolve_interval` seconds. When the resolver fails the last resolved endpoints are kept, without
+    them `EndpointUnavailable` is raised. An endpoint is ejected for `ejection_time` seconds after
+    `max_failures` consecutive failures (errors and `failure_status_codes`) or when its average latency
+    exceeds `slow_call_threshold`. Not more than `max_ejected_ratio` of endpoints are ejected at once.
+
+    Usage:
+        class UserService(ConnectionService):
+            service = ["http://users-1:8000", "http://users-2:8000"]
+            balancing_strategy = LoadBalancer.POWER_OF_TWO_CHOICES
+    """
+
+    ROUND_ROBIN = "round_robin"
+    LEAST_OUTSTANDING = "least_outstanding"
+    POWER_OF_TWO_CHOICES = "p2c"
+
+    def __init__(
+        self,
+        endpoints: Union[Sequence[str], Resolver],
+        strategy: str = ROUND_ROBIN,
+        max_failures: int = 5,
+        ejection_time: float = 30,
+        slow_call_threshold: Optional[float] = None,
+        max_ejected_ratio: float = 0.5,
+        resolve_interval: float = 30,
+        latency_decay: float = 0.3,
+        failure_status_codes: Sequence[int] = (500, 502, 503, 504),
+    ):
+        if strategy not in (self.ROUND_ROBIN, self.LEAST_OUTSTANDING, self.POWER_OF_TWO_CHOICES):
+            raise ValueError(f"Unknown balancing strategy: {strategy}")
+        self.resolver: Optional[Resolver] = endpoints if callable(endpoints) else None
+        self.strategy = strategy
+        self.max_failures = max_failures
+        self.ejection_time = ejection_time
+        self.slow_call_threshold = slow_call_threshold
+        self.max_ejected_ratio = max_ejected_ratio
+        self.resolve_interval = resolve_interval
+        self.latency_decay = latency_decay
+        self.failure_status_codes = frozenset(failure_status_codes)
+        self._endpoints: Dict[str, Endpoint] = {}
+        self._resolved_at: float = 0.0
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        if self.resolver is None:
+            self._update(endpoints)
+
+    def _update(self, urls: Sequence[str]) -> None:
+        """Keep state of known endpoints, drop removed ones"""
+        if not urls:
+            raise ValueError("Load balancer requires at least one endpoint")
+        self._endpoints = {url: self._endpoints.get(url) or Endpoint(url) for url in urls}
+
+    def _resolve(self) -> None:
+        try:
+            self._update(self.resolver())
+        except Exception as e:
+            if not self._endpoints:
+                raise EndpointUnavailable(f"Endpoints resolution failed: {e}") from e
+            logger.warning(f"Endpoints resolution failed, last resolved endpoints are used: {e}")
+        self._resolved_at = time.monotonic()
+
+    @property
+    def endpoints(self) -> List[Endpoint]:
+        if self.resolver is not None and time.monotonic() - self._resolved_at > self.resolve_interval:
+            with self._lock:
+                if time.monotonic() - self._resolved_at > self.resolve_interval:
+                    self._resolve()
+        return list(self._endpoints.values())
+
+    def choose(self) -> Endpoint:
+        endpoints = self.endpoints
+        now = time.monotonic()
+        # when every endpoint is ejected, fall back to all of them
+        candidates = [endpoint for endpoint in endpoints if not endpoint.is_ejected(now)] or endpoints
+        if len(candidates) == 1:
+            return candidates[0]
+        if self.strategy == self.LEAST_OUTSTANDING:
+            return min(random.sample(candidates, len(candidates)), key=lambda endpoint: endpoint.outstanding)
+        if self.strategy == self.POWER_OF_TWO_CHOICES:
+            return min(random.sample(candidates, 2), key=self._load)
+        return candidates[next(self._counter) % len(candidates)]
+
+    @staticmethod
+    def _load(endpoint: Endpoint) -> tuple:
+        return endpoint.outstanding, endpoint.latency or 0.0
+
+    def acquire(self, endpoint: Endpoint) -> None:
+        with self._lock:
+            endpoint.outstanding += 1
+
+    def is_failure(self, response: Any, error: Optional[Exception]) -> bool:
+        return error is not None or getattr(response, "status_code", None) in self.failure_status_codes
+
+    def release(
+        self, endpoint: Endpoint, response: Any, error: Optional[Exception], duration: Optional[float]
+    ) -> None:
+        """`duration` is `None` when the upstream wasn't called, e.g. a cached response"""
+        failed = self.is_failure(response, error)
+        with self._lock:
+            endpoint.outstanding -= 1
+            if duration is None:
+                pass
+            elif endpoint.latency is None:
+                endpoint.latency = duration
+            else:
+                endpoint.latency += self.latency_decay * (duration - endpoint.latency)
+            endpoint.failures = endpoint.failures + 1 if failed else 0
+            is_slow = (
+                self.slow_call_threshold is not None
+                and endpoint.latency is not None
+                and endpoint.latency > self.slow_call_threshold
+            )
+            if endpoint.failures >= self.max_failures or is_slow:
+                self._eject(endpoint)
+
+    def _eject(self, endpoint: Endpoint) -> None:
+        now = time.monotonic()
+        endpoints = list(self._endpoints.values())
+        ejected = sum(1 for item in endpoints if item.is_ejected(now))
+        if endpoint.is_ejected(now) or ejected + 1 > self.max_ejected_ratio * len(endpoints):
+            return
+        endpoint.ejected_until = now + self.ejection_time
+        # start over after ejection
+        endpoint.failures = 0
+        endpoint.latency = None
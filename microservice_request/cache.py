@@ -0,0 +1,298 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, NamedTuple, Optional, Tuple, Union
+
+from django.core.cache import caches
+from requests import Request, Response
+from requests.structures import CaseInsensitiveDict
+
+from .gather import get_executor
+
+if TYPE_CHECKING:
+    from requests import Response as RequestResponse
+
+logger = logging.getLogger(__name__)
+
+CACHEABLE_STATUS_CODES = frozenset((200, 203, 300, 301, 308, 404, 410))
+
+# cached for `negative_timeout` seconds unless the upstream sets max-age
+NEGATIVE_STATUS_CODES = frozenset((404, 410))
+
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    directives = {}
+    for directive in (value or "").split(","):
+        name, _, argument = directive.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"') or None
+    return directives
+
+
+def _seconds(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def request_fingerprint(
+    method: str, url: str, headers: Iterable[Tuple[str, str]], params=None, cookies: Optional[dict] = None
+) -> str:
+    """Digest of the request parts which may change upstream response"""
+    if params:
+        url = Request(method, url, params=params).prepare().url
+    parts = [method.upper(), url]
+    parts.extend(f"{name.lower()}:{value}" for name, value in headers)
+    if cookies:
+        parts.append(";".join(f"{name}={value}" for name, value in sorted(cookies.items())))
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+class CacheEntry(NamedTuple):
+    url: str
+    status_code: int
+    headers: Tuple[Tuple[str, str], ...]
+    content: bytes
+    etag: Optional[str]
+    fresh_until: float
+    stale_until: float
+
+    @classmethod
+    def from_response(
+        cls, response: "RequestResponse", default_timeout: int, negative_timeout: int = 0
+    ) -> Optional["CacheEntry"]:
+        """Build cache entry, `None` means the response must not be cached.
+
+        The cache is shared between users, so `private` responses are not stored.
+        """
+        if response.status_code not in CACHEABLE_STATUS_CODES or response.headers.get("Vary") == "*":
+            return None
+        directives = parse_cache_control(response.headers.get("Cache-Control"))
+        if "no-store" in directives or "private" in directives:
+            return None
+        max_age = _seconds(directives.get("s-maxage"))
+        if max_age is None:
+            max_age = _seconds(directives.get("max-age"))
+        if "no-cache" in directives:
+            max_age = 0
+        elif max_age is None and response.status_code in NEGATIVE_STATUS_CODES:
+            if not negative_timeout:
+                return None
+            max_age = negative_timeout
+        elif max_age is None:
+            max_age = default_timeout
+        now = time.time()
+        fresh_until = now + max_age
+        return cls(
+            url=response.url,
+            status_code=response.status_code,
+            headers=tuple(response.headers.items()),
+            content=response.content,
+            etag=response.headers.get("ETag"),
+            fresh_until=fresh_until,
+            stale_until=fresh_until + (_seconds(directives.get("stale-while-revalidate")) or 0),
+        )
+
+    @property
+    def vary(self) -> Tuple[str, ...]:
+        """Request headers named in `Vary`"""
+        value = CaseInsensitiveDict(self.headers).get("Vary") or ""
+        return tuple(sorted({name.strip().lower() for name in value.split(",") if name.strip()}))
+
+    def revalidated(
+        self, response: "RequestResponse", default_timeout: int, negative_timeout: int = 0
+    ) -> "CacheEntry":
+        """Entry refreshed by `304 Not Modified` response"""
+        headers = CaseInsensitiveDict(self.headers)
+        headers.update(response.headers)
+        refreshed = Response()
+        refreshed.status_code = self.status_code
+        refreshed.headers = headers
+        refreshed.url = self.url
+        refreshed._content = self.content
+        return self.from_response(refreshed, default_timeout, negative_timeout) or self
+
+    def is_fresh(self, now: float) -> bool:
+        return now < self.fresh_until
+
+    def is_stale_usable(self, now: float) -> bool:
+        return now < self.stale_until
+
+    def to_response(self) -> Response:
+        response = Response()
+        response.status_code = self.status_code
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.url = self.url
+        response._content = self.content
+        return response
+
+
+class VaryIndex(NamedTuple):
+    """Stored under the key of a response with `Vary`, the response itself is stored per variant"""
+
+    headers: Tuple[str, ...]
+
+
+class BaseCacheBackend:
+    def get(self, key: str) -> Optional[Union[CacheEntry, VaryIndex]]:
+        raise NotImplementedError
+
+    def set(self, key: str, entry: Union[CacheEntry, VaryIndex], timeout: float) -> None:
+        raise NotImplementedError
+
+
+class LRUCacheBackend(BaseCacheBackend):
+    """In-process cache with size limit and per-entry expiration"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, CacheEntry]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            if (item := self._entries.get(key)) is None:
+                return None
+            expires, entry = item
+            if expires <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CacheEntry, timeout: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + timeout, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DjangoCacheBackend(BaseCacheBackend):
+    """Stores responses in the Django cache framework, so entries are shared between processes"""
+
+    def __init__(self, alias: str = "default"):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        return self.cache.get(key)
+
+    def set(self, key: str, entry: CacheEntry, timeout: float) -> None:
+        self.cache.set(key, entry, timeout)
+
+
+class ResponseCache:
+    """GET responses cache which honours `Cache-Control`, revalidates with `If-None-Match`
+    and serves stale entries while they are refreshed in background (`stale-while-revalidate`).
+
+    Request headers named in upstream `Vary` are added to the key of the response. 404 and 410 responses
+    without `max-age` are cached for `negative_timeout` seconds, `0` doesn't cache them.
+
+    Usage:
+        class CatalogService(ConnectionService):
+            response_cache = ResponseCache(LRUCacheBackend(max_entries=512), timeout=300)
+    """
+
+    key_prefix: str = "microservice_request"
+
+    def __init__(
+        self,
+        backend: BaseCacheBackend,
+        timeout: int = 60,
+        vary_headers: Iterable[str] = ("Accept", "Accept-Language", "Remote-User"),
+        negative_timeout: int = 0,
+    ):
+        self.backend = backend
+        self.timeout = timeout
+        self.vary_headers = tuple(vary_headers)
+        self.negative_timeout = negative_timeout
+        self._revalidating = set()
+        self._lock = threading.Lock()
+
+    def get_key(self, url: str, headers: dict, params=None, cookies: Optional[dict] = None) -> str:
+        headers = CaseInsensitiveDict(headers)
+        vary = ((name, headers.get(name, "")) for name in self.vary_headers)
+        return f"{self.key_prefix}:{request_fingerprint('GET', url, vary, params, cookies)}"
+
+    @staticmethod
+    def _variant_key(key: str, vary: Tuple[str, ...], headers: Optional[dict]) -> str:
+        """Key of the response which varies by `vary` request headers"""
+        if not vary:
+            return key
+        headers = CaseInsensitiveDict(headers or {})
+        return f"{key}:{request_fingerprint('GET', '', ((name, headers.get(name, '')) for name in vary))}"
+
+    def fetch(
+        self, key: str, send: Callable[[dict], "RequestResponse"], headers: Optional[dict] = None
+    ) -> "RequestResponse":
+        """Return cached response or call `send` with conditional headers. `headers` of the request select
+        the variant of a response with `Vary`
+        """
+        entry = self.backend.get(key)
+        if isinstance(entry, VaryIndex):
+            entry = self.backend.get(self._variant_key(key, entry.headers, headers))
+        now = time.time()
+        if entry is not None and entry.is_fresh(now):
+            return entry.to_response()
+        if entry is not None and entry.is_stale_usable(now):
+            self._revalidate_in_background(key, entry, send, headers)
+            return entry.to_response()
+        return self.revalidate(key, entry, send, headers)
+
+    def revalidate(
+        self,
+        key: str,
+        entry: Optional[CacheEntry],
+        send: Callable[[dict], "RequestResponse"],
+        headers: Optional[dict] = None,
+    ) -> "RequestResponse":
+        conditional_headers = {"If-None-Match": entry.etag} if entry is not None and entry.etag else {}
+        response = send(conditional_headers)
+        if entry is not None and response.status_code == 304:
+            entry = entry.revalidated(response, self.timeout, self.negative_timeout)
+            self.store(key, entry, headers)
+            return entry.to_response()
+        if (new_entry := CacheEntry.from_response(response, self.timeout, self.negative_timeout)) is not None:
+            self.store(key, new_entry, headers)
+        return response
+
+    def store(self, key: str, entry: CacheEntry, headers: Optional[dict] = None) -> None:
+        timeout = entry.stale_until - time.time()
+        if entry.etag:
+            timeout += self.timeout
+        if timeout <= 0:
+            return
+        configured = {name.lower() for name in self.vary_headers}
+        if vary := tuple(name for name in entry.vary if name not in configured):
+            self.backend.set(key, VaryIndex(vary), timeout)
+        self.backend.set(self._variant_key(key, vary, headers), entry, timeout)
+
+    def _revalidate_in_background(
+        self, key: str, entry: CacheEntry, send: Callable, headers: Optional[dict] = None
+    ) -> None:
+        with self._lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+        get_executor().submit(self._background_revalidation, key, entry, send, headers)
+
+    def _background_revalidation(
+        self, key: str, entry: CacheEntry, send: Callable, headers: Optional[dict] = None
+    ) -> None:
+        try:
+            self.revalidate(key, entry, send, headers)
+        except Exception as e:
+            logger.error(f"Cache revalidation failed: {e}")
+        finally:
+            with self._lock:
+                self._revalidating.discard(key)
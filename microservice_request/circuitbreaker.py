@@ -0,0 +1,226 @@
+import copy
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from django.core.cache import caches
+from requests.exceptions import RequestException
+
+from .exceptions import CircuitOpenError
+
+try:
+    from httpx import HTTPError
+except ImportError:  # pragma: no cover
+    HTTPError = RequestException
+
+
+class BaseCircuitStorage:
+    def get(self, key: str) -> Any:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, timeout: float) -> None:
+        raise NotImplementedError
+
+    def incr(self, key: str, timeout: float) -> int:
+        """Increment counter, create it with `timeout` if it doesn't exist"""
+        raise NotImplementedError
+
+    def delete(self, *keys: str) -> None:
+        raise NotImplementedError
+
+
+class LocalCircuitStorage(BaseCircuitStorage):
+    """Circuit state of the current process"""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Any:
+        expires, value = self._data.get(key, (0, None))
+        return value if expires > time.monotonic() else None
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            return self._get(key)
+
+    def set(self, key: str, value: Any, timeout: float) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + timeout, value)
+
+    def incr(self, key: str, timeout: float) -> int:
+        with self._lock:
+            if (value := self._get(key)) is None:
+                self._data[key] = (time.monotonic() + timeout, 1)
+                return 1
+            self._data[key] = (self._data[key][0], value + 1)
+            return value + 1
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+
+class DjangoCacheCircuitStorage(BaseCircuitStorage):
+    """Circuit state shared between processes through the Django cache framework"""
+
+    def __init__(self, alias: str = "default"):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get(self, key: str) -> Any:
+        return self.cache.get(key)
+
+    def set(self, key: str, value: Any, timeout: float) -> None:
+        self.cache.set(key, value, timeout)
+
+    def incr(self, key: str, timeout: float) -> int:
+        if self.cache.add(key, 1, timeout):
+            return 1
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            self.cache.set(key, 1, timeout)
+            return 1
+
+    def delete(self, *keys: str) -> None:
+        self.cache.delete_many(keys)
+
+
+class CircuitBreaker:
+    """Stops calling an upstream which fails or responds too slowly.
+
+    The circuit opens when `failure_rate_threshold` of at least `minimum_calls` calls in the
+    `window` seconds failed (connection error, status from `failure_status_codes` or a call slower
+    than `slow_call_threshold`). After `recovery_timeout` seconds `half_open_max_calls` probe
+    calls are let through: success closes the circuit, failure opens it again.
+
+    A service keeps a separate circuit per service class and upstream origin (see `circuit`), so subclasses
+    which inherit the breaker don't share its state. Services with the same `name` share the circuit.
+
+    Usage:
+        class PaymentService(ConnectionService):
+            circuit_breaker = CircuitBreaker(storage=DjangoCacheCircuitStorage())
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    key_prefix: str = "microservice_request:circuit"
+
+    def __init__(
+        self,
+        name: Optional[str] = None,
+        failure_rate_threshold: float = 0.5,
+        minimum_calls: int = 10,
+        window: int = 60,
+        slow_call_threshold: Optional[float] = None,
+        recovery_timeout: int = 30,
+        half_open_max_calls: int = 1,
+        failure_status_codes: Tuple[int, ...] = (500, 502, 503, 504),
+        storage: Optional[BaseCircuitStorage] = None,
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.minimum_calls = minimum_calls
+        self.window = window
+        self.slow_call_threshold = slow_call_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.failure_status_codes = failure_status_codes
+        self.storage = storage or LocalCircuitStorage()
+        self._circuits: Dict[str, "CircuitBreaker"] = {}
+
+    def circuit(self, name: str) -> "CircuitBreaker":
+        """Breaker with the same settings and storage, its state is kept under `name`"""
+        if (circuit := self._circuits.get(name)) is None:
+            circuit = copy.copy(self)
+            circuit.name, circuit._circuits = name, {}
+            self._circuits[name] = circuit
+        return circuit
+
+    def _key(self, suffix: str) -> str:
+        return f"{self.key_prefix}:{self.name}:{suffix}"
+
+    def _window_keys(self) -> Tuple[str, str]:
+        window_id = int(time.time() // self.window)
+        return self._key(f"calls:{window_id}"), self._key(f"failures:{window_id}")
+
+    @property
+    def state(self) -> str:
+        if (opened_at := self.storage.get(self._key("opened_at"))) is None:
+            return self.CLOSED
+        if time.time() - opened_at < self.recovery_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def allow_request(self) -> bool:
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.OPEN:
+            return False
+        return self.storage.incr(self._key("probes"), self.recovery_timeout) <= self.half_open_max_calls
+
+    def open(self) -> None:
+        self.storage.set(self._key("opened_at"), time.time(), self.recovery_timeout * 10)
+        self.storage.delete(self._key("probes"))
+
+    def close(self) -> None:
+        self.storage.delete(self._key("opened_at"), self._key("probes"), *self._window_keys())
+
+    def record_success(self) -> None:
+        if self.state == self.HALF_OPEN:
+            self.close()
+            return
+        self.storage.incr(self._window_keys()[0], self.window * 2)
+
+    def record_failure(self) -> None:
+        if self.state != self.CLOSED:
+            self.open()
+            return
+        calls_key, failures_key = self._window_keys()
+        calls = self.storage.incr(calls_key, self.window * 2)
+        failures = self.storage.incr(failures_key, self.window * 2)
+        if calls >= self.minimum_calls and failures / calls >= self.failure_rate_threshold:
+            self.open()
+
+    def _is_failure(self, response: Any, duration: float) -> bool:
+        if getattr(response, "status_code", None) in self.failure_status_codes:
+            return True
+        return self.slow_call_threshold is not None and duration > self.slow_call_threshold
+
+    def _before_call(self) -> float:
+        if not self.allow_request():
+            raise CircuitOpenError(f"Circuit '{self.name}' is open")
+        return time.monotonic()
+
+    def _after_call(self, response: Any, started: float) -> Any:
+        if self._is_failure(response, time.monotonic() - started):
+            self.record_failure()
+        else:
+            self.record_success()
+        return response
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        started = self._before_call()
+        try:
+            response = func(*args, **kwargs)
+        except (RequestException, HTTPError):
+            self.record_failure()
+            raise
+        return self._after_call(response, started)
+
+    async def acall(self, func: Callable, *args, **kwargs) -> Any:
+        started = self._before_call()
+        try:
+            response = await func(*args, **kwargs)
+        except (RequestException, HTTPError):
+            self.record_failure()
+            raise
+        return self._after_call(response, started)
@@ -0,0 +1,53 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from django.conf import settings
+
+from .exceptions import DeadlineExceeded
+
+DEADLINE_HEADER: str = getattr(settings, "REQUEST_DEADLINE_HEADER", "X-Request-Deadline")
+
+# Unix timestamp after which nobody waits for the response anymore
+request_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+def parse_deadline(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def get_remaining() -> Optional[float]:
+    """Seconds left before the deadline, `None` if there is no deadline"""
+    if (current := request_deadline.get()) is None:
+        return None
+    return current - time.time()
+
+
+def check_deadline() -> Optional[float]:
+    """Same as `get_remaining`, but raises `DeadlineExceeded` when the budget is spent"""
+    remaining = get_remaining()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded(f"Request deadline exceeded by {-remaining:.3f} seconds")
+    return remaining
+
+
+@contextmanager
+def deadline(timeout: float) -> Iterator[float]:
+    """Limit nested service calls with `timeout` seconds. An earlier outer deadline wins
+
+    Usage:
+        with deadline(2.5):
+            UserService(url).service_response("get")
+    """
+    value = time.time() + timeout
+    if (current := request_deadline.get()) is not None:
+        value = min(value, current)
+    token = request_deadline.set(value)
+    try:
+        yield value
+    finally:
+        request_deadline.reset(token)
@@ -3,6 +3,11 @@ from functools import wraps
 
 from requests.exceptions import RequestException
 
+try:
+    from httpx import HTTPError
+except ImportError:  # pragma: no cover
+    HTTPError = RequestException
+
 logger = logging.getLogger(__name__)
 
 
@@ -21,4 +26,20 @@ def except_shell(errors=(Exception,)):
     return decorator
 
 
+def async_except_shell(errors=(Exception,)):
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            except errors as e:
+                logging.error(e)
+                return None
+
+        return wrapper
+
+    return decorator
+
+
 request_shell = except_shell((RequestException,))
+arequest_shell = async_except_shell((RequestException, HTTPError))
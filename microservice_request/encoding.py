@@ -0,0 +1,186 @@
+import json
+from functools import lru_cache
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.test.signals import setting_changed
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover
+    ujson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # pragma: no cover
+    cbor2 = None
+
+
+class JSONBackend(NamedTuple):
+    name: str
+    loads: Callable[[bytes], Any]
+    dumps: Callable[[Any], bytes]
+
+
+def _stdlib_backend() -> JSONBackend:
+    def dumps(data: Any) -> bytes:
+        return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":")).encode()
+
+    return JSONBackend("json", json.loads, dumps)
+
+
+def _orjson_backend() -> JSONBackend:
+    # datetimes are passed to DRF encoder to keep DRF format
+    option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+    default = JSONEncoder().default
+
+    def dumps(data: Any) -> bytes:
+        return orjson.dumps(data, default=default, option=option)
+
+    return JSONBackend("orjson", orjson.loads, dumps)
+
+
+def _ujson_backend() -> JSONBackend:
+    default = JSONEncoder().default
+
+    def dumps(data: Any) -> bytes:
+        return ujson.dumps(data, default=default, ensure_ascii=False, escape_forward_slashes=False).encode()
+
+    return JSONBackend("ujson", ujson.loads, dumps)
+
+
+JSON_BACKENDS: Dict[str, Callable[[], JSONBackend]] = {
+    "orjson": _orjson_backend,
+    "ujson": _ujson_backend,
+    "json": _stdlib_backend,
+}
+
+
+@lru_cache(maxsize=None)
+def get_json_backend() -> JSONBackend:
+    """Backend from `REQUEST_JSON_BACKEND` setting: `json` (default), `orjson`, `ujson` or `auto`,
+    which takes the fastest installed one
+    """
+    name: str = getattr(settings, "REQUEST_JSON_BACKEND", "json")
+    if name == "auto":
+        name = "orjson" if orjson is not None else "ujson" if ujson is not None else "json"
+    if name not in JSON_BACKENDS:
+        raise ImproperlyConfigured(f"Unknown REQUEST_JSON_BACKEND: {name}")
+    if {"orjson": orjson, "ujson": ujson}.get(name, json) is None:
+        raise ImproperlyConfigured(f"REQUEST_JSON_BACKEND requires '{name}' package: pip install {name}")
+    return JSON_BACKENDS[name]()
+
+
+def reset_json_backend(*, setting: str, **kwargs) -> None:
+    if setting == "REQUEST_JSON_BACKEND":
+        get_json_backend.cache_clear()
+
+
+setting_changed.connect(reset_json_backend)
+
+
+class Codec:
+    """Request/response body format"""
+
+    media_type: str = ""
+    decode_errors: tuple = (ValueError, TypeError)
+
+    def encode(self, data: Any) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, content: bytes) -> Any:
+        raise NotImplementedError
+
+    @property
+    def accept(self) -> str:
+        """`Accept` header value, JSON stays acceptable as a fallback"""
+        if self.media_type == JSONCodec.media_type:
+            return self.media_type
+        return f"{self.media_type}, {JSONCodec.media_type};q=0.9"
+
+
+class JSONCodec(Codec):
+    """JSON with `REQUEST_JSON_BACKEND`"""
+
+    media_type = "application/json"
+
+    @property
+    def is_stdlib(self) -> bool:
+        return get_json_backend().name == "json"
+
+    def encode(self, data: Any) -> bytes:
+        return get_json_backend().dumps(data)
+
+    def decode(self, content: bytes) -> Any:
+        return get_json_backend().loads(content)
+
+
+class MsgPackCodec(Codec):
+    media_type = "application/msgpack"
+
+    def __init__(self):
+        if msgpack is None:
+            raise ImproperlyConfigured("MessagePack encoding requires 'msgpack' package: pip install msgpack")
+        self._default = JSONEncoder().default
+
+    def encode(self, data: Any) -> bytes:
+        # datetime, Decimal, UUID etc. are converted like DRF JSON renderer does
+        return msgpack.packb(data, default=self._default, use_bin_type=True)
+
+    def decode(self, content: bytes) -> Any:
+        return msgpack.unpackb(content, raw=False)
+
+
+class CBORCodec(Codec):
+    media_type = "application/cbor"
+    decode_errors = (ValueError, TypeError) + ((cbor2.CBORDecodeError,) if cbor2 else ())
+
+    def __init__(self):
+        if cbor2 is None:
+            raise ImproperlyConfigured("CBOR encoding requires 'cbor2' package: pip install cbor2")
+
+    def encode(self, data: Any) -> bytes:
+        return cbor2.dumps(data)
+
+    def decode(self, content: bytes) -> Any:
+        return cbor2.loads(content)
+
+
+_codec_classes: Dict[str, type] = {}
+_codecs: Dict[str, Codec] = {}
+
+
+def register_codec(codec_class: type, *media_types: str) -> None:
+    for media_type in media_types or (codec_class.media_type,):
+        _codec_classes[media_type] = codec_class
+        _codecs.pop(media_type, None)
+
+
+def get_codec(content_type: Optional[str]) -> Optional[Codec]:
+    """Codec of a `Content-Type` header value, None for unknown types or missing optional packages"""
+    if not content_type:
+        return None
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    if (codec := _codecs.get(media_type)) is None and (codec_class := _codec_classes.get(media_type)):
+        try:
+            codec = _codecs[media_type] = codec_class()
+        except ImproperlyConfigured:
+            return None
+    return codec
+
+
+register_codec(JSONCodec)
+register_codec(MsgPackCodec, "application/msgpack", "application/x-msgpack")
+register_codec(CBORCodec)
@@ -1,2 +1,29 @@
+from requests.exceptions import RequestException, Timeout
+
+
 class MicroserviceException(ValueError):
     pass
+
+
+class CoalescedRequestTimeout(Timeout):
+    """Identical in-flight request didn't finish in time"""
+
+
+class CircuitOpenError(RequestException):
+    """Upstream is considered unavailable, request wasn't sent"""
+
+
+class EndpointUnavailable(RequestException):
+    """Endpoints of the upstream couldn't be resolved, request wasn't sent"""
+
+
+class DeadlineExceeded(Timeout):
+    """Request deadline passed, nobody waits for the response"""
+
+
+class RateLimitExceeded(RequestException):
+    """Call is over the service rate limit, request wasn't sent"""
+
+    def __init__(self, *args, status_code: int = 429, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.status_code = status_code
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Any, List, NamedTuple, Optional, Sequence
+
+from django.conf import settings
+
+from .deadline import deadline
+from .decorators import arequest_shell, request_shell
+from .loader import worker_context
+
+if TYPE_CHECKING:
+    from .services import ConnectionService
+
+logger = logging.getLogger(__name__)
+
+GATHER_TIMEOUT: float = getattr(settings, "REQUEST_GATHER_TIMEOUT", 30)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+class RequestSpec(NamedTuple):
+    service: "ConnectionService"
+    method: str
+    kwargs: dict = {}
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Bounded thread pool shared by all `gather` calls of the process"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, "REQUEST_GATHER_MAX_WORKERS", 32),
+                    thread_name_prefix="microservice-request",
+                )
+    return _executor
+
+
+def _as_spec(spec: Sequence) -> RequestSpec:
+    return spec if isinstance(spec, RequestSpec) else RequestSpec(*spec)
+
+
+def gather_requests(specs: Sequence[Sequence], timeout: Optional[float] = None) -> List[Any]:
+    """Send requests concurrently and return responses in the order of `specs`.
+
+    Failed requests and requests which didn't finish before `timeout` seconds give `None`,
+    as `request_shell` does. Requests run under a deadline of `timeout` (`REQUEST_GATHER_TIMEOUT`
+    by default), which cuts down their transport timeouts. A running request isn't interrupted
+    on timeout, its worker thread is busy until the transport timeout fires.
+    """
+    specs: List[RequestSpec] = [_as_spec(spec) for spec in specs]
+    executor = get_executor()
+    timeout = GATHER_TIMEOUT if timeout is None else timeout
+    with deadline(timeout):
+        futures = [
+            executor.submit(
+                worker_context().run,
+                request_shell(spec.service.request_to_service),
+                spec.method,
+                **spec.kwargs,
+            )
+            for spec in specs
+        ]
+    wait(futures, timeout=timeout)
+    results = []
+    for spec, future in zip(specs, futures):
+        if future.done():
+            results.append(future.result())
+        else:
+            future.cancel()
+            logger.error(f"Deadline exceeded: {spec.method.upper()} {spec.service.url}")
+            results.append(None)
+    return results
+
+
+async def agather_requests(specs: Sequence[Sequence], timeout: Optional[float] = None) -> List[Any]:
+    """Async twin of `gather_requests` which runs `arequest_to_service` calls on the running event loop"""
+    specs: List[RequestSpec] = [_as_spec(spec) for spec in specs]
+    if not specs:
+        return []
+    timeout = GATHER_TIMEOUT if timeout is None else timeout
+    with deadline(timeout):
+        tasks = [
+            asyncio.ensure_future(
+                arequest_shell(spec.service.arequest_to_service)(spec.method, **spec.kwargs)
+            )
+            for spec in specs
+        ]
+    await asyncio.wait(tasks, timeout=timeout)
+    results = []
+    for spec, task in zip(specs, tasks):
+        if task.done():
+            results.append(task.result())
+        else:
+            task.cancel()
+            logger.error(f"Deadline exceeded: {spec.method.upper()} {spec.service.url}")
+            results.append(None)
+    return results
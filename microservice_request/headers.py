@@ -0,0 +1,80 @@
+from typing import Dict, Iterable, Iterator, Mapping, Optional, Tuple
+
+from django.http import HttpResponseBase
+
+HOP_BY_HOP_HEADERS = frozenset(
+    (
+        "connection",
+        "keep-alive",
+        "proxy-authenticate",
+        "proxy-authorization",
+        "proxy-connection",
+        "te",
+        "trailer",
+        "trailers",
+        "transfer-encoding",
+        "upgrade",
+    )
+)
+
+
+def connection_tokens(headers: Mapping[str, str]) -> frozenset:
+    """Headers listed in `Connection` are hop-by-hop as well (RFC 7230, section 6.1)"""
+    if not (connection := headers.get("Connection")):
+        return frozenset()
+    return frozenset(token.strip().lower() for token in connection.split(","))
+
+
+# requests decodes compressed body, so these headers don't describe `response.content`
+DECODED_BODY_HEADERS = frozenset(("content-encoding", "content-length"))
+
+# validators computed over the upstream body, they don't match a re-rendered one
+BODY_VALIDATOR_HEADERS = frozenset(("etag", "content-md5", "digest"))
+
+# body is rendered again by DRF renderer, which sets its own content type
+RENDERED_BODY_HEADERS = DECODED_BODY_HEADERS | BODY_VALIDATOR_HEADERS | {"content-type"}
+
+
+class HeaderPolicy:
+    """Upstream response headers forwarded to the client.
+
+    `allow` limits forwarded headers to the listed ones (`Content-Type` is always allowed), `deny` drops
+    the listed ones. Hop-by-hop headers are never forwarded. Names are lowercased once, on creation.
+
+    Usage:
+        class UserService(ConnectionService):
+            header_policy = HeaderPolicy(allow=("Cache-Control", "ETag", "X-Request-Id"))
+    """
+
+    def __init__(self, allow: Optional[Iterable[str]] = None, deny: Iterable[str] = ()):
+        self.allow: Optional[frozenset] = None
+        if allow is not None:
+            self.allow = frozenset(name.lower() for name in allow) | {"content-type"}
+        self.deny: frozenset = HOP_BY_HOP_HEADERS | {name.lower() for name in deny}
+        self._excluded: Dict[frozenset, frozenset] = {}
+
+    def excluded(self, exclude: frozenset = frozenset()) -> frozenset:
+        if (excluded := self._excluded.get(exclude)) is None:
+            excluded = self._excluded[exclude] = self.deny | exclude
+        return excluded
+
+    def filter(
+        self, headers: Mapping[str, str], exclude: frozenset = frozenset()
+    ) -> Iterator[Tuple[str, str]]:
+        """Yield forwarded headers of an upstream response"""
+        excluded = self.excluded(exclude)
+        if tokens := connection_tokens(headers):
+            excluded = excluded | tokens
+        allow = self.allow
+        for name, value in headers.items():
+            lower = name.lower()
+            if lower not in excluded and (allow is None or lower in allow):
+                yield name, value
+
+    def apply(
+        self, headers: Mapping[str, str], response: HttpResponseBase, exclude: frozenset = frozenset()
+    ) -> HttpResponseBase:
+        """Set forwarded headers on `response` in place"""
+        for name, value in self.filter(headers, exclude):
+            response[name] = value
+        return response
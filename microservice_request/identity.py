@@ -0,0 +1,118 @@
+from typing import TYPE_CHECKING, Any, Dict, Mapping, Optional, Sequence, Union
+
+from django.conf import settings
+
+if TYPE_CHECKING:
+    from django.http import HttpRequest
+
+REMOTE_USER_HEADER: str = getattr(settings, "REQUEST_REMOTE_USER_HEADER", "Remote-User")
+
+# user attributes forwarded as `Remote-User-<Name>` headers, e.g. ("username", "is_staff")
+REMOTE_USER_CLAIMS: Sequence[str] = getattr(settings, "REQUEST_REMOTE_USER_CLAIMS", ())
+
+# build the forwarded principal from identity headers of the previous hop. Enable only on services which
+# are reachable through a gateway that sets them, on the edge a client could send any identity
+TRUST_REMOTE_USER: bool = getattr(settings, "REQUEST_TRUST_REMOTE_USER", False)
+
+
+def parse_user_id(value: str) -> Union[int, str]:
+    return int(value) if value.isdigit() else value
+
+
+class RemotePrincipal:
+    """Identity of the user who made the request: id and claims carried in headers.
+
+    Built without user model and session lookups, so it's cheap to forward between services.
+    """
+
+    __slots__ = ("id", "claims")
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, id: Union[int, str], claims: Optional[Mapping[str, str]] = None):
+        self.id = id
+        self.claims: Dict[str, str] = dict(claims or {})
+
+    @property
+    def pk(self) -> Union[int, str]:
+        return self.id
+
+    @classmethod
+    def from_headers(cls, headers: Mapping[str, str]) -> Optional["RemotePrincipal"]:
+        if not (user_id := headers.get(REMOTE_USER_HEADER)):
+            return None
+        prefix = f"{REMOTE_USER_HEADER.lower()}-"
+        start = len(prefix)
+        claims = {
+            name[start:].replace("-", "_"): value
+            for name, value in ((name.lower(), value) for name, value in headers.items())
+            if name.startswith(prefix)
+        }
+        return cls(parse_user_id(user_id), claims)
+
+    @classmethod
+    def from_user(cls, user: Any) -> Optional["RemotePrincipal"]:
+        if not user or not user.is_authenticated:
+            return None
+        if isinstance(user, cls):
+            return user
+        claims = {name: str(getattr(user, name)) for name in REMOTE_USER_CLAIMS if hasattr(user, name)}
+        return cls(user.pk, claims)
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        """Headers which pass the identity to an upstream"""
+        headers: Dict[str, str] = {REMOTE_USER_HEADER: str(self.id)}
+        for name, value in self.claims.items():
+            headers[f"{REMOTE_USER_HEADER}-{name.replace('_', '-').title()}"] = value
+        return headers
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, RemotePrincipal) and (self.id, self.claims) == (other.id, other.claims)
+
+    def __hash__(self) -> int:
+        return hash(self.id)
+
+    def __repr__(self) -> str:
+        return f"RemotePrincipal({self.id!r}, claims={self.claims!r})"
+
+
+def _header_principal(request: "HttpRequest") -> Optional[RemotePrincipal]:
+    if not TRUST_REMOTE_USER:
+        return None
+    return RemotePrincipal.from_headers(request.headers)
+
+
+def get_principal(request: "HttpRequest") -> Optional[RemotePrincipal]:
+    """Principal of the request, cached on it.
+
+    With `TRUST_REMOTE_USER` identity headers of the gateway are used first, otherwise the principal
+    is built from the authenticated `request.user` only.
+    """
+    try:
+        return request._remote_principal
+    except AttributeError:
+        pass
+    principal = _header_principal(request)
+    if principal is None and hasattr(request, "user"):
+        principal = RemotePrincipal.from_user(request.user)
+    request._remote_principal = principal
+    return principal
+
+
+async def aget_principal(request: "HttpRequest") -> Optional[RemotePrincipal]:
+    """Async twin of `get_principal`, the user is loaded with `request.auser()`"""
+    try:
+        return request._remote_principal
+    except AttributeError:
+        pass
+    principal = _header_principal(request)
+    if principal is None:
+        # DRF request keeps the user of its authenticators in `_user`
+        if (user := getattr(request, "_user", None)) is None and hasattr(request, "auser"):
+            user = await request.auser()
+        elif user is None:
+            user = getattr(request, "user", None)
+        principal = RemotePrincipal.from_user(user)
+    request._remote_principal = principal
+    return principal
@@ -0,0 +1,202 @@
+import asyncio
+import threading
+from contextlib import contextmanager
+from contextvars import Context, ContextVar, copy_context
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Iterator, List, Mapping, Optional
+
+from django.core.signals import request_finished, request_started
+
+BatchFetch = Callable[[List[Hashable]], Mapping[Hashable, Any]]
+AsyncBatchFetch = Callable[[List[Hashable]], Awaitable[Mapping[Hashable, Any]]]
+
+# loaders of the current request by owner (service class)
+request_loaders: ContextVar[Optional[Dict[Any, "DataLoader"]]] = ContextVar("request_loaders", default=None)
+
+# loaders outside of a request scope, per thread, they don't memoise values between dispatches
+_unscoped = threading.local()
+
+
+class Pending:
+    """Result of `DataLoader.load`, the first `result()` call fetches all collected keys at once"""
+
+    __slots__ = ("loader", "key")
+
+    def __init__(self, loader: "DataLoader", key: Hashable):
+        self.loader = loader
+        self.key = key
+
+    def result(self) -> Any:
+        return self.loader.get(self.key)
+
+
+class DataLoader:
+    """Collects keys and fetches them with one `batch_fetch` call.
+
+    `batch_fetch` receives a list of unique keys and returns a mapping of key to value, missing keys
+    resolve to `None`. Fetched values are memoised (with `memoize = False` until the next dispatch only),
+    failed keys are fetched again on the next load. Async loads issued within one event loop tick are sent
+    in one `abatch_fetch` call.
+
+    Usage:
+        loader = DataLoader(fetch_users)
+        pending = [loader.load(user_id) for user_id in ids]
+        users = [item.result() for item in pending]
+    """
+
+    def __init__(
+        self,
+        batch_fetch: Optional[BatchFetch] = None,
+        abatch_fetch: Optional[AsyncBatchFetch] = None,
+        max_batch_size: Optional[int] = None,
+        memoize: bool = True,
+    ):
+        self.batch_fetch = batch_fetch
+        self.abatch_fetch = abatch_fetch
+        self.max_batch_size = max_batch_size
+        self.memoize = memoize
+        self._memo: Dict[Hashable, Any] = {}
+        self._errors: Dict[Hashable, Exception] = {}
+        self._queue: Dict[Hashable, None] = {}
+        self._futures: Dict[Hashable, asyncio.Future] = {}
+        # the event loop keeps weak references to tasks only
+        self._dispatch_task: Optional[asyncio.Task] = None
+
+    def _batches(self, keys: List[Hashable]) -> Iterator[List[Hashable]]:
+        size = self.max_batch_size or len(keys)
+        for start in range(0, len(keys), size):
+            end = start + size
+            yield keys[start:end]
+
+    def _store(self, keys: List[Hashable], results: Mapping[Hashable, Any]) -> None:
+        for key in keys:
+            self._memo[key] = results.get(key)
+
+    def _start_batch(self) -> None:
+        if not self.memoize:
+            self._memo = {}
+
+    def load(self, key: Hashable) -> Pending:
+        if key not in self._memo or not self.memoize:
+            self._queue[key] = None
+        return Pending(self, key)
+
+    def load_many(self, keys: Iterable[Hashable]) -> List[Any]:
+        pending = [self.load(key) for key in keys]
+        return [item.result() for item in pending]
+
+    def get(self, key: Hashable) -> Any:
+        if key in self._queue or (key not in self._memo and key not in self._errors):
+            self._queue[key] = None
+            self.dispatch()
+        if key in self._errors:
+            raise self._errors.pop(key)
+        return self._memo[key]
+
+    def dispatch(self) -> None:
+        """Fetch all collected keys"""
+        keys, self._queue = list(self._queue), {}
+        self._start_batch()
+        for batch in self._batches(keys):
+            try:
+                self._store(batch, self.batch_fetch(batch))
+            except Exception as e:
+                self._errors.update(dict.fromkeys(batch, e))
+
+    async def aload(self, key: Hashable) -> Any:
+        if self.memoize and key in self._memo:
+            return self._memo[key]
+        if (future := self._futures.get(key)) is None:
+            loop = asyncio.get_running_loop()
+            if not self._futures:
+                loop.call_soon(self._start_dispatch, loop)
+            future = self._futures[key] = loop.create_future()
+        return await asyncio.shield(future)
+
+    async def aload_many(self, keys: Iterable[Hashable]) -> List[Any]:
+        return list(await asyncio.gather(*(self.aload(key) for key in keys)))
+
+    def _start_dispatch(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._dispatch_task = loop.create_task(self.adispatch())
+        self._dispatch_task.add_done_callback(self._dispatch_done)
+
+    def _dispatch_done(self, task: asyncio.Task) -> None:
+        if self._dispatch_task is task:
+            self._dispatch_task = None
+
+    async def adispatch(self) -> None:
+        futures, self._futures = self._futures, {}
+        keys = list(futures)
+        self._start_batch()
+        try:
+            for batch in self._batches(keys):
+                try:
+                    self._store(batch, await self.abatch_fetch(batch))
+                except Exception as e:
+                    for key in batch:
+                        futures[key].set_exception(e)
+                    continue
+                for key in batch:
+                    futures[key].set_result(self._memo[key])
+        finally:
+            # cancelled dispatch mustn't leave loads waiting forever
+            for future in futures.values():
+                if not future.done():
+                    future.cancel()
+
+    def prime(self, key: Hashable, value: Any) -> None:
+        self._memo.setdefault(key, value)
+
+    def clear(self, key: Optional[Hashable] = None) -> None:
+        if key is None:
+            self._memo.clear()
+        else:
+            self._memo.pop(key, None)
+
+
+def get_request_loader(owner: Any, factory: Callable[[], DataLoader]) -> DataLoader:
+    """Loader of `owner` shared within the current request, created with `factory`.
+
+    The request scope is set by `RemoteUserMiddleware` or `batching()`. Outside of it loaders are shared
+    by the thread and memoise values within one dispatch only.
+    """
+    if (loaders := request_loaders.get()) is None:
+        if (loaders := getattr(_unscoped, "loaders", None)) is None:
+            loaders = _unscoped.loaders = {}
+        if (loader := loaders.get(owner)) is None:
+            loader = loaders[owner] = factory()
+            loader.memoize = False
+        return loader
+    if (loader := loaders.get(owner)) is None:
+        loader = loaders[owner] = factory()
+    return loader
+
+
+def worker_context() -> Context:
+    """Copy of the current context for another thread. Loaders aren't thread-safe, so it gets its own"""
+    context = copy_context()
+    context.run(request_loaders.set, None)
+    return context
+
+
+def reset_request_loaders(**kwargs) -> None:
+    if loaders := request_loaders.get():
+        loaders.clear()
+
+
+@contextmanager
+def batching() -> Iterator[None]:
+    """Scope for memoised loads outside of request/response cycle, e.g. in a task
+
+    Usage:
+        with batching():
+            users = UserService("/api/v1/users/").load_many(ids)
+    """
+    token = request_loaders.set({})
+    try:
+        yield
+    finally:
+        request_loaders.reset(token)
+
+
+request_started.connect(reset_request_loaders)
+request_finished.connect(reset_request_loaders)
@@ -0,0 +1,233 @@
+import bisect
+import threading
+from datetime import timedelta
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from django.http import HttpRequest, HttpResponse
+
+from .pool import session_registry
+from .signals import (
+    service_request_finished,
+    service_request_retried,
+    service_request_started,
+    service_response_built,
+)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Metric:
+    type: str = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: Dict[LabelValues, Any] = {}
+        self._lock = threading.Lock()
+
+    def _format_labels(self, values: LabelValues, extra: Sequence[Tuple[str, str]] = ()) -> str:
+        pairs = list(zip(self.labels, values)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(f"{name}{labels} {value}" for name, labels, value in self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def get(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        for labels, value in sorted(self._values.items()):
+            yield self.name, self._format_labels(labels), value
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+
+    def observe(self, *labels: str, value: float) -> None:
+        with self._lock:
+            if (state := self._values.get(labels)) is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    def get(self, *labels: str) -> Tuple[int, float]:
+        """`(count, sum)` of observed values"""
+        if (state := self._values.get(labels)) is None:
+            return 0, 0.0
+        return sum(state[0]), state[1]
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        for labels, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bucket, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bucket == float("inf") else repr(bucket)
+                yield f"{self.name}_bucket", self._format_labels(labels, [("le", le)]), cumulative
+            yield f"{self.name}_count", self._format_labels(labels), cumulative
+            yield f"{self.name}_sum", self._format_labels(labels), total
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def __iter__(self) -> Iterator[Metric]:
+        return iter(self._metrics.values())
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        return "\n".join(metric.render() for metric in self) + "\n"
+
+
+class MetricsCollector:
+    """Collects per-service metrics from request signals.
+
+    Usage (e.g. in `AppConfig.ready`):
+        collector.connect()
+    and expose `metrics_view` in urls.
+    """
+
+    prefix: str = "microservice_request"
+
+    def __init__(
+        self, registry: Optional[MetricsRegistry] = None, buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.registry = registry or MetricsRegistry()
+        labels = ("service", "method")
+        self.requests = self._counter("requests_total", "Upstream responses", labels + ("status",))
+        self.errors = self._counter("errors_total", "Failed upstream requests", labels + ("error",))
+        self.retries = self._counter("retries_total", "Retried upstream requests", labels)
+        self.in_flight = self._gauge("in_flight", "Upstream requests in progress", labels)
+        self.duration = self._histogram(
+            "request_duration_seconds", "Upstream request duration", labels, buckets
+        )
+        self.ttfb = self._histogram(
+            "time_to_first_byte_seconds", "Time until response headers, connect included", labels, buckets
+        )
+        self.transfer = self._histogram("body_transfer_seconds", "Response body download", labels, buckets)
+        self.decode = self._histogram("decode_seconds", "Response body decode", labels, buckets)
+        self.build = self._histogram("build_seconds", "DRF response construction", labels, buckets)
+        self.pool_in_use = self._gauge("pool_connections_in_use", "Pooled connections in use", ("origin",))
+        self.pool_size = self._gauge("pool_size", "Connection pool size", ("origin",))
+
+    def _counter(self, name: str, documentation: str, labels: Sequence[str]) -> Counter:
+        return self.registry.register(Counter(f"{self.prefix}_{name}", documentation, labels))
+
+    def _gauge(self, name: str, documentation: str, labels: Sequence[str]) -> Gauge:
+        return self.registry.register(Gauge(f"{self.prefix}_{name}", documentation, labels))
+
+    def _histogram(
+        self, name: str, documentation: str, labels: Sequence[str], buckets: Sequence[float]
+    ) -> Histogram:
+        return self.registry.register(Histogram(f"{self.prefix}_{name}", documentation, labels, buckets))
+
+    def connect(self) -> None:
+        service_request_started.connect(self.on_request_started, dispatch_uid=f"{id(self)}-started")
+        service_request_finished.connect(self.on_request_finished, dispatch_uid=f"{id(self)}-finished")
+        service_response_built.connect(self.on_response_built, dispatch_uid=f"{id(self)}-built")
+        service_request_retried.connect(self.on_request_retried, dispatch_uid=f"{id(self)}-retried")
+
+    def disconnect(self) -> None:
+        service_request_started.disconnect(dispatch_uid=f"{id(self)}-started")
+        service_request_finished.disconnect(dispatch_uid=f"{id(self)}-finished")
+        service_response_built.disconnect(dispatch_uid=f"{id(self)}-built")
+        service_request_retried.disconnect(dispatch_uid=f"{id(self)}-retried")
+
+    def on_request_started(self, sender: type, method: str, **kwargs) -> None:
+        self.in_flight.inc(sender.__name__, method)
+
+    def on_request_finished(
+        self, sender: type, method: str, response: Any, error: Optional[Exception], duration: float, **kwargs
+    ) -> None:
+        labels = (sender.__name__, method)
+        self.in_flight.dec(*labels)
+        self.duration.observe(*labels, value=duration)
+        if error is not None:
+            self.errors.inc(*labels, type(error).__name__)
+            return
+        self.requests.inc(*labels, str(getattr(response, "status_code", "")))
+        if isinstance(elapsed := getattr(response, "elapsed", None), timedelta):
+            self.ttfb.observe(*labels, value=elapsed.total_seconds())
+            self.transfer.observe(*labels, value=max(duration - elapsed.total_seconds(), 0))
+        retries = getattr(getattr(getattr(response, "raw", None), "retries", None), "history", None)
+        if isinstance(retries, tuple) and retries:
+            self.retries.inc(*labels, amount=len(retries))
+
+    def on_request_retried(self, sender: type, method: str, **kwargs) -> None:
+        self.retries.inc(sender.__name__, method)
+
+    def on_response_built(
+        self, sender: type, method: str, decode_duration: float, build_duration: float, **kwargs
+    ) -> None:
+        self.decode.observe(sender.__name__, method, value=decode_duration)
+        self.build.observe(sender.__name__, method, value=build_duration)
+
+    def collect_pool_metrics(self) -> None:
+        in_use: Dict[str, int] = {}
+        size: Dict[str, int] = {}
+        for origin, used, maxsize in session_registry.pool_stats():
+            in_use[origin] = in_use.get(origin, 0) + used
+            size[origin] = size.get(origin, 0) + maxsize
+        for origin in size:
+            self.pool_in_use.set(origin, value=in_use[origin])
+            self.pool_size.set(origin, value=size[origin])
+
+    def render(self) -> str:
+        self.collect_pool_metrics()
+        return self.registry.render()
+
+    def snapshot(self) -> Dict[str, List[Tuple[str, str, float]]]:
+        """In-process view of all samples, keyed by metric name"""
+        self.collect_pool_metrics()
+        return {metric.name: list(metric.samples()) for metric in self.registry}
+
+
+collector = MetricsCollector()
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    return HttpResponse(collector.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
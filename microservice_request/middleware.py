@@ -1,16 +1,86 @@
-from typing import TYPE_CHECKING
+from functools import partial
+from typing import TYPE_CHECKING, Awaitable, Callable, Optional, Union
 
-from django.utils.deprecation import MiddlewareMixin
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.utils.functional import SimpleLazyObject
 
+from .deadline import DEADLINE_HEADER, parse_deadline, request_deadline
+from .identity import REMOTE_USER_HEADER, aget_principal, get_principal
+from .loader import batching
+
 if TYPE_CHECKING:
-    from django.http import HttpRequest
+    from django.http import HttpRequest, HttpResponse
 
 
-class RemoteUserMiddleware(MiddlewareMixin):
-    def process_request(self, request: "HttpRequest"):
+class RemoteUserMiddleware:
+    """Sets `request.remote_user`, `request.deadline` and the scope of batched loads of the request.
+
+    Numeric `Remote-User` header set by the gateway is the user id. Natively sync and async, under ASGI
+    the request doesn't switch to a thread, async code reads the user id with `await request.aremote_user()`.
+    Without `Remote-User` header `remote_user` is lazy, the user is resolved on the first access only:
+    for anonymous user it is a lazy object which equals `None` and is falsy, but `is None` is `False`.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(
+        self, get_response: Callable[["HttpRequest"], Union["HttpResponse", Awaitable["HttpResponse"]]]
+    ):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request: "HttpRequest"):
+        if self.async_mode:
+            return self.__acall__(request)
+        self.process_request(request)
+        with batching():
+            response = self.get_response(request)
+        return self.process_response(request, response)
+
+    async def __acall__(self, request: "HttpRequest") -> "HttpResponse":
+        self.process_request(request)
+        # set before the view, so loads of its tasks share one loader
+        with batching():
+            response = await self.get_response(request)
+        return self.process_response(request, response)
+
+    @staticmethod
+    def _set_remote_user_header(request: "HttpRequest") -> None:
         request.remote_user = None
-        if user_id := request.headers.get("Remote-User"):
+        if user_id := request.headers.get(REMOTE_USER_HEADER):
             request.remote_user = int(user_id) if user_id.isdigit() else None
-        elif getattr(request, "user", None) and request.user.is_authenticated:
-            request.remote_user = SimpleLazyObject(lambda: request.user.id)
+
+    @staticmethod
+    def _remote_user_id(request: "HttpRequest") -> Optional[Union[int, str]]:
+        principal = get_principal(request)
+        return principal.id if principal is not None else None
+
+    @staticmethod
+    async def _aremote_user_id(request: "HttpRequest") -> Optional[Union[int, str]]:
+        if not isinstance(request.remote_user, SimpleLazyObject):
+            return request.remote_user
+        principal = await aget_principal(request)
+        return principal.id if principal is not None else None
+
+    @staticmethod
+    def _set_deadline(request: "HttpRequest") -> None:
+        request.deadline = parse_deadline(request.headers.get(DEADLINE_HEADER))
+        if request.deadline is not None:
+            request._deadline_token = request_deadline.set(request.deadline)
+
+    def process_request(self, request: "HttpRequest"):
+        self._set_remote_user_header(request)
+        if request.remote_user is None and not request.headers.get(REMOTE_USER_HEADER):
+            if hasattr(request, "user"):
+                request.remote_user = SimpleLazyObject(lambda: self._remote_user_id(request))
+        request.aremote_user = partial(self._aremote_user_id, request)
+        self._set_deadline(request)
+
+    def process_response(self, request: "HttpRequest", response: "HttpResponse") -> "HttpResponse":
+        if token := getattr(request, "_deadline_token", None):
+            request_deadline.reset(token)
+            del request._deadline_token
+        return response
@@ -0,0 +1,150 @@
+import os
+import uuid
+from typing import IO, Any, AsyncIterator, Iterator, List, Mapping, Optional, Tuple, Union
+
+from asgiref.sync import sync_to_async
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+FileSpec = Union[IO, Tuple[str, IO], Tuple[str, IO, str]]
+
+
+def _escape(value: str) -> str:
+    """Quote `Content-Disposition` parameter the way browsers (and urllib3) do"""
+    return value.replace("\\", "\\\\").replace('"', "%22").replace("\r", "%0D").replace("\n", "%0A")
+
+
+def _items(fields: Optional[Mapping], multiple: tuple = (list, tuple)) -> Iterator[Tuple[str, Any]]:
+    """Flat (name, value) pairs of a dict, a dict of lists or a Django `MultiValueDict`.
+
+    `None` values are skipped, as `requests` does.
+    """
+    if not fields:
+        return
+    items = fields.lists() if hasattr(fields, "lists") else fields.items()
+    for name, value in items:
+        for item in value if isinstance(value, multiple) else (value,):
+            if item is not None:
+                yield name, item
+
+
+def _file_size(file: IO) -> Optional[int]:
+    if (size := getattr(file, "size", None)) is not None:
+        return size
+    try:
+        return os.fstat(file.fileno()).st_size
+    except (AttributeError, OSError, ValueError):
+        pass
+    try:
+        position = file.tell()
+        size = file.seek(0, os.SEEK_END)
+        file.seek(position)
+        return size
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+class MultipartEncoder:
+    """`multipart/form-data` body that reads files chunk by chunk.
+
+    Memory per upload is bounded by `chunk_size`. `len` is the body size when sizes of all files are
+    known, so the body is sent with `Content-Length`, otherwise with chunked transfer encoding.
+    """
+
+    def __init__(
+        self,
+        data: Optional[Mapping] = None,
+        files: Optional[Mapping[str, FileSpec]] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ):
+        self.boundary: str = uuid.uuid4().hex
+        self.chunk_size = chunk_size
+        self.parts: List[Tuple[bytes, Union[bytes, IO]]] = []
+        for name, value in _items(data):
+            if hasattr(value, "read"):
+                # DRF `request.data` of multipart requests contains uploaded files too
+                filename, file, content_type = self._file_spec(value)
+                self.parts.append((self._part_header(name, filename, content_type), file))
+                continue
+            if not isinstance(value, bytes):
+                value = str(value).encode()
+            self.parts.append((self._part_header(name), value))
+        for name, spec in _items(files, multiple=(list,)):
+            filename, file, content_type = self._file_spec(spec)
+            self.parts.append((self._part_header(name, filename, content_type), file))
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    @property
+    def len(self) -> Optional[int]:
+        """Body size, `requests` reads it to set `Content-Length`"""
+        total = len(self._closing)
+        for header, body in self.parts:
+            if (size := len(body) if isinstance(body, bytes) else _file_size(body)) is None:
+                return None
+            total += len(header) + size + 2
+        return total
+
+    @property
+    def _closing(self) -> bytes:
+        return f"--{self.boundary}--\r\n".encode()
+
+    @staticmethod
+    def _file_spec(spec: FileSpec) -> Tuple[str, IO, str]:
+        if isinstance(spec, (list, tuple)):
+            filename, file, *content_type = spec
+        else:
+            file, content_type = spec, ()
+            filename = os.path.basename(getattr(spec, "name", None) or "file")
+        content_type = content_type[0] if content_type else None
+        return (
+            filename,
+            file,
+            content_type or getattr(file, "content_type", None) or "application/octet-stream",
+        )
+
+    def _part_header(
+        self, name: str, filename: Optional[str] = None, content_type: Optional[str] = None
+    ) -> bytes:
+        disposition = f'form-data; name="{_escape(name)}"'
+        if filename is not None:
+            disposition += f'; filename="{_escape(filename)}"'
+        lines = [f"--{self.boundary}", f"Content-Disposition: {disposition}"]
+        if content_type:
+            lines.append(f"Content-Type: {content_type}")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode()
+
+    def _read(self, file: IO) -> Iterator[bytes]:
+        if hasattr(file, "chunks"):
+            yield from file.chunks(self.chunk_size)
+            return
+        if hasattr(file, "seek"):
+            file.seek(0)
+        while chunk := file.read(self.chunk_size):
+            yield chunk.encode() if isinstance(chunk, str) else chunk
+
+    def __iter__(self) -> Iterator[bytes]:
+        for header, body in self.parts:
+            yield header
+            if isinstance(body, bytes):
+                yield body
+            else:
+                yield from self._read(body)
+            yield b"\r\n"
+        yield self._closing
+
+    async def aiter(self) -> AsyncIterator[bytes]:
+        """httpx `AsyncClient` accepts async iterables only. Files are read in a thread, off the event loop"""
+        read_chunk = sync_to_async(next, thread_sensitive=False)
+        for header, body in self.parts:
+            yield header
+            if isinstance(body, bytes):
+                yield body
+            else:
+                chunks = self._read(body)
+                while (chunk := await read_chunk(chunks, None)) is not None:
+                    yield chunk
+            yield b"\r\n"
+        yield self._closing
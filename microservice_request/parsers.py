@@ -0,0 +1,74 @@
+import gzip
+import io
+import zlib
+from typing import IO, Any, Optional
+
+from django.conf import settings
+from rest_framework import parsers
+from rest_framework.exceptions import ParseError
+
+from .encoding import CBORCodec, Codec, MsgPackCodec
+
+
+class DecompressMixin:
+    """Accept request bodies compressed by services with `compress_request = True`.
+
+    Decompressed body is limited by `REQUEST_MAX_DECOMPRESSED_SIZE` or `DATA_UPLOAD_MAX_MEMORY_SIZE`,
+    which Django checks against the compressed body only.
+    """
+
+    max_decompressed_size: Optional[int] = getattr(settings, "REQUEST_MAX_DECOMPRESSED_SIZE", None)
+
+    def get_max_decompressed_size(self) -> Optional[int]:
+        if self.max_decompressed_size is not None:
+            return self.max_decompressed_size
+        return settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+
+    def decompress(self, stream: IO) -> IO:
+        limit: Optional[int] = self.get_max_decompressed_size()
+        # reads at most `limit + 1` bytes, a decompression bomb isn't expanded in memory
+        content: bytes = gzip.GzipFile(fileobj=stream).read(-1 if limit is None else limit + 1)
+        if limit is not None and len(content) > limit:
+            raise ParseError(f"Decompressed body exceeds {limit} bytes")
+        return io.BytesIO(content)
+
+    def parse(self, stream: Optional[IO], media_type: Optional[str] = None, parser_context=None) -> Any:
+        request = (parser_context or {}).get("request")
+        encoding = request.META.get("HTTP_CONTENT_ENCODING", "").strip().lower() if request else ""
+        if encoding in ("", "identity") or stream is None:
+            return super().parse(stream, media_type, parser_context)
+        if encoding != "gzip":
+            raise ParseError(f"Unsupported Content-Encoding: {encoding}")
+        try:
+            stream = self.decompress(stream)
+        except (OSError, EOFError, zlib.error) as e:
+            raise ParseError(f"Content decompression error - {e}")
+        return super().parse(stream, media_type, parser_context)
+
+
+class CodecParser(parsers.BaseParser):
+    codec_class: type = Codec
+
+    def __init__(self):
+        self.codec: Codec = self.codec_class()
+
+    def parse(self, stream: Optional[IO], media_type: Optional[str] = None, parser_context=None) -> Any:
+        content: bytes = stream.read() if stream is not None else b""
+        try:
+            return self.codec.decode(content)
+        except self.codec.decode_errors as e:
+            raise ParseError(f"{self.media_type} parse error - {e}")
+
+
+class JSONParser(DecompressMixin, parsers.JSONParser):
+    pass
+
+
+class MsgPackParser(DecompressMixin, CodecParser):
+    media_type = MsgPackCodec.media_type
+    codec_class = MsgPackCodec
+
+
+class CBORParser(DecompressMixin, CodecParser):
+    media_type = CBORCodec.media_type
+    codec_class = CBORCodec
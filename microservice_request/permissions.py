@@ -1,17 +1,85 @@
-from typing import TYPE_CHECKING
+import hashlib
+import hmac
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Optional, Tuple
 
 from django.conf import settings
+from django.test.signals import setting_changed
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.settings import api_settings
 
 if TYPE_CHECKING:
     from rest_framework.request import Request
     from rest_framework.views import APIView
 
 
+def _digest(key: str) -> bytes:
+    return hashlib.sha256(key.encode()).digest()
+
+
+@lru_cache(maxsize=None)
+def get_api_key_digests() -> Tuple[bytes, ...]:
+    """Digests of active keys: `API_KEYS` setting (for rotation) and `API_KEY`"""
+    keys = [*getattr(settings, "API_KEYS", ()), getattr(settings, "API_KEY", None)]
+    return tuple(dict.fromkeys(_digest(key) for key in keys if key))
+
+
+def verify_api_key(key: str) -> bool:
+    """Compares with every active key in constant time"""
+    digest: bytes = _digest(key)
+    matched: bool = False
+    for active in get_api_key_digests():
+        matched |= hmac.compare_digest(digest, active)
+    return matched
+
+
+def reset_api_keys(*, setting: str, **kwargs) -> None:
+    if setting in ("API_KEY", "API_KEYS"):
+        get_api_key_digests.cache_clear()
+
+
+setting_changed.connect(reset_api_keys)
+
+
+def get_api_key(request: "Request") -> Optional[str]:
+    """Key of `Authorization: <API_KEY_HEADER> <key>` header"""
+    scheme, _, key = request.headers.get("Authorization", "").partition(" ")
+    if scheme and scheme == settings.API_KEY_HEADER:
+        return key.strip()
+    return None
+
+
+class ApiKeyAuthentication(BaseAuthentication):
+    """Authenticates service-to-service requests with `API_KEY_HEADER` scheme by the key.
+
+    Put it first in `authentication_classes`: DRF authenticates before permission checks, so other
+    authenticators would load the user (session, token) for requests which carry the key.
+    `request.user` is `UNAUTHENTICATED_USER` (`AnonymousUser`) and `request.auth` is the key.
+    """
+
+    def authenticate(self, request: "Request") -> Optional[Tuple[Any, str]]:
+        if (key := get_api_key(request)) is None:
+            return None
+        if not key or not verify_api_key(key):
+            raise AuthenticationFailed("Invalid API key.")
+        return api_settings.UNAUTHENTICATED_USER(), key
+
+
 class HasApiKeyOrIsAuthenticated(IsAuthenticated):
+    """Service-to-service requests with `API_KEY_HEADER` scheme are verified by the key only,
+    with `ApiKeyAuthentication` `request.user` isn't resolved for them
+    """
+
+    get_api_key = staticmethod(get_api_key)
+
+    @classmethod
+    def has_api_key(cls, request: "Request") -> bool:
+        """Checks `Authorization` header only, doesn't touch `request.user`"""
+        return bool(key := cls.get_api_key(request)) and verify_api_key(key)
+
     def has_permission(self, request: "Request", view: "APIView") -> bool:
-        if key := request.headers.get("Authorization"):
-            token: list = key.split(" ")
-            if token[0] == settings.API_KEY_HEADER and token[1] == settings.API_KEY:
-                return True
+        if self.get_api_key(request) is not None:
+            return self.has_api_key(request)
         return super().has_permission(request, view)
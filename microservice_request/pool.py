@@ -0,0 +1,266 @@
+import asyncio
+import threading
+import time
+import weakref
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+from django.core.exceptions import ImproperlyConfigured
+from requests import Session
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+
+from .transport import HTTP2Adapter, RejectCookiePolicy
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+if TYPE_CHECKING:
+    from httpx import AsyncClient
+    from requests import Response
+
+SessionFactory = Callable[[], Session]
+
+
+class PoolOptions(NamedTuple):
+    pool_connections: int = 10
+    pool_maxsize: int = 10
+    pool_block: bool = False
+    idle_timeout: Optional[float] = None
+    # urllib3/httpx connect retries, disabled when a service has its own `RetryPolicy`
+    transport_retries: bool = True
+    # multiplex requests over HTTP/2 connections, see `HTTP2Adapter`
+    http2: bool = False
+
+
+class _PoolEntry:
+    __slots__ = ("session", "last_used", "users", "retired")
+
+    def __init__(self, session: Session):
+        self.session: Session = session
+        self.last_used: float = time.monotonic()
+        # requests sent with the session and not finished yet
+        self.users: int = 0
+        # replaced in the registry, closed when the last user is done
+        self.retired: bool = False
+
+
+def get_origin(url: Optional[str]) -> str:
+    """Return `scheme://host:port` part of url, used as pool key"""
+    if not url:
+        return ""
+    parts = urlsplit(str(url))
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+class SessionRegistry:
+    """Process-wide, thread-safe storage of pooled sessions keyed by upstream origin.
+
+    Each origin gets one `requests.Session`, so keep-alive connections are reused between
+    `ConnectionService` instances. A session which was not used longer than `idle_timeout`
+    is closed and replaced with a new one on the next access, a session with requests in flight
+    (see `send`) is never closed. Cookies are not persisted between requests.
+
+    `factory` creates sessions instead of `create_session`, sessions of different factories
+    (e.g. `HostService.session_request` overrides) are pooled separately.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, PoolOptions, Any], _PoolEntry] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(url: Optional[str], options: PoolOptions, factory: Optional[SessionFactory]) -> tuple:
+        # bound methods of different instances share the function
+        return get_origin(url), options, getattr(factory, "__func__", factory)
+
+    def _get_entry(
+        self, url: Optional[str], options: PoolOptions, factory: Optional[SessionFactory] = None
+    ) -> _PoolEntry:
+        key = self._key(url, options, factory)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is None or self._is_expired(entry, options, now):
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is None or self._is_expired(entry, options, now):
+                    if entry is not None:
+                        entry.session.close()
+                    session = factory() if factory is not None else self.create_session(options)
+                    entry = self._entries[key] = _PoolEntry(session)
+        entry.last_used = now
+        return entry
+
+    def get_session(
+        self,
+        url: Optional[str],
+        options: PoolOptions = PoolOptions(),
+        factory: Optional[SessionFactory] = None,
+    ) -> Session:
+        return self._get_entry(url, options, factory).session
+
+    def send(
+        self,
+        method: str,
+        url: str,
+        options: PoolOptions = PoolOptions(),
+        factory: Optional[SessionFactory] = None,
+        **kwargs,
+    ) -> "Response":
+        """Send a request with the pooled session, which is kept open until the response is closed"""
+        entry = self._acquire(url, options, factory)
+        try:
+            response = entry.session.request(method=method, url=url, **kwargs)
+        except BaseException:
+            self._release(entry)
+            raise
+        if not kwargs.get("stream"):
+            self._release(entry)
+            return response
+        close, released = response.close, []
+
+        def close_and_release() -> None:
+            try:
+                close()
+            finally:
+                if not released:
+                    released.append(True)
+                    self._release(entry)
+
+        response.close = close_and_release
+        return response
+
+    def _acquire(
+        self, url: Optional[str], options: PoolOptions, factory: Optional[SessionFactory] = None
+    ) -> _PoolEntry:
+        while True:
+            entry = self._get_entry(url, options, factory)
+            with self._lock:
+                # the entry could be evicted between lookup and lock
+                if self._entries.get(self._key(url, options, factory)) is entry:
+                    entry.users += 1
+                    return entry
+
+    def _release(self, entry: _PoolEntry) -> None:
+        with self._lock:
+            entry.users -= 1
+            entry.last_used = time.monotonic()
+            if entry.retired and entry.users <= 0:
+                entry.session.close()
+
+    @staticmethod
+    def _is_expired(entry: _PoolEntry, options: PoolOptions, now: float) -> bool:
+        return (
+            options.idle_timeout is not None
+            and entry.users <= 0
+            and now - entry.last_used > options.idle_timeout
+        )
+
+    @staticmethod
+    def create_session(options: PoolOptions) -> Session:
+        session = Session()
+        session.cookies.set_policy(RejectCookiePolicy())
+        if options.http2:
+            adapter = HTTP2Adapter(options)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            return session
+        retry = Retry(connect=3, backoff_factor=0.5) if options.transport_retries else Retry(0, read=False)
+        adapter = HTTPAdapter(
+            pool_connections=options.pool_connections,
+            pool_maxsize=options.pool_maxsize,
+            pool_block=options.pool_block,
+            max_retries=retry,
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def evict_idle(self) -> int:
+        """Close sessions which exceeded their idle timeout. Returns number of closed sessions"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, entry in self._entries.items() if self._is_expired(entry, key[1], now)]
+            for key in expired:
+                self._entries.pop(key).session.close()
+        return len(expired)
+
+    def pool_stats(self) -> Iterator[Tuple[str, int, int]]:
+        """Yield `(origin, connections in use, pool size)` of every connection pool"""
+        for (origin, *_), entry in list(self._entries.items()):
+            for adapter in set(entry.session.adapters.values()):
+                if not hasattr(adapter, "poolmanager"):
+                    continue
+                for pool_key in adapter.poolmanager.pools.keys():
+                    if (pool := adapter.poolmanager.pools.get(pool_key)) is None or pool.pool is None:
+                        continue
+                    yield origin, pool.pool.maxsize - pool.pool.qsize(), pool.pool.maxsize
+
+    def clear(self) -> None:
+        with self._lock:
+            for entry in self._entries.values():
+                self._retire(entry)
+            self._entries.clear()
+
+    @staticmethod
+    def _retire(entry: _PoolEntry) -> None:
+        entry.retired = True
+        if entry.users <= 0:
+            entry.session.close()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class AsyncClientRegistry:
+    """Pooled `httpx.AsyncClient` per upstream origin.
+
+    Async clients can't be shared between event loops, so clients are stored per running loop
+    and dropped together with it.
+    """
+
+    def __init__(self):
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+
+    def get_client(self, url: Optional[str], options: PoolOptions = PoolOptions()) -> "AsyncClient":
+        loop = asyncio.get_running_loop()
+        clients = self._loops.get(loop)
+        if clients is None:
+            with self._lock:
+                clients = self._loops.setdefault(loop, {})
+        key = (get_origin(url), options)
+        if (client := clients.get(key)) is None or client.is_closed:
+            client = clients[key] = self.create_client(options)
+        return client
+
+    @staticmethod
+    def create_client(options: PoolOptions) -> "AsyncClient":
+        if httpx is None:
+            raise ImproperlyConfigured("Async requests require 'httpx' package: pip install httpx")
+        limits = httpx.Limits(
+            max_connections=options.pool_maxsize,
+            max_keepalive_connections=options.pool_connections,
+            keepalive_expiry=options.idle_timeout,
+        )
+        client = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(
+                http2=options.http2, retries=3 if options.transport_retries else 0, limits=limits
+            )
+        )
+        client.cookies.jar.set_policy(RejectCookiePolicy())
+        return client
+
+    async def aclose(self) -> None:
+        """Close clients of the running event loop, e.g. on ASGI lifespan shutdown"""
+        clients = self._loops.pop(asyncio.get_running_loop(), {})
+        for client in clients.values():
+            await client.aclose()
+
+
+session_registry = SessionRegistry()
+async_client_registry = AsyncClientRegistry()
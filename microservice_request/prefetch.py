@@ -0,0 +1,178 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from asgiref.sync import sync_to_async
+from rest_framework import status
+
+from .exceptions import MicroserviceException
+
+logger = logging.getLogger(__name__)
+
+_UNSET = object()
+
+
+class PrefetchedResource:
+    """Upstream GET resource kept warm in memory and refreshed in background every `interval` seconds.
+
+    Readers get the last fetched value without a request, a failed refresh keeps the last known good
+    value and is retried after `retry_interval` seconds. Only the first read fetches synchronously,
+    `prefetcher.start()` warms resources in advance. The value is shared, don't mutate it.
+
+    Usage:
+        class ConfigService(ConnectionService):
+            service = "http://config:8000"
+            features = PrefetchedResource("/api/v1/features/", interval=30)
+
+        ConfigService.features.get()
+    """
+
+    def __init__(
+        self,
+        path: str = "",
+        interval: float = 60,
+        params: Optional[dict] = None,
+        retry_interval: float = 5,
+    ):
+        self.path = path
+        self.interval = interval
+        self.params = params
+        self.retry_interval = retry_interval
+        self.owner: Optional[type] = None
+        self.name: Optional[str] = None
+        self.updated_at: Optional[float] = None
+        self.next_refresh: float = 0.0
+        self.last_error: Optional[Exception] = None
+        self._value: Any = _UNSET
+        self._lock = threading.Lock()
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.owner = owner
+        self.name = f"{owner.__qualname__}.{name}"
+
+    def fetch(self) -> Any:
+        """GET the resource from the upstream, `response_cache` of the service is bypassed"""
+        service = self.owner(self.path)
+        service.response_cache = None
+        response = service.request_to_service("get", params=self.params)
+        status_code: Optional[int] = getattr(response, "status_code", None)
+        if not status_code or not status.is_success(status_code):
+            raise MicroserviceException(f"{self.name} refresh failed: {status_code}")
+        return service._response(response)
+
+    def refresh(self) -> bool:
+        """Fetch the resource now, keep the last known good value on failure"""
+        try:
+            value = self.fetch()
+        except Exception as e:
+            logger.warning(f"Prefetch of {self.name} failed: {e}")
+            self.last_error = e
+            self.next_refresh = time.monotonic() + min(self.retry_interval, self.interval)
+            return False
+        self._value, self.last_error = value, None
+        self.updated_at = time.monotonic()
+        self.next_refresh = self.updated_at + self.interval
+        return True
+
+    @property
+    def is_ready(self) -> bool:
+        return self._value is not _UNSET
+
+    @property
+    def age(self) -> Optional[float]:
+        return None if self.updated_at is None else time.monotonic() - self.updated_at
+
+    def _backing_off(self) -> bool:
+        return self.last_error is not None and time.monotonic() < self.next_refresh
+
+    def get(self, default: Any = None) -> Any:
+        """Value in memory. Never fetched one is fetched now, unless the last try failed less than
+        `retry_interval` seconds ago: then `default` is returned without waiting for the upstream
+        """
+        if self._value is _UNSET and not self._backing_off():
+            with self._lock:
+                if self._value is _UNSET and not self._backing_off():
+                    self.refresh()
+            prefetcher.register(self)
+        return default if self._value is _UNSET else self._value
+
+    async def aget(self, default: Any = None) -> Any:
+        if self._value is _UNSET and not self._backing_off():
+            return await sync_to_async(self.get, thread_sensitive=False)(default)
+        return default if self._value is _UNSET else self._value
+
+
+class Prefetcher:
+    """Background thread which refreshes registered resources when they are due"""
+
+    def __init__(self):
+        self._resources: Dict[int, PrefetchedResource] = {}
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._stopped: bool = False
+        self._changed: bool = False
+
+    @property
+    def resources(self) -> List[PrefetchedResource]:
+        return list(self._resources.values())
+
+    def register(self, *resources: PrefetchedResource) -> None:
+        with self._condition:
+            for resource in resources:
+                self._resources[id(resource)] = resource
+            self._changed = True
+            self._condition.notify()
+        self._ensure_running()
+
+    def start(self, *resources: PrefetchedResource) -> None:
+        """Fetch `resources` now and keep them refreshed, e.g. in `AppConfig.ready`"""
+        for resource in resources:
+            resource.refresh()
+        self.register(*resources)
+
+    def _ensure_running(self) -> None:
+        # a forked worker doesn't inherit the thread
+        with self._condition:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._stopped = False
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name="microservice-request-prefetch", daemon=True
+            )
+            self._thread.start()
+
+    def refresh_due(self) -> Optional[float]:
+        """Refresh resources which are due. Returns seconds until the next one is due"""
+        for resource in self.resources:
+            if resource.next_refresh <= time.monotonic():
+                resource.refresh()
+        if not self._resources:
+            return None
+        return max(min(resource.next_refresh for resource in self.resources) - time.monotonic(), 0.0)
+
+    def _run(self) -> None:
+        while True:
+            timeout = self.refresh_due()
+            with self._condition:
+                # resources registered during the refresh are picked up without waiting
+                if not self._changed and not self._stopped:
+                    self._condition.wait(timeout)
+                if self._stopped:
+                    return
+                self._changed = False
+
+    def stop(self) -> None:
+        with self._condition:
+            self._stopped = True
+            self._resources.clear()
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+prefetcher = Prefetcher()
@@ -0,0 +1,214 @@
+import asyncio
+import copy
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .deadline import get_remaining
+from .exceptions import RateLimitExceeded
+
+RATE_LIMIT_STATUS_CODE: int = getattr(settings, "REQUEST_RATE_LIMIT_STATUS_CODE", 429)
+
+# how often a queued call checks for a free in-flight slot
+SLOT_POLL_INTERVAL: float = 0.005
+
+
+class BaseRateLimitBackend:
+    def take_token(self, key: str, rate: float, burst: int) -> float:
+        """Take a token of the bucket. Returns 0 or seconds to wait for the next token"""
+        raise NotImplementedError
+
+    def acquire_slot(self, key: str, max_in_flight: int) -> bool:
+        raise NotImplementedError
+
+    def release_slot(self, key: str) -> None:
+        raise NotImplementedError
+
+
+class LocalRateLimitBackend(BaseRateLimitBackend):
+    """Limits of the current process"""
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._slots: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def take_token(self, key: str, rate: float, burst: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return 0.0
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) / rate
+
+    def acquire_slot(self, key: str, max_in_flight: int) -> bool:
+        with self._lock:
+            if self._slots.get(key, 0) >= max_in_flight:
+                return False
+            self._slots[key] = self._slots.get(key, 0) + 1
+            return True
+
+    def release_slot(self, key: str) -> None:
+        with self._lock:
+            self._slots[key] = max(self._slots.get(key, 0) - 1, 0)
+
+
+class DjangoCacheRateLimitBackend(BaseRateLimitBackend):
+    """Limits shared between processes through the Django cache framework (e.g. Redis).
+
+    The cache has no compare-and-set, so the bucket is approximated with windows of `burst / rate`
+    seconds holding `burst` tokens. In-flight counters expire `slot_timeout` seconds after the last
+    acquire, so slots of a crashed process are not lost forever.
+    """
+
+    def __init__(self, alias: str = "default", slot_timeout: float = 60):
+        self.alias = alias
+        self.slot_timeout = slot_timeout
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _incr(self, key: str, timeout: float) -> int:
+        if self.cache.add(key, 1, timeout):
+            return 1
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            self.cache.set(key, 1, timeout)
+            return 1
+
+    def take_token(self, key: str, rate: float, burst: int) -> float:
+        window = burst / rate
+        now = time.time()
+        window_id = int(now // window)
+        if self._incr(f"{key}:{window_id}", window * 2) <= burst:
+            return 0.0
+        return (window_id + 1) * window - now
+
+    def acquire_slot(self, key: str, max_in_flight: int) -> bool:
+        acquired: bool = self._incr(key, self.slot_timeout) <= max_in_flight
+        # the counter lives while it is in use, not `slot_timeout` after it was created
+        self.cache.touch(key, self.slot_timeout)
+        if not acquired:
+            self.release_slot(key)
+        return acquired
+
+    def release_slot(self, key: str) -> None:
+        try:
+            if self.cache.decr(key) < 0:
+                # the counter expired while calls were in flight
+                self.cache.incr(key)
+        except ValueError:
+            pass
+
+
+class RateLimiter:
+    """Limits calls to an upstream: `rate` requests per second with bursts up to `burst` requests and
+    `max_in_flight` concurrent requests.
+
+    A call over the limit waits for up to `timeout` seconds (`0` fails fast), then the service responds
+    with `status_code` without calling the upstream. Limits are per process unless `backend` is shared.
+
+    Usage:
+        class ReportService(ConnectionService):
+            rate_limiter = RateLimiter(rate=50, max_in_flight=10, timeout=1)
+    """
+
+    key_prefix: str = "microservice_request:ratelimit"
+
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        burst: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        timeout: float = 0.0,
+        status_code: int = RATE_LIMIT_STATUS_CODE,
+        name: Optional[str] = None,
+        backend: Optional[BaseRateLimitBackend] = None,
+    ):
+        self.rate = rate
+        self.burst = burst or max(int(rate or 1), 1)
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.status_code = status_code
+        self.name = name
+        self.backend = backend or LocalRateLimitBackend()
+
+    def limiter(self, name: str) -> "RateLimiter":
+        """Limiter with the same settings and backend, its limits are kept under `name`"""
+        limiter = copy.copy(self)
+        limiter.name = name
+        return limiter
+
+    def _key(self, suffix: str) -> str:
+        return f"{self.key_prefix}:{self.name}:{suffix}"
+
+    def _deadline(self) -> float:
+        """Waiting doesn't outlive the request deadline"""
+        timeout = self.timeout
+        if (remaining := get_remaining()) is not None:
+            timeout = min(timeout, remaining)
+        return time.monotonic() + timeout
+
+    def _reject(self, reason: str) -> RateLimitExceeded:
+        return RateLimitExceeded(
+            f"Rate limit of '{self.name}' exceeded: {reason}", status_code=self.status_code
+        )
+
+    def _token_wait(self, deadline: float) -> float:
+        """0 when a token is taken, otherwise seconds to wait for it"""
+        if self.rate is None:
+            return 0.0
+        wait = self.backend.take_token(self._key("tokens"), self.rate, self.burst)
+        if wait and time.monotonic() + wait > deadline:
+            raise self._reject(f"{self.rate} requests per second")
+        return wait
+
+    def _slot_wait(self, deadline: float) -> float:
+        """0 when an in-flight slot is taken, otherwise seconds to wait before the next try"""
+        if self.max_in_flight is None or self.backend.acquire_slot(
+            self._key("in_flight"), self.max_in_flight
+        ):
+            return 0.0
+        if time.monotonic() + SLOT_POLL_INTERVAL > deadline:
+            raise self._reject(f"{self.max_in_flight} requests in flight")
+        return SLOT_POLL_INTERVAL
+
+    def acquire(self) -> None:
+        deadline = self._deadline()
+        while wait := self._token_wait(deadline):
+            time.sleep(wait)
+        while wait := self._slot_wait(deadline):
+            time.sleep(wait)
+
+    async def aacquire(self) -> None:
+        deadline = self._deadline()
+        while wait := self._token_wait(deadline):
+            await asyncio.sleep(wait)
+        while wait := self._slot_wait(deadline):
+            await asyncio.sleep(wait)
+
+    def release(self) -> None:
+        if self.max_in_flight is not None:
+            self.backend.release_slot(self._key("in_flight"))
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        self.acquire()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.release()
+
+    async def acall(self, func: Callable[..., Awaitable], *args, **kwargs) -> Any:
+        await self.aacquire()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            self.release()
@@ -0,0 +1,31 @@
+from typing import Any, Optional
+
+from rest_framework.renderers import BaseRenderer
+
+from .encoding import CBORCodec, Codec, MsgPackCodec
+
+
+class CodecRenderer(BaseRenderer):
+    codec_class: type = Codec
+    charset = None
+    render_style = "binary"
+
+    def __init__(self):
+        self.codec: Codec = self.codec_class()
+
+    def render(self, data: Any, accepted_media_type: Optional[str] = None, renderer_context=None) -> bytes:
+        if data is None:
+            return b""
+        return self.codec.encode(data)
+
+
+class MsgPackRenderer(CodecRenderer):
+    media_type = MsgPackCodec.media_type
+    format = "msgpack"
+    codec_class = MsgPackCodec
+
+
+class CBORRenderer(CodecRenderer):
+    media_type = CBORCodec.media_type
+    format = "cbor"
+    codec_class = CBORCodec
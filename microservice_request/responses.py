@@ -0,0 +1,75 @@
+from typing import Any, Callable, Mapping, Optional
+
+from django.http import HttpResponse
+from django.utils.functional import cached_property
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.response import Response
+
+_UNSET = object()
+
+
+class RawResponse(HttpResponse):
+    """Upstream body sent to the client as is, without decode/re-render round trip.
+
+    `data` decodes the body on the first access only.
+    """
+
+    def __init__(self, content: bytes, decoder: Callable[[], Any], *args, **kwargs):
+        super().__init__(content, *args, **kwargs)
+        self._decoder = decoder
+
+    @cached_property
+    def data(self) -> Any:
+        return self._decoder()
+
+
+class LazyResponse(Response):
+    """DRF response which decodes upstream body on the first `data` access.
+
+    If `data` was never accessed and the stock `JSONRenderer` is selected, upstream JSON body is sent as is.
+    Subclasses of it may change the output (camelCase, envelopes), so they render decoded data unless they
+    opt in with `upstream_passthrough = True`. `passthrough_headers` (body validators, e.g. `ETag`) are set
+    only when the upstream body is sent as is.
+    """
+
+    @staticmethod
+    def is_passthrough(renderer: BaseRenderer) -> bool:
+        return type(renderer) is JSONRenderer or getattr(renderer, "upstream_passthrough", False)
+
+    def __init__(
+        self,
+        content: bytes,
+        decoder: Callable[[], Any],
+        *args,
+        passthrough_headers: Optional[Mapping[str, str]] = None,
+        **kwargs,
+    ):
+        self._content = content
+        self._decoder = decoder
+        self.passthrough_headers: Mapping[str, str] = passthrough_headers or {}
+        super().__init__(None, *args, **kwargs)
+        self._data = _UNSET
+
+    @property
+    def data(self) -> Any:
+        if self._data is _UNSET:
+            self._data = self._decoder()
+        return self._data
+
+    @data.setter
+    def data(self, value: Any) -> None:
+        self._data = value
+
+    @property
+    def is_decoded(self) -> bool:
+        return self._data is not _UNSET
+
+    @property
+    def rendered_content(self) -> Optional[bytes]:
+        renderer = getattr(self, "accepted_renderer", None)
+        if self.is_decoded or renderer is None or not self.is_passthrough(renderer) or not self._content:
+            return super().rendered_content
+        self["Content-Type"] = self.content_type or renderer.media_type
+        for name, value in self.passthrough_headers.items():
+            self[name] = value
+        return self._content
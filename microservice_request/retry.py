@@ -0,0 +1,230 @@
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional, Sequence, Tuple
+
+from django.conf import settings
+from requests.exceptions import ConnectionError, ConnectTimeout, Timeout
+from urllib3.exceptions import ConnectTimeoutError
+
+from .deadline import get_remaining
+from .exceptions import CoalescedRequestTimeout, DeadlineExceeded
+from .pool import get_origin
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+IDEMPOTENCY_KEY_HEADER: str = getattr(settings, "REQUEST_IDEMPOTENCY_KEY_HEADER", "Idempotency-Key")
+
+IDEMPOTENT_METHODS = frozenset(("get", "head", "options", "put", "delete", "trace"))
+
+TRANSIENT_ERRORS: Tuple[type, ...] = (ConnectionError, Timeout) + ((httpx.TransportError,) if httpx else ())
+
+CONNECT_ERRORS: Tuple[type, ...] = (ConnectTimeout,) + (
+    (httpx.ConnectError, httpx.ConnectTimeout) if httpx else ()
+)
+
+# raised by the library itself, repeating the request doesn't help
+NOT_RETRYABLE_ERRORS = (DeadlineExceeded, CoalescedRequestTimeout)
+
+OnRetry = Callable[[int, float, Any], None]
+
+
+def is_connect_error(error: Exception) -> bool:
+    """Connection wasn't established, so the request didn't reach the upstream"""
+    if isinstance(error, CONNECT_ERRORS):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(error, ConnectionError) and isinstance(reason, ConnectTimeoutError)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from `Retry-After` header, which holds seconds or an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryBudget:
+    """Token bucket which limits retries to an upstream.
+
+    Every request deposits `ratio` of a token and every retry withdraws one, so retries stay under
+    `ratio` of the traffic. `min_per_second` tokens are added over time to allow retries of rare requests.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 1.0, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._tokens: float = max_tokens
+        self._updated: float = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, amount: float) -> None:
+        now = time.monotonic()
+        amount += (now - self._updated) * self.min_per_second
+        self._tokens = min(self.max_tokens, self._tokens + amount)
+        self._updated = now
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._refill(self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            self._refill(0)
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    @property
+    def tokens(self) -> float:
+        with self._lock:
+            self._refill(0)
+            return self._tokens
+
+
+class RetryPolicy:
+    """Per-service retries with decorrelated jitter backoff, `Retry-After` support and retry budget.
+
+    Transient errors and `retry_statuses` are retried for idempotent methods and for requests with
+    idempotency key header only. Connection errors are retried for any method, the request didn't
+    reach the upstream. Retry budget is shared by all services calling the same upstream.
+
+    Usage:
+        class UserService(ConnectionService):
+            retry_policy = RetryPolicy(max_attempts=3)
+    """
+
+    _budgets: Dict[str, RetryBudget] = {}
+    _budgets_lock = threading.Lock()
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 0.05,
+        max_delay: float = 2.0,
+        retry_statuses: Sequence[int] = (429, 502, 503, 504),
+        respect_retry_after: bool = True,
+        budget_ratio: float = 0.2,
+        budget_min_per_second: float = 1.0,
+        idempotent_methods: frozenset = IDEMPOTENT_METHODS,
+        idempotency_header: str = IDEMPOTENCY_KEY_HEADER,
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_statuses = frozenset(retry_statuses)
+        self.respect_retry_after = respect_retry_after
+        self.budget_ratio = budget_ratio
+        self.budget_min_per_second = budget_min_per_second
+        self.idempotent_methods = idempotent_methods
+        self.idempotency_header = idempotency_header
+
+    def get_budget(self, url: Optional[str]) -> RetryBudget:
+        origin = get_origin(url)
+        if (budget := self._budgets.get(origin)) is None:
+            with self._budgets_lock:
+                budget = self._budgets.setdefault(
+                    origin, RetryBudget(self.budget_ratio, self.budget_min_per_second)
+                )
+        return budget
+
+    def is_idempotent(self, method: str, headers: Optional[Mapping[str, str]] = None) -> bool:
+        if method.lower() in self.idempotent_methods:
+            return True
+        return bool(headers) and any(name.lower() == self.idempotency_header.lower() for name in headers)
+
+    def backoff(self, previous: float) -> float:
+        """Decorrelated jitter: random delay between base delay and three times the previous one"""
+        return min(self.max_delay, random.uniform(self.base_delay, max(previous, self.base_delay) * 3))
+
+    def _retry_delay(
+        self, response: Any, error: Optional[Exception], idempotent: bool, previous: float
+    ) -> Optional[float]:
+        """Delay before the next attempt or None if the result must be returned as is"""
+        if error is not None:
+            if isinstance(error, NOT_RETRYABLE_ERRORS) or not isinstance(error, TRANSIENT_ERRORS):
+                return None
+            if not idempotent and not is_connect_error(error):
+                return None
+        elif not idempotent or getattr(response, "status_code", None) not in self.retry_statuses:
+            return None
+        delay = self.backoff(previous)
+        if error is None and self.respect_retry_after:
+            if (retry_after := parse_retry_after(response.headers.get("Retry-After"))) is not None:
+                if retry_after > self.max_delay:
+                    return None
+                delay = retry_after
+        if (remaining := get_remaining()) is not None and delay >= remaining:
+            return None
+        return delay
+
+    def _should_retry(self, attempt: int, budget: RetryBudget, delay: Optional[float]) -> bool:
+        return attempt < self.max_attempts and delay is not None and budget.withdraw()
+
+    def call(
+        self,
+        url: Optional[str],
+        func: Callable[[], Any],
+        idempotent: bool,
+        on_retry: Optional[OnRetry] = None,
+    ) -> Any:
+        budget, delay = self.get_budget(url), 0.0
+        budget.deposit()
+        for attempt in range(1, self.max_attempts + 1):
+            response, error = None, None
+            try:
+                response = func()
+            except Exception as e:
+                error = e
+            delay = self._retry_delay(response, error, idempotent, delay)
+            if not self._should_retry(attempt, budget, delay):
+                break
+            if response is not None:
+                response.close()
+            if on_retry is not None:
+                on_retry(attempt, delay, error or response)
+            time.sleep(delay)
+        if error is not None:
+            raise error
+        return response
+
+    async def acall(
+        self,
+        url: Optional[str],
+        func: Callable[[], Awaitable[Any]],
+        idempotent: bool,
+        on_retry: Optional[OnRetry] = None,
+    ) -> Any:
+        budget, delay = self.get_budget(url), 0.0
+        budget.deposit()
+        for attempt in range(1, self.max_attempts + 1):
+            response, error = None, None
+            try:
+                response = await func()
+            except Exception as e:
+                error = e
+            delay = self._retry_delay(response, error, idempotent, delay)
+            if not self._should_retry(attempt, budget, delay):
+                break
+            if response is not None:
+                await response.aclose()
+            if on_retry is not None:
+                on_retry(attempt, delay, error or response)
+            await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return response
@@ -1,22 +1,60 @@
+import gzip
+import inspect
 import logging
-from json.decoder import JSONDecodeError
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
+import time
+from functools import partial
+from types import MappingProxyType
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Union,
+)
 from urllib.parse import urljoin
 
 from django.conf import settings
-from django.contrib.auth.models import AnonymousUser
+from django.http import StreamingHttpResponse
 from requests import Session
-from requests.adapters import HTTPAdapter
-from requests.packages.urllib3.util.retry import Retry
 from rest_framework import status
 from rest_framework.exceptions import MethodNotAllowed
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
 
-from .decorators import request_shell
-from .exceptions import MicroserviceException
+from .balancer import Endpoint, LoadBalancer
+from .cache import ResponseCache, request_fingerprint
+from .circuitbreaker import CircuitBreaker
+from .deadline import DEADLINE_HEADER, check_deadline, request_deadline
+from .decorators import arequest_shell, request_shell
+from .encoding import Codec, JSONCodec, get_codec, get_json_backend
+from .exceptions import EndpointUnavailable, MicroserviceException, RateLimitExceeded
+from .gather import agather_requests, gather_requests
+from .headers import BODY_VALIDATOR_HEADERS, DECODED_BODY_HEADERS, RENDERED_BODY_HEADERS, HeaderPolicy
+from .identity import aget_principal, get_principal
+from .loader import DataLoader, Pending, get_request_loader
+from .multipart import MultipartEncoder
+from .pool import PoolOptions, async_client_registry, get_origin, session_registry
+from .ratelimit import RateLimiter
+from .responses import LazyResponse, RawResponse
+from .retry import RetryPolicy
+from .signals import (
+    service_request_finished,
+    service_request_retried,
+    service_request_started,
+    service_response_built,
+)
+from .singleflight import single_flight
 
 if TYPE_CHECKING:
+    from httpx import AsyncClient
+    from httpx import Response as AsyncResponse
     from requests import Response as RequestResponse
 
 
@@ -26,32 +64,72 @@ JSONType = Union[str, int, float, bool, None, Dict[str, Any], List[Any]]
 
 
 class HostService:
-    def __init__(self):
-        self.session: Session = self.session_request()
+    """Gives access to the shared pooled session of the upstream `url` points to.
 
-    def session_request(self):
-        session = Session()
-        retry = Retry(connect=3, backoff_factor=0.5)
-        adapter = HTTPAdapter(max_retries=retry)
-        session.mount("http://", adapter)
-        session.mount("https://", adapter)
-        return session
+    Pooled sessions are created with `session_request`, override it to customise them.
+    """
+
+    def __init__(self, url: Optional[str] = None, options: PoolOptions = PoolOptions()):
+        self.url = url
+        self.options = options
+
+    @property
+    def session(self) -> Session:
+        return session_registry.get_session(self.url, self.options, self.session_request)
+
+    def request(self, method: str, **kwargs) -> "RequestResponse":
+        return session_registry.send(method, options=self.options, factory=self.session_request, **kwargs)
+
+    def session_request(self) -> Session:
+        return session_registry.create_session(self.options)
 
 
 class ConnectionService:
     lookup_prefix: str = ""
-    service: str = None
+    service: Union[str, Sequence[str], Callable[[], Sequence[str]], LoadBalancer] = None
+    balancing_strategy: str = LoadBalancer.ROUND_ROBIN
     url: str = ""
     api_header: str = getattr(settings, "API_KEY_HEADER", "ACCESS-KEY")
     api_key: str = ""
+    static_headers: dict = {}
     error_status_code: int = status.HTTP_500_INTERNAL_SERVER_ERROR
     http_method_names: list = ("get", "post", "put", "patch", "delete")
     additional_methods: list = ["send_file"]
     custom_methods: list = []
+    pool_connections: int = getattr(settings, "REQUEST_POOL_CONNECTIONS", 10)
+    pool_maxsize: int = getattr(settings, "REQUEST_POOL_MAXSIZE", 10)
+    pool_block: bool = getattr(settings, "REQUEST_POOL_BLOCK", False)
+    pool_idle_timeout: Optional[float] = getattr(settings, "REQUEST_POOL_IDLE_TIMEOUT", None)
+    http2: bool = getattr(settings, "REQUEST_HTTP2", False)
+    host_class: type = HostService
+    connect_timeout: Optional[float] = getattr(settings, "REQUEST_CONNECT_TIMEOUT", None)
+    read_timeout: Optional[float] = getattr(settings, "REQUEST_READ_TIMEOUT", None)
+    response_cache: Optional[ResponseCache] = None
+    coalesce_requests: bool = False
+    coalesce_methods: tuple = ("get",)
+    coalesce_timeout: Optional[float] = None
+    # headers which differ per call but don't change the response, not a part of the coalescing key
+    coalesce_ignored_headers: tuple = (DEADLINE_HEADER,)
+    circuit_breaker: Optional[CircuitBreaker] = None
+    rate_limiter: Optional[RateLimiter] = None
+    retry_policy: Optional[RetryPolicy] = None
+    raw_response: bool = False
+    stream_response: bool = False
+    stream_chunk_size: int = 64 * 1024
+    stream_upload: bool = getattr(settings, "REQUEST_STREAM_UPLOAD", False)
+    codec: Optional[Codec] = None
+    compress_request: bool = False
+    compress_min_size: int = 1024
+    lazy_decode: bool = False
+    header_policy: HeaderPolicy = HeaderPolicy()
+    max_batch_size: Optional[int] = None
 
     def __init__(self, url: str = None, **kwargs):
         self.special_headers: dict = kwargs.get("special_headers", {})
-        self.host = HostService()
+        self.endpoint: Optional[Endpoint] = None
+        self.endpoint_error: Optional[EndpointUnavailable] = None
+        self.upstream_duration: Optional[float] = None
+        self.rate_limit_error: Optional[RateLimitExceeded] = None
         self.set_url(url)
 
     @classmethod
@@ -59,6 +137,91 @@ class ConnectionService:
         service = cls(url, **kwargs)
         return service.service_response(method=method, **kwargs)
 
+    @staticmethod
+    def gather(
+        specs: Sequence[Sequence], timeout: Optional[float] = None
+    ) -> List[Optional["RequestResponse"]]:
+        """Call several services concurrently, each call gets a transport timeout of at most `timeout`.
+
+        Usage:
+            users, orders = ConnectionService.gather(
+                [
+                    (UserService("/api/v1/users/1/"), "get"),
+                    (OrderService("/api/v1/orders/"), "get", {"params": {"user": 1}}),
+                ],
+                timeout=2,
+            )
+        """
+        return gather_requests(specs, timeout)
+
+    @staticmethod
+    async def agather(
+        specs: Sequence[Sequence], timeout: Optional[float] = None
+    ) -> List[Optional["AsyncResponse"]]:
+        return await agather_requests(specs, timeout)
+
+    def batch_fetch(self, keys: List[Hashable]) -> Mapping[Hashable, Any]:
+        """Fetch items of `keys` with one upstream call, used by `load`
+
+        Usage:
+            class UserService(ConnectionService):
+                def batch_fetch(self, keys):
+                    response = self.request_to_service("get", params={"id__in": ",".join(map(str, keys))})
+                    return {user["id"]: user for user in response.json()}
+        """
+        raise NotImplementedError(f"{type(self).__name__}.batch_fetch is required to use load()")
+
+    async def abatch_fetch(self, keys: List[Hashable]) -> Mapping[Hashable, Any]:
+        """Async twin of `batch_fetch`, used by `aload`"""
+        raise NotImplementedError(f"{type(self).__name__}.abatch_fetch is required to use aload()")
+
+    @property
+    def loader(self) -> DataLoader:
+        """Loader of the service and url shared within the current request"""
+        return get_request_loader(
+            (type(self), self.url),
+            lambda: DataLoader(self.batch_fetch, self.abatch_fetch, self.max_batch_size),
+        )
+
+    def load(self, key: Hashable) -> Pending:
+        """Collect `key`, all collected keys are fetched together on the first `result()` call"""
+        return self.loader.load(key)
+
+    def load_many(self, keys: Iterable[Hashable]) -> List[Any]:
+        return self.loader.load_many(keys)
+
+    async def aload(self, key: Hashable) -> Any:
+        return await self.loader.aload(key)
+
+    async def aload_many(self, keys: Iterable[Hashable]) -> List[Any]:
+        return await self.loader.aload_many(keys)
+
+    @property
+    def pool_options(self) -> PoolOptions:
+        return PoolOptions(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block,
+            idle_timeout=self.pool_idle_timeout,
+            transport_retries=self.retry_policy is None,
+            http2=self.http2,
+        )
+
+    @property
+    def host(self) -> HostService:
+        """Host built from `host_class`, unless an instance was assigned to `host`"""
+        if (host := self.__dict__.get("_host")) is not None:
+            return host
+        return self.host_class(self.url, self.pool_options)
+
+    @host.setter
+    def host(self, value: HostService) -> None:
+        self._host = value
+
+    @property
+    def async_client(self) -> "AsyncClient":
+        return async_client_registry.get_client(self.url, self.pool_options)
+
     @property
     def get_method_names(self) -> list:
         return self.additional_methods + self.custom_methods
@@ -67,13 +230,66 @@ class ConnectionService:
     def authorization_header(self) -> dict:
         return {"Authorization": f"{self.api_header} {self.api_key}"}
 
+    @classmethod
+    def _has_static_headers(cls) -> bool:
+        """Base `authorization_header` and plain class attributes, not properties or other descriptors"""
+        if inspect.getattr_static(cls, "authorization_header") is not ConnectionService.authorization_header:
+            return False
+        return not any(
+            hasattr(type(inspect.getattr_static(cls, name)), "__get__")
+            for name in ("api_header", "api_key", "static_headers")
+        )
+
+    @classmethod
+    def get_static_headers(cls) -> Optional[Mapping[str, str]]:
+        """Authorization and `static_headers` built once per class and frozen.
+
+        `None` when they are computed per instance, e.g. `authorization_header` or `api_key` is overridden
+        with a property.
+        """
+        signature: tuple = (cls.api_header, cls.api_key, id(cls.static_headers))
+        cached = cls.__dict__.get("_static_headers_cache")
+        if cached is None or cached[0] != signature:
+            headers: Optional[Mapping[str, str]] = None
+            if cls._has_static_headers():
+                headers = MappingProxyType(
+                    {"Authorization": f"{cls.api_header} {cls.api_key}", **cls.static_headers}
+                )
+            cached = (signature, headers)
+            cls._static_headers_cache = cached
+        return cached[1]
+
+    @classmethod
+    def get_load_balancer(cls) -> Optional[LoadBalancer]:
+        """Balancer of `service` given as a list of endpoints or a resolver callable"""
+        service = cls.service
+        if isinstance(service, LoadBalancer):
+            return service
+        if service is None or isinstance(service, str):
+            return None
+        cached = cls.__dict__.get("_load_balancer_cache")
+        if cached is None or cached[0] is not service:
+            cached = (service, LoadBalancer(service, cls.balancing_strategy))
+            cls._load_balancer_cache = cached
+        return cached[1]
+
     def set_url(self, url: Optional[str]) -> str:
+        self.path = url
+        self.endpoint_error = None
+        service: Optional[str] = self.service
+        if (balancer := self.get_load_balancer()) is not None:
+            try:
+                self.endpoint = balancer.choose()
+                service = self.endpoint.url
+            except EndpointUnavailable as e:
+                # raised on send, so it's handled as any other request error
+                self.endpoint, self.endpoint_error, service = None, e, None
         if not url:
-            self.url = self.service
+            self.url = service
             return self.url
         elif url.startswith(self.lookup_prefix):
             url = url.replace(self.lookup_prefix, "", 1)
-        self.url = urljoin(self.service or "", url)
+        self.url = urljoin(service or "", url)
         return self.url
 
     @staticmethod
@@ -90,11 +306,48 @@ class ConnectionService:
 
     @property
     def headers(self) -> dict:
-        headers: dict = self.authorization_header
-        headers.update(self.special_headers if isinstance(self.special_headers, dict) else {})
-        headers.update(self.custom_headers())
+        return self._build_headers({})
+
+    def _build_headers(self, headers: dict) -> dict:
+        """Layer static and per-request headers on top of `headers`"""
+        if (
+            "api_header" in self.__dict__
+            or "api_key" in self.__dict__
+            or (static_headers := self.get_static_headers()) is None
+        ):
+            headers.update(self.authorization_header)
+            headers.update(self.static_headers)
+        else:
+            headers.update(static_headers)
+        if self.codec is not None:
+            headers["Accept"] = self.codec.accept
+        if (current_deadline := request_deadline.get()) is not None:
+            headers[DEADLINE_HEADER] = f"{current_deadline:.3f}"
+        if self.special_headers and isinstance(self.special_headers, dict):
+            headers.update(self.special_headers)
+        if type(self).custom_headers is not ConnectionService.custom_headers:
+            headers.update(self.custom_headers())
         return headers
 
+    def get_timeout(self) -> Optional[Union[float, tuple]]:
+        """`(connect, read)` timeouts, read timeout is cut down to the time left before the deadline"""
+        read_timeout: Optional[float] = self.read_timeout
+        if (remaining := check_deadline()) is not None:
+            read_timeout = remaining if read_timeout is None else min(read_timeout, remaining)
+        if self.connect_timeout is None and read_timeout is None:
+            return None
+        connect_timeout = self.connect_timeout
+        if connect_timeout is not None and read_timeout is not None:
+            connect_timeout = min(connect_timeout, read_timeout)
+        return connect_timeout, read_timeout
+
+    def get_async_timeout(self) -> Optional[tuple]:
+        """httpx `(connect, read, write, pool)` timeouts"""
+        if (timeout := self.get_timeout()) is None:
+            return None
+        connect_timeout, read_timeout = timeout
+        return connect_timeout, read_timeout, read_timeout, connect_timeout
+
     def http_method_not_allowed(self, method: str) -> None:
         logger.warning(
             f"Method Not Allowed: {method}. Add method to 'custom_methods' field",
@@ -105,27 +358,348 @@ class ConnectionService:
     def _request_params(self) -> dict:
         return dict(url=self.url, headers=self.headers)
 
+    @staticmethod
+    def _with_headers(params: dict, headers: Optional[dict]) -> dict:
+        """Add per-call `headers` to the service ones"""
+        if headers:
+            params["headers"] = {**params["headers"], **headers}
+        return params
+
+    def _encode_body(self, kwargs: dict, body_param: str = "data") -> dict:
+        """Encode `json` body with `codec` or JSON backend and gzip it with `compress_request`"""
+        if kwargs.get("json") is None:
+            return kwargs
+        if self.codec is None and not self.compress_request and get_json_backend().name == "json":
+            return kwargs
+        codec: Codec = self.codec or get_codec(JSONCodec.media_type)
+        body: bytes = codec.encode(kwargs.pop("json"))
+        headers: dict = {**(kwargs.get("headers") or {}), "Content-Type": codec.media_type}
+        if self.compress_request and len(body) >= self.compress_min_size:
+            body = gzip.compress(body, compresslevel=6)
+            headers["Content-Encoding"] = "gzip"
+        kwargs.update({"headers": headers, body_param: body})
+        return kwargs
+
+    def before_request(self, method: str) -> None:
+        """Hook called before request is sent"""
+        service_request_started.send(sender=type(self), service=self, method=method)
+
+    def after_request(self, method: str, response: Any, error: Optional[Exception], duration: float) -> None:
+        """Hook called when request finished or failed"""
+        service_request_finished.send(
+            sender=type(self), service=self, method=method, response=response, error=error, duration=duration
+        )
+
+    def on_retry(self, method: str, attempt: int, delay: float, reason: Any) -> None:
+        """Hook called before request is retried, `reason` is an error or a response"""
+        service_request_retried.send(
+            sender=type(self), service=self, method=method, attempt=attempt, delay=delay, reason=reason
+        )
+
+    def _retry(self, method: str, attempt: int, delay: float, reason: Any) -> None:
+        if self.endpoint is not None:
+            # next attempt goes to another endpoint
+            self.set_url(self.path)
+        self.on_retry(method, attempt, delay, reason)
+
+    def is_idempotent(self, method: str, headers: Optional[Mapping[str, str]] = None) -> bool:
+        """Safe methods and requests with idempotency key may be retried"""
+        if self.retry_policy.is_idempotent(method):
+            return True
+        return self.retry_policy.is_idempotent(method, {**self.headers, **(headers or {})})
+
+    @property
+    def circuit(self) -> Optional[CircuitBreaker]:
+        """Circuit of the service class (or breaker `name`) and the upstream origin, resolved per call"""
+        if (breaker := self.circuit_breaker) is None:
+            return None
+        return breaker.circuit(f"{breaker.name or type(self).__qualname__}:{get_origin(self.url)}")
+
+    @property
+    def limiter(self) -> Optional[RateLimiter]:
+        """Limiter of the service class (or limiter `name`), resolved per call"""
+        if (rate_limiter := self.rate_limiter) is None:
+            return None
+        return rate_limiter.limiter(rate_limiter.name or type(self).__qualname__)
+
+    def _acquire_endpoint(self) -> Optional[Endpoint]:
+        if self.endpoint_error is not None:
+            raise self.endpoint_error
+        if (endpoint := self.endpoint) is not None:
+            self.get_load_balancer().acquire(endpoint)
+        return endpoint
+
+    def _release_endpoint(
+        self, endpoint: Optional[Endpoint], response: Any, error: Any, duration: Optional[float]
+    ) -> None:
+        if endpoint is not None:
+            self.get_load_balancer().release(endpoint, response, error, duration)
+
+    def _guarded(self, method: str, func: Callable, *args, **kwargs) -> "RequestResponse":
+        if (limiter := self.limiter) is None:
+            return self._observed(method, func, *args, **kwargs)
+        self.rate_limit_error = None
+        try:
+            return limiter.call(self._observed, method, func, *args, **kwargs)
+        except RateLimitExceeded as e:
+            self.rate_limit_error = e
+            raise
+
+    async def _aguarded(self, method: str, func: Callable, *args, **kwargs) -> "AsyncResponse":
+        if (limiter := self.limiter) is None:
+            return await self._aobserved(method, func, *args, **kwargs)
+        self.rate_limit_error = None
+        try:
+            return await limiter.acall(self._aobserved, method, func, *args, **kwargs)
+        except RateLimitExceeded as e:
+            self.rate_limit_error = e
+            raise
+
+    def _observed(self, method: str, func: Callable, *args, **kwargs) -> "RequestResponse":
+        self.before_request(method)
+        endpoint: Optional[Endpoint] = self._acquire_endpoint()
+        started, response, error = time.perf_counter(), None, None
+        self.upstream_duration = None
+        try:
+            if (circuit := self.circuit) is not None:
+                response = circuit.call(func, *args, **kwargs)
+            else:
+                response = func(*args, **kwargs)
+            return response
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            duration: float = time.perf_counter() - started
+            # cached and coalesced responses don't tell anything about the endpoint latency
+            self._release_endpoint(endpoint, response, error, self.upstream_duration)
+            self.after_request(method, response, error, duration)
+
+    async def _aobserved(self, method: str, func: Callable, *args, **kwargs) -> "AsyncResponse":
+        self.before_request(method)
+        endpoint: Optional[Endpoint] = self._acquire_endpoint()
+        started, response, error = time.perf_counter(), None, None
+        try:
+            if (circuit := self.circuit) is not None:
+                response = await circuit.acall(func, *args, **kwargs)
+            else:
+                response = await func(*args, **kwargs)
+            return response
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            duration: float = time.perf_counter() - started
+            self._release_endpoint(endpoint, response, error, duration)
+            self.after_request(method, response, error, duration)
+
     @request_shell
     def _method(self, method: str, **kwargs) -> Optional["RequestResponse"]:
-        return self.host.session.request(method=method, **self._request_params(), **kwargs)
+        kwargs = self._encode_body(kwargs)
+        if self.retry_policy is None:
+            return self._attempt(method, **kwargs)
+        return self.retry_policy.call(
+            self.url,
+            partial(self._attempt, method, **kwargs),
+            self.is_idempotent(method, kwargs.get("headers")),
+            partial(self._retry, method),
+        )
+
+    def _attempt(self, method: str, **kwargs) -> "RequestResponse":
+        if (timeout := self.get_timeout()) is not None:
+            kwargs.setdefault("timeout", timeout)
+        return self._guarded(method, self._dispatch, method, **kwargs)
+
+    def _dispatch(self, method: str, **kwargs) -> "RequestResponse":
+        if self.coalesce_requests and method in self.coalesce_methods and not kwargs.get("stream"):
+            return self._coalesced_method(method, **kwargs)
+        return self._send(method, **kwargs)
+
+    def _send(self, method: str, **kwargs) -> "RequestResponse":
+        if method == "get" and self.response_cache is not None and not kwargs.get("stream"):
+            return self._cached_get(**kwargs)
+        request_params: dict = self._with_headers(self._request_params(), kwargs.pop("headers", None))
+        return self._upstream_request(method, **request_params, **kwargs)
+
+    def _upstream_request(self, method: str, **kwargs) -> "RequestResponse":
+        """Request actually sent to the upstream, its duration is the endpoint latency"""
+        started: float = time.perf_counter()
+        try:
+            return self.host.request(method, **kwargs)
+        finally:
+            self.upstream_duration = time.perf_counter() - started
+
+    def _coalesced_method(self, method: str, **kwargs) -> "RequestResponse":
+        """Identical concurrent requests share one upstream call, requests with a body are never shared"""
+        if any(kwargs.get(name) for name in ("data", "json", "files")):
+            return self._send(method, **kwargs)
+        request_params: dict = self._with_headers(self._request_params(), kwargs.get("headers"))
+        ignored: set = {name.lower() for name in self.coalesce_ignored_headers}
+        key: str = request_fingerprint(
+            method,
+            request_params["url"],
+            sorted(
+                (name, value)
+                for name, value in request_params["headers"].items()
+                if name.lower() not in ignored
+            ),
+            kwargs.get("params"),
+            request_params.get("cookies"),
+        )
+        return single_flight.do(key, lambda: self._send(method, **kwargs), self.coalesce_timeout)
+
+    def _cached_get(self, **kwargs) -> "RequestResponse":
+        request_params: dict = self._with_headers(self._request_params(), kwargs.pop("headers", None))
+        key: str = self.response_cache.get_key(
+            request_params["url"],
+            request_params["headers"],
+            kwargs.get("params"),
+            request_params.get("cookies"),
+        )
+
+        def send(conditional_headers: dict) -> "RequestResponse":
+            params = dict(request_params, headers={**request_params["headers"], **conditional_headers})
+            return self._upstream_request("get", **params, **kwargs)
+
+        return self.response_cache.fetch(key, send, request_params["headers"])
+
+    def _upload_params(self, params: dict, data: Optional[dict], files: dict, is_async: bool = False) -> dict:
+        """With `stream_upload` multipart body is read from files by `stream_chunk_size` chunks"""
+        if not self.stream_upload:
+            params.update(data=data, files=files)
+            return params
+        encoder = MultipartEncoder(data, files, self.stream_chunk_size)
+        headers: dict = {**params["headers"], "Content-Type": encoder.content_type}
+        if not is_async:
+            params.update(headers=headers, data=encoder)
+            return params
+        if (length := encoder.len) is not None:
+            headers["Content-Length"] = str(length)
+        params.update(headers=headers, content=encoder.aiter())
+        return params
 
     @request_shell
     def send_file(self, files: dict, data: dict = None, **kwargs) -> Optional["RequestResponse"]:
-        request_data = self._request_params()
-        request_data.update(data=data, files=files)
-        return self.host.session.post(**request_data)
+        request_data = self._upload_params(self._request_params(), data, files)
+        request_data.update(timeout=self.get_timeout(), stream=kwargs.get("stream", False))
+        return self._guarded("post", self._upstream_request, "post", **request_data)
+
+    def _arequest_params(self) -> dict:
+        """httpx rejects empty header values and per-request cookies, so pass them as headers"""
+        params: dict = self._request_params()
+        headers: dict = {key: value for key, value in params["headers"].items() if value is not None}
+        if cookies := params.pop("cookies", None):
+            headers["Cookie"] = "; ".join(f"{key}={value}" for key, value in cookies.items())
+        params["headers"] = headers
+        if (timeout := self.get_async_timeout()) is not None:
+            params["timeout"] = timeout
+        return params
+
+    @arequest_shell
+    async def _amethod(self, method: str, **kwargs) -> Optional["AsyncResponse"]:
+        kwargs = self._encode_body(kwargs, body_param="content")
+        if self.retry_policy is None:
+            return await self._aattempt(method, **kwargs)
+        return await self.retry_policy.acall(
+            self.url,
+            partial(self._aattempt, method, **kwargs),
+            self.is_idempotent(method, kwargs.get("headers")),
+            partial(self._retry, method),
+        )
+
+    async def _aattempt(self, method: str, **kwargs) -> "AsyncResponse":
+        request_params: dict = self._with_headers(self._arequest_params(), kwargs.pop("headers", None))
+        return await self._aguarded(method, self.async_client.request, method, **request_params, **kwargs)
 
-    def service_response(self, method: str, **kwargs) -> Response:
+    @arequest_shell
+    async def asend_file(self, files: dict, data: dict = None, **kwargs) -> Optional["AsyncResponse"]:
+        request_data = self._upload_params(self._arequest_params(), data, files, is_async=True)
+        return await self._aguarded("post", self.async_client.post, **request_data)
+
+    def service_response(self, method: str, **kwargs) -> Union[Response, RawResponse, StreamingHttpResponse]:
+        if self.stream_response:
+            return self.stream_service_response(method, **kwargs)
+        if self.raw_response:
+            return self.raw_service_response(method, **kwargs)
+        response = self.request_to_service(method=method, **kwargs)
+        return self.build_response(response, method, **kwargs)
+
+    def raw_service_response(self, method: str, **kwargs) -> Union[Response, RawResponse]:
+        """Pass upstream body bytes to the client. Body is decoded only if `.data` is accessed"""
         response = self.request_to_service(method=method, **kwargs)
         if not getattr(response, "status_code", None):
+            return self.build_response(response, method, **kwargs)
+        raw_response = RawResponse(
+            response.content,
+            decoder=partial(self._response, response),
+            status=response.status_code,
+        )
+        return self.header_policy.apply(response.headers, raw_response, exclude=DECODED_BODY_HEADERS)
+
+    def stream_service_response(self, method: str, **kwargs) -> Union[Response, StreamingHttpResponse]:
+        """Forward upstream body chunk by chunk without decoding it"""
+        response = self.request_to_service(method=method, stream=True, **kwargs)
+        if not getattr(response, "status_code", None):
+            return self.build_response(response, method, **kwargs)
+        if getattr(response, "_content_consumed", False):
+            # custom methods may ignore `stream`, the body is read and decoded already
+            streaming_response = StreamingHttpResponse((response.content,), status=response.status_code)
+            return self.header_policy.apply(
+                response.headers, streaming_response, exclude=DECODED_BODY_HEADERS
+            )
+        streaming_response = StreamingHttpResponse(
+            self._stream_content(response), status=response.status_code
+        )
+        return self.header_policy.apply(response.headers, streaming_response)
+
+    def _stream_content(self, response: "RequestResponse") -> Iterator[bytes]:
+        try:
+            yield from response.raw.stream(self.stream_chunk_size, decode_content=False)
+        finally:
+            response.close()
+
+    async def aservice_response(self, method: str, **kwargs) -> Response:
+        response = await self.arequest_to_service(method=method, **kwargs)
+        return self.build_response(response, method, **kwargs)
+
+    def build_response(self, response: Optional["RequestResponse"], method: str, **kwargs) -> Response:
+        if not getattr(response, "status_code", None):
+            if (error := self.rate_limit_error) is not None:
+                return Response({"detail": str(error)}, status=error.status_code)
             logger.error(f"Connection error in  {self.__str__()}, {method=}", extra=kwargs)
             return Response({"detail": "connection refused"}, status=self.error_status_code)
-        return Response(
-            data=self._response(response),
-            status=response.status_code,
-            headers=response.headers,
-            content_type=response.headers.get("Content-Type"),
+        started: float = time.perf_counter()
+        if self.lazy_decode:
+            # decode time is spent later, on `data` access
+            decoded: float = started
+            drf_response = LazyResponse(
+                response.content if isinstance(self._get_codec(response), JSONCodec) else b"",
+                decoder=partial(self._response, response),
+                status=response.status_code,
+                content_type=self._forwarded_content_type(response),
+                passthrough_headers={
+                    name: value
+                    for name, value in self.header_policy.filter(response.headers, DECODED_BODY_HEADERS)
+                    if name.lower() in BODY_VALIDATOR_HEADERS
+                },
+            )
+        else:
+            data: JSONType = self._response(response)
+            decoded: float = time.perf_counter()
+            drf_response = Response(
+                data=data,
+                status=response.status_code,
+                content_type=self._forwarded_content_type(response),
+            )
+        self.header_policy.apply(response.headers, drf_response, exclude=RENDERED_BODY_HEADERS)
+        service_response_built.send(
+            sender=type(self),
+            service=self,
+            method=method,
+            decode_duration=decoded - started,
+            build_duration=time.perf_counter() - decoded,
         )
+        return drf_response
 
     def request_to_service(self, method: str, **kwargs) -> "RequestResponse":
         method: str = method.lower()
@@ -135,10 +709,35 @@ class ConnectionService:
             return handler(**kwargs)
         self.http_method_not_allowed(method)
 
+    async def arequest_to_service(self, method: str, **kwargs) -> "AsyncResponse":
+        """Async twin of `request_to_service`. Custom methods need an `a`-prefixed coroutine"""
+        method: str = method.lower()
+        if method in self.http_method_names:
+            return await self._amethod(method, **kwargs)
+        elif method in self.get_method_names and (handler := getattr(self, f"a{method}", None)):
+            return await handler(**kwargs)
+        self.http_method_not_allowed(method)
+
+    @staticmethod
+    def _forwarded_content_type(response: "RequestResponse") -> Optional[str]:
+        """Bodies of other codecs are decoded and rendered again, so their content type doesn't apply"""
+        content_type: Optional[str] = response.headers.get("Content-Type")
+        if (codec := get_codec(content_type)) is not None and not isinstance(codec, JSONCodec):
+            return None
+        return content_type
+
+    @staticmethod
+    def _get_codec(response: "RequestResponse") -> Codec:
+        """Codec of the response body, JSON is expected by default"""
+        return get_codec(response.headers.get("Content-Type")) or get_codec(JSONCodec.media_type)
+
     def _response(self, response: "RequestResponse") -> JSONType:
+        codec: Codec = self._get_codec(response)
         try:
-            return response.json()
-        except JSONDecodeError:
+            if isinstance(codec, JSONCodec) and codec.is_stdlib:
+                return response.json()
+            return codec.decode(response.content)
+        except codec.decode_errors:
             return self.error_process()
 
     def error_process(self) -> None:
@@ -153,16 +752,22 @@ class MicroServiceConnect(ConnectionService):
         super().__init__(url, **kwargs)
         self.request = request
 
+    @property
+    def request_host(self) -> str:
+        """`request.get_host()` validates ALLOWED_HOSTS on every call, so do it once per request"""
+        if (host := getattr(self.request, "_microservice_request_host", None)) is None:
+            host = self.request._microservice_request_host = self.request.get_host()
+        return host
+
     @property
     def headers(self) -> dict:
         headers: dict = {
             "Accept-Language": self.request.headers.get("Accept-Language"),
-            "Host": self.request.get_host(),
+            "Host": self.request_host,
         }
-        if self.PROXY_REMOTE_USER and not isinstance(self.request.user, AnonymousUser):
-            headers.update({"Remote-User": str(self.request.user.id)})
-        headers.update(super().headers)
-        return headers
+        if self.PROXY_REMOTE_USER and (principal := get_principal(self.request)) is not None:
+            headers.update(principal.headers)
+        return self._build_headers(headers)
 
     @property
     def cookies(self) -> dict:
@@ -176,10 +781,39 @@ class MicroServiceConnect(ConnectionService):
 
     @request_shell
     def send_file(self, files: dict, data: dict = None, **kwargs):
-        request_data: dict = self._request_params()
-        request_data.update(data=data or self.request.data, files=files)
-        return self.host.session.post(**request_data)
+        request_data: dict = self._upload_params(self._request_params(), data or self.request.data, files)
+        request_data.update(timeout=self.get_timeout(), stream=kwargs.get("stream", False))
+        return self._guarded("post", self._upstream_request, "post", **request_data)
+
+    async def arequest_to_service(self, method: str, **kwargs) -> "AsyncResponse":
+        if self.PROXY_REMOTE_USER:
+            # `headers` is sync, load the user for it with `request.auser()`
+            await aget_principal(self.request)
+        return await super().arequest_to_service(method, **kwargs)
+
+    @arequest_shell
+    async def asend_file(self, files: dict, data: dict = None, **kwargs):
+        if self.PROXY_REMOTE_USER:
+            await aget_principal(self.request)
+        request_data: dict = self._upload_params(
+            self._arequest_params(), data or self.request.data, files, is_async=True
+        )
+        return await self._aguarded("post", self.async_client.post, **request_data)
 
-    def service_response(self, method: str = None, **kwargs) -> Response:
+    def service_response(
+        self, method: str = None, **kwargs
+    ) -> Union[Response, RawResponse, StreamingHttpResponse]:
         method: str = method or self.request.method
         return super().service_response(method, **kwargs)
+
+    def raw_service_response(self, method: str = None, **kwargs) -> Union[Response, RawResponse]:
+        method: str = method or self.request.method
+        return super().raw_service_response(method, **kwargs)
+
+    def stream_service_response(self, method: str = None, **kwargs) -> Union[Response, StreamingHttpResponse]:
+        method: str = method or self.request.method
+        return super().stream_service_response(method, **kwargs)
+
+    async def aservice_response(self, method: str = None, **kwargs) -> Response:
+        method: str = method or self.request.method
+        return await super().aservice_response(method, **kwargs)
@@ -0,0 +1,13 @@
+from django.dispatch import Signal
+
+# sender: service class; kwargs: service, method
+service_request_started = Signal()
+
+# sender: service class; kwargs: service, method, response, error, duration
+service_request_finished = Signal()
+
+# sender: service class; kwargs: service, method, decode_duration, build_duration
+service_response_built = Signal()
+
+# sender: service class; kwargs: service, method, attempt, delay, reason (error or response)
+service_request_retried = Signal()
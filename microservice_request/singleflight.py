@@ -0,0 +1,48 @@
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from .exceptions import CoalescedRequestTimeout
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share one execution of `func` and its result"""
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, func: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = _Call()
+        if is_leader:
+            try:
+                call.result = func()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.event.set()
+        elif not call.event.wait(timeout):
+            raise CoalescedRequestTimeout(f"Coalesced request wasn't finished in {timeout} seconds")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+single_flight = SingleFlight()
@@ -1,5 +1,11 @@
+from io import BytesIO
+from json import dumps
 from unittest.mock import Mock
 
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+from urllib3 import HTTPResponse
+
 
 class RequestTestCaseMixin:
     """Usage:
@@ -29,6 +35,17 @@ class RequestTestCaseMixin:
         mock_resp.status_code = status_code
         mock_resp.content_type = content_type
         mock_resp.headers = headers or {}
-        # add json data if provided
+        # add json data if provided, content is decoded by non-stdlib JSON backends
         mock_resp.json = Mock(return_value=json)
+        mock_resp.content = dumps(json, default=str).encode()
         return mock_resp
+
+    def _mock_stream_response(self, body: bytes = b"", status_code=200, headers=None):
+        """Real `requests.Response` backed by an in-memory raw stream, for `stream=True` calls"""
+        response = Response()
+        response.status_code = status_code
+        response.headers = CaseInsensitiveDict(headers or {})
+        response.raw = HTTPResponse(
+            body=BytesIO(body), headers=response.headers, status=status_code, preload_content=False
+        )
+        return response
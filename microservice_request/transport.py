@@ -0,0 +1,217 @@
+import os
+import ssl
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from typing import TYPE_CHECKING, Dict, Iterator, Mapping, Optional, Tuple, Union
+
+from django.core.exceptions import ImproperlyConfigured
+from requests import Response
+from requests.adapters import BaseAdapter
+from requests.exceptions import ConnectionError, ConnectTimeout, ReadTimeout
+from requests.structures import CaseInsensitiveDict
+from requests.utils import DEFAULT_CA_BUNDLE_PATH, get_encoding_from_headers, select_proxy
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+try:
+    import h2
+except ImportError:  # pragma: no cover
+    h2 = None
+
+from .headers import HOP_BY_HOP_HEADERS
+
+if TYPE_CHECKING:
+    from requests import PreparedRequest
+
+    from .pool import PoolOptions
+
+Timeout = Union[None, float, Tuple[Optional[float], Optional[float]]]
+Verify = Union[bool, str]
+Cert = Union[None, str, Tuple[str, str]]
+
+
+class RejectCookiePolicy(DefaultCookiePolicy):
+    """Pooled sessions are shared by all callers, so upstream `Set-Cookie` is never stored"""
+
+    def set_ok(self, cookie, request) -> bool:
+        return False
+
+
+class _RawStream:
+    """Body of a streamed httpx response with urllib3-like `stream` used by `requests`"""
+
+    def __init__(self, response: "httpx.Response"):
+        self._response = response
+
+    def stream(self, amt: Optional[int] = None, decode_content: bool = True) -> Iterator[bytes]:
+        if decode_content:
+            return self._response.iter_bytes(amt)
+        return self._response.iter_raw(amt)
+
+    def close(self) -> None:
+        self._response.close()
+
+    def release_conn(self) -> None:
+        self._response.close()
+
+
+class HTTP2Adapter(BaseAdapter):
+    """`requests` transport adapter which sends requests with HTTP/2 `httpx.Client`.
+
+    Concurrent requests to one upstream are multiplexed over a few connections, HTTP/2 is negotiated
+    with ALPN, so upstreams without its support and plain `http://` origins are served with HTTP/1.1.
+    `verify`, `cert` and `proxies` of the session (and `REQUESTS_CA_BUNDLE`) are honoured, requests
+    with other TLS or proxy settings get their own client.
+    """
+
+    def __init__(self, options: "PoolOptions", transport: Optional["httpx.BaseTransport"] = None):
+        if httpx is None or h2 is None:
+            raise ImproperlyConfigured("HTTP/2 requires 'httpx[http2]' package: pip install httpx[http2]")
+        super().__init__()
+        self.options = options
+        self._transport = transport
+        self._clients: Dict[Tuple[Verify, Cert, Optional[str]], "httpx.Client"] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> "httpx.Client":
+        """Client with default TLS settings and without a proxy"""
+        return self.get_client()
+
+    def get_client(
+        self, verify: Verify = True, cert: Cert = None, proxy: Optional[str] = None
+    ) -> "httpx.Client":
+        key = (verify, cert, proxy)
+        if (client := self._clients.get(key)) is None:
+            with self._lock:
+                if (client := self._clients.get(key)) is None:
+                    client = self._clients[key] = self.create_client(verify, cert, proxy)
+        return client
+
+    def create_client(self, verify: Verify, cert: Cert, proxy: Optional[str]) -> "httpx.Client":
+        transport = self._transport or self.create_transport(
+            self.options, verify=self._ssl_context(verify, cert), proxy=self._proxy(proxy)
+        )
+        # `requests` already resolved proxies and CA bundle of the environment
+        client = httpx.Client(transport=transport, follow_redirects=False, trust_env=False)
+        # `requests` sets its own default headers and handles cookies
+        client.headers.clear()
+        client.cookies.jar.set_policy(RejectCookiePolicy())
+        return client
+
+    @staticmethod
+    def create_transport(
+        options: "PoolOptions",
+        verify: Union[bool, ssl.SSLContext] = True,
+        proxy: Optional["httpx.Proxy"] = None,
+    ) -> "httpx.BaseTransport":
+        limits = httpx.Limits(
+            max_connections=options.pool_maxsize,
+            max_keepalive_connections=options.pool_connections,
+            keepalive_expiry=options.idle_timeout,
+        )
+        return httpx.HTTPTransport(
+            http2=True,
+            retries=3 if options.transport_retries else 0,
+            limits=limits,
+            verify=verify,
+            proxy=proxy,
+        )
+
+    @staticmethod
+    def _ssl_context(verify: Verify, cert: Cert) -> Union[bool, ssl.SSLContext]:
+        """`requests` style `verify` (a flag or CA bundle path) and client `cert` as httpx `verify`"""
+        if verify is True and not cert:
+            return True
+        if verify is False:
+            context = ssl.create_default_context()
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+        else:
+            ca = DEFAULT_CA_BUNDLE_PATH if verify is True else verify
+            if not os.path.exists(ca):
+                raise ImproperlyConfigured(f"CA bundle {ca} doesn't exist")
+            context = ssl.create_default_context(**{"capath" if os.path.isdir(ca) else "cafile": ca})
+        if cert:
+            certfile, keyfile = (cert, None) if isinstance(cert, str) else cert
+            context.load_cert_chain(certfile, keyfile)
+        return context
+
+    @staticmethod
+    def _proxy(proxy: Optional[str]) -> Optional["httpx.Proxy"]:
+        if not proxy:
+            return None
+        try:
+            return httpx.Proxy(proxy)
+        except ValueError as e:
+            raise ImproperlyConfigured(f"Proxy {proxy} isn't supported with HTTP/2: {e}")
+
+    @staticmethod
+    def _timeout(timeout: Timeout) -> "httpx.Timeout":
+        connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        return httpx.Timeout(connect=connect, read=read, write=read, pool=connect)
+
+    def send(
+        self,
+        request: "PreparedRequest",
+        stream: bool = False,
+        timeout: Timeout = None,
+        verify: Verify = True,
+        cert: Cert = None,
+        proxies: Optional[Mapping[str, str]] = None,
+    ) -> Response:
+        if isinstance(cert, list):
+            cert = tuple(cert)
+        client = self.get_client(verify, cert, select_proxy(request.url, proxies or {}))
+        httpx_request = client.build_request(
+            request.method,
+            request.url,
+            # connection-specific headers are not allowed in HTTP/2 (RFC 9113, section 8.2.2)
+            headers=[
+                (name, value)
+                for name, value in request.headers.items()
+                if name.lower() not in HOP_BY_HOP_HEADERS
+            ],
+            content=request.body,
+            timeout=self._timeout(timeout),
+        )
+        try:
+            httpx_response = client.send(httpx_request, stream=True)
+        except httpx.ConnectTimeout as e:
+            raise ConnectTimeout(e, request=request)
+        except httpx.TimeoutException as e:
+            raise ReadTimeout(e, request=request)
+        except httpx.TransportError as e:
+            raise ConnectionError(e, request=request)
+        response = self.build_response(request, httpx_response)
+        if not stream:
+            try:
+                response._content = httpx_response.read()
+            except httpx.TimeoutException as e:
+                raise ReadTimeout(e, request=request)
+            except httpx.TransportError as e:
+                raise ConnectionError(e, request=request)
+            finally:
+                httpx_response.close()
+        return response
+
+    def build_response(self, request: "PreparedRequest", httpx_response: "httpx.Response") -> Response:
+        response = Response()
+        response.status_code = httpx_response.status_code
+        response.headers = CaseInsensitiveDict(httpx_response.headers.items())
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.reason = httpx_response.reason_phrase
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.raw = _RawStream(httpx_response)
+        return response
+
+    def close(self) -> None:
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            client.close()
@@ -0,0 +1,96 @@
+from unittest import mock
+
+import httpx
+from django.contrib.auth.models import AnonymousUser
+from django.test import SimpleTestCase
+from django.test.client import RequestFactory
+from rest_framework import status
+from rest_framework.exceptions import MethodNotAllowed
+from rest_framework.response import Response as DRFResponse
+
+from microservice_request.pool import async_client_registry
+from microservice_request.services import ConnectionService, MicroServiceConnect
+
+
+class AsyncTestService(ConnectionService):
+    service = "http://async-service:8000"
+    api_key = "async-key"
+    custom_methods = ["send_cbor_encoded_data"]
+
+    async def asend_cbor_encoded_data(self, **kwargs):
+        return await self._amethod("post", content=kwargs.get("data"))
+
+
+class AsyncProxyService(MicroServiceConnect):
+    service = "http://container:8000"
+    api_key = "proxy-key"
+    SEND_COOKIES = True
+
+
+def mock_transport(handler):
+    def create_client(options):
+        return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    return mock.patch.object(async_client_registry, "create_client", side_effect=create_client)
+
+
+class AsyncConnectionServiceTestCase(SimpleTestCase):
+    async def test_service_response(self):
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(status.HTTP_200_OK, json={"id": 1})
+
+        with mock_transport(handler):
+            response = await AsyncTestService("/api/v1/users/1/").aservice_response("get", params={"q": "a"})
+        self.assertIsInstance(response, DRFResponse)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"id": 1})
+        self.assertEqual(str(requests[0].url), "http://async-service:8000/api/v1/users/1/?q=a")
+        self.assertEqual(requests[0].headers["Authorization"], "ACCESS-KEY async-key")
+
+    async def test_client_is_pooled(self):
+        first = AsyncTestService("/api/v1/users/")
+        second = AsyncTestService("/api/v1/products/")
+        self.assertIs(first.async_client, second.async_client)
+
+    async def test_connection_error(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            raise httpx.ConnectError("connection refused")
+
+        with mock_transport(handler):
+            response = await AsyncTestService().aservice_response("post", json={"key": "value"})
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(response.data, {"detail": "connection refused"})
+
+    async def test_custom_method(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(status.HTTP_201_CREATED, json={"size": len(request.content)})
+
+        with mock_transport(handler):
+            response = await AsyncTestService().aservice_response("send_cbor_encoded_data", data=b"\xa1\x01")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {"size": 2})
+
+    async def test_method_not_allowed(self):
+        with self.assertRaises(MethodNotAllowed):
+            await AsyncTestService().arequest_to_service("option")
+
+    async def test_proxy_request_params(self):
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(status.HTTP_200_OK, json=[])
+
+        request = RequestFactory().get("/api/v2/products/")
+        request.user = AnonymousUser()
+        request.COOKIES = {"sessionid": "abc"}
+        with mock_transport(handler):
+            response = await AsyncProxyService(request, "/api/v1/products/").aservice_response()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(requests[0].method, "GET")
+        self.assertEqual(requests[0].headers["Cookie"], "sessionid=abc")
+        self.assertEqual(requests[0].headers["Host"], "testserver")
+        self.assertNotIn("Accept-Language", requests[0].headers)
@@ -0,0 +1,183 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+from requests import Session
+from requests.exceptions import ConnectionError, ReadTimeout
+from rest_framework import status
+
+from microservice_request.balancer import LoadBalancer
+from microservice_request.cache import LRUCacheBackend, ResponseCache
+from microservice_request.circuitbreaker import CircuitBreaker
+from microservice_request.exceptions import EndpointUnavailable
+from microservice_request.retry import RetryPolicy
+from microservice_request.services import ConnectionService
+from microservice_request.test import RequestTestCaseMixin
+
+ENDPOINTS = ["http://catalog-1:8000", "http://catalog-2:8000", "http://catalog-3:8000"]
+
+
+class CatalogService(ConnectionService):
+    service = ENDPOINTS
+
+
+class ResolvedCatalogService(ConnectionService):
+    balancing_strategy = LoadBalancer.LEAST_OUTSTANDING
+
+    def service():
+        return ENDPOINTS[:2]
+
+
+class RetriedCatalogService(ConnectionService):
+    service = LoadBalancer(ENDPOINTS[:2], max_failures=1)
+    retry_policy = RetryPolicy(budget_min_per_second=0)
+
+
+class DNSError(OSError):
+    pass
+
+
+def _result(result):
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+class LoadBalancerTestCase(SimpleTestCase):
+    def test_round_robin(self):
+        balancer = LoadBalancer(ENDPOINTS)
+        self.assertEqual([balancer.choose().url for _ in range(4)], ENDPOINTS + ENDPOINTS[:1])
+
+    def test_least_outstanding(self):
+        balancer = LoadBalancer(ENDPOINTS, strategy=LoadBalancer.LEAST_OUTSTANDING)
+        first, second, third = balancer.endpoints
+        balancer.acquire(first)
+        balancer.acquire(second)
+        self.assertIs(balancer.choose(), third)
+
+    def test_power_of_two_choices(self):
+        balancer = LoadBalancer(ENDPOINTS[:2], strategy=LoadBalancer.POWER_OF_TWO_CHOICES)
+        busy, idle = balancer.endpoints
+        balancer.acquire(busy)
+        self.assertEqual({balancer.choose().url for _ in range(10)}, {idle.url})
+
+    def test_ejection(self):
+        balancer = LoadBalancer(ENDPOINTS, max_failures=2, max_ejected_ratio=0.34)
+        first, second, third = balancer.endpoints
+        for _ in range(2):
+            balancer.acquire(first)
+            balancer.release(first, None, ConnectionError(), 0.1)
+        self.assertNotIn(first, [balancer.choose() for _ in range(6)])
+        for _ in range(2):
+            balancer.acquire(second)
+            balancer.release(second, mock.Mock(status_code=503), None, 0.1)
+        self.assertIn(second, [balancer.choose() for _ in range(6)])
+
+    def test_slow_ejection(self):
+        balancer = LoadBalancer(ENDPOINTS[:2], slow_call_threshold=1)
+        slow, fast = balancer.endpoints
+        balancer.acquire(slow)
+        balancer.release(slow, mock.Mock(status_code=200), None, 5)
+        self.assertEqual({balancer.choose().url for _ in range(4)}, {fast.url})
+
+    def test_resolver(self):
+        urls = [ENDPOINTS[:1], ENDPOINTS[1:]]
+        balancer = LoadBalancer(lambda: urls.pop(0), resolve_interval=0)
+        self.assertEqual(balancer.choose().url, ENDPOINTS[0])
+        self.assertEqual([endpoint.url for endpoint in balancer.endpoints], ENDPOINTS[1:])
+
+    def test_resolver_failure(self):
+        results = [ENDPOINTS[:1], DNSError("name resolution failed"), []]
+        balancer = LoadBalancer(lambda: _result(results.pop(0)), resolve_interval=0)
+        self.assertEqual(balancer.choose().url, ENDPOINTS[0])
+        for _ in range(2):
+            with self.assertLogs("microservice_request.balancer", "WARNING"):
+                self.assertEqual(balancer.choose().url, ENDPOINTS[0])
+
+    def test_resolver_failure_without_endpoints(self):
+        for result in (DNSError("name resolution failed"), []):
+            with self.subTest(result=result):
+                balancer = LoadBalancer(lambda: _result(result))
+                with self.assertRaises(EndpointUnavailable):
+                    balancer.choose()
+
+    def test_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            LoadBalancer(ENDPOINTS, strategy="random")
+
+
+@mock.patch.object(Session, "request")
+class BalancedServiceTestCase(RequestTestCaseMixin, SimpleTestCase):
+    def test_service_endpoints(self, mocked_request):
+        mocked_request.return_value = self._mock_response(json={}, status_code=status.HTTP_200_OK)
+        for _ in range(3):
+            CatalogService("/api/v1/products/").service_response("get")
+        urls = [call.kwargs["url"] for call in mocked_request.call_args_list]
+        self.assertEqual(sorted(urls), [f"{endpoint}/api/v1/products/" for endpoint in ENDPOINTS])
+        self.assertTrue(
+            all(endpoint.outstanding == 0 for endpoint in CatalogService.get_load_balancer().endpoints)
+        )
+
+    def test_endpoint_pools(self, mocked_request):
+        first, second = CatalogService("/api/v1/products/"), CatalogService("/api/v1/products/")
+        self.assertIsNot(first.host.session, second.host.session)
+
+    def test_resolver_service(self, mocked_request):
+        self.assertIn(ResolvedCatalogService("/api/v1/products/").url.rsplit("/api", 1)[0], ENDPOINTS[:2])
+
+    @mock.patch("microservice_request.retry.time.sleep")
+    def test_retry_another_endpoint(self, mocked_sleep, mocked_request):
+        mocked_request.side_effect = [
+            ReadTimeout("read timeout"),
+            self._mock_response(json={}, status_code=200),
+        ]
+        response = RetriedCatalogService("/api/v1/products/").service_response("get")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first, second = [call.kwargs["url"] for call in mocked_request.call_args_list]
+        self.assertNotEqual(first, second)
+
+    def test_unresolved_service(self, mocked_request):
+        class UnresolvedService(ConnectionService):
+            def service():
+                raise DNSError("name resolution failed")
+
+        service = UnresolvedService("/api/v1/products/")
+        self.assertIsInstance(service.endpoint_error, EndpointUnavailable)
+        with self.assertLogs("microservice_request.services", "ERROR"):
+            response = service.service_response("get")
+        self.assertEqual(response.status_code, service.error_status_code)
+        mocked_request.assert_not_called()
+
+    def test_cached_response_latency(self, mocked_request):
+        class CachedCatalogService(ConnectionService):
+            service = LoadBalancer(ENDPOINTS[:1])
+            response_cache = ResponseCache(LRUCacheBackend(), timeout=60)
+
+        mocked_request.return_value = self._mock_response(json={}, status_code=status.HTTP_200_OK)
+        (endpoint,) = CachedCatalogService.service.endpoints
+        CachedCatalogService("/api/v1/products/").service_response("get")
+        latency = endpoint.latency
+        self.assertIsNotNone(latency)
+        for _ in range(3):
+            CachedCatalogService("/api/v1/products/").service_response("get")
+        mocked_request.assert_called_once()
+        self.assertEqual(endpoint.latency, latency)
+        self.assertEqual(endpoint.outstanding, 0)
+
+    def test_slow_threshold_without_latency(self, mocked_request):
+        class GuardedCatalogService(ConnectionService):
+            service = LoadBalancer(ENDPOINTS[:1], slow_call_threshold=0.5)
+            circuit_breaker = CircuitBreaker()
+            response_cache = ResponseCache(LRUCacheBackend(), timeout=60)
+
+        service = GuardedCatalogService("/api/v1/products/")
+        service.circuit.open()
+        self.addCleanup(service.circuit.close)
+        with self.assertLogs("microservice_request.services", "ERROR"):
+            response = service.service_response("get")
+        self.assertEqual(response.status_code, service.error_status_code)
+        service.circuit.close()
+        mocked_request.return_value = self._mock_response(json={}, status_code=status.HTTP_200_OK)
+        for _ in range(2):
+            response = GuardedCatalogService("/api/v1/products/").service_response("get")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mocked_request.assert_called_once()
@@ -0,0 +1,143 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from requests import Response, Session
+from requests.structures import CaseInsensitiveDict
+from rest_framework import status
+
+from microservice_request.cache import (
+    CacheEntry,
+    DjangoCacheBackend,
+    LRUCacheBackend,
+    ResponseCache,
+    parse_cache_control,
+)
+from microservice_request.services import ConnectionService
+
+
+def make_response(status_code=200, content=b'{"id": 1}', headers=None, url="http://catalog:8000/"):
+    response = Response()
+    response.status_code = status_code
+    response.headers = CaseInsensitiveDict({"Content-Type": "application/json", **(headers or {})})
+    response._content = content
+    response.url = url
+    return response
+
+
+class CatalogService(ConnectionService):
+    service = "http://catalog:8000"
+    response_cache = ResponseCache(LRUCacheBackend(max_entries=16), timeout=60)
+
+
+class CacheEntryTestCase(SimpleTestCase):
+    def test_parse_cache_control(self):
+        directives = parse_cache_control('public, max-age=60, stale-while-revalidate="30", no-cache')
+        self.assertEqual(
+            directives, {"public": None, "max-age": "60", "stale-while-revalidate": "30", "no-cache": None}
+        )
+
+    def test_cache_control(self):
+        with mock.patch("microservice_request.cache.time.time", return_value=1000):
+            entry = CacheEntry.from_response(
+                make_response(headers={"Cache-Control": "max-age=10, stale-while-revalidate=5"}), 60
+            )
+            default = CacheEntry.from_response(make_response(), 60)
+        self.assertEqual(entry.fresh_until, 1010)
+        self.assertEqual(entry.stale_until, 1015)
+        self.assertEqual(default.fresh_until, 1060)
+        self.assertIsNone(CacheEntry.from_response(make_response(headers={"Cache-Control": "no-store"}), 60))
+        self.assertIsNone(CacheEntry.from_response(make_response(status_code=500), 60))
+        self.assertIsNone(CacheEntry.from_response(make_response(headers={"Cache-Control": "private"}), 60))
+
+    def test_negative_timeout(self):
+        with mock.patch("microservice_request.cache.time.time", return_value=1000):
+            self.assertIsNone(CacheEntry.from_response(make_response(status_code=404), 60))
+            entry = CacheEntry.from_response(make_response(status_code=404), 60, negative_timeout=5)
+            explicit = CacheEntry.from_response(
+                make_response(status_code=404, headers={"Cache-Control": "max-age=30"}), 60
+            )
+        self.assertEqual(entry.fresh_until, 1005)
+        self.assertEqual(explicit.fresh_until, 1030)
+
+    def test_lru_eviction(self):
+        backend = LRUCacheBackend(max_entries=2)
+        entry = CacheEntry.from_response(make_response(), 60)
+        backend.set("a", entry, 60)
+        backend.set("b", entry, 60)
+        backend.get("a")
+        backend.set("c", entry, 60)
+        self.assertEqual(len(backend), 2)
+        self.assertIsNone(backend.get("b"))
+        self.assertEqual(backend.get("a"), entry)
+        backend.set("d", entry, -1)
+        self.assertIsNone(backend.get("d"))
+
+    @override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    def test_django_backend(self):
+        backend = DjangoCacheBackend()
+        entry = CacheEntry.from_response(make_response(), 60)
+        backend.set("key", entry, 60)
+        self.assertEqual(backend.get("key"), entry)
+
+
+@mock.patch.object(Session, "request")
+class ServiceCacheTestCase(SimpleTestCase):
+    def setUp(self):
+        CatalogService.response_cache.backend = LRUCacheBackend(max_entries=16)
+
+    def test_fresh_response_from_cache(self, mocked_request):
+        mocked_request.return_value = make_response()
+        first = CatalogService("/api/v1/items/").service_response("get", params={"page": 1})
+        second = CatalogService("/api/v1/items/").service_response("get", params={"page": 1})
+        self.assertEqual(mocked_request.call_count, 1)
+        self.assertEqual(first.data, second.data)
+        CatalogService("/api/v1/items/").service_response("get", params={"page": 2})
+        CatalogService("/api/v1/items/", special_headers={"Remote-User": "5"}).service_response(
+            "get", params={"page": 1}
+        )
+        self.assertEqual(mocked_request.call_count, 3)
+
+    def test_not_cached_methods(self, mocked_request):
+        mocked_request.return_value = make_response()
+        CatalogService("/api/v1/items/").service_response("post", json={})
+        CatalogService("/api/v1/items/").service_response("post", json={})
+        self.assertEqual(mocked_request.call_count, 2)
+
+    def test_etag_revalidation(self, mocked_request):
+        mocked_request.return_value = make_response(headers={"Cache-Control": "no-cache", "ETag": '"v1"'})
+        CatalogService("/api/v1/items/").service_response("get")
+        mocked_request.return_value = make_response(status_code=status.HTTP_304_NOT_MODIFIED, content=b"")
+        response = CatalogService("/api/v1/items/").service_response("get")
+        self.assertEqual(mocked_request.call_args.kwargs["headers"]["If-None-Match"], '"v1"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"id": 1})
+
+    def test_stale_while_revalidate(self, mocked_request):
+        mocked_request.return_value = make_response(
+            headers={"Cache-Control": "max-age=10, stale-while-revalidate=60"}
+        )
+        with mock.patch("microservice_request.cache.time.time", return_value=1000):
+            CatalogService("/api/v1/items/").service_response("get")
+        mocked_request.return_value = make_response(content=b'{"id": 2}')
+        with mock.patch("microservice_request.cache.get_executor") as executor:
+            with mock.patch("microservice_request.cache.time.time", return_value=1020):
+                response = CatalogService("/api/v1/items/").service_response("get")
+        self.assertEqual(response.data, {"id": 1})
+        executor.return_value.submit.assert_called_once()
+        _, key, entry, send, headers = executor.return_value.submit.call_args.args
+        CatalogService.response_cache.revalidate(key, entry, send, headers)
+        response = CatalogService("/api/v1/items/").service_response("get")
+        self.assertEqual(response.data, {"id": 2})
+
+    def test_vary(self, mocked_request):
+        mocked_request.side_effect = lambda **kwargs: make_response(
+            content=f'{{"token": "{kwargs["headers"]["X-Token"]}"}}'.encode(),
+            headers={"Vary": "Accept-Language, X-Token"},
+        )
+        for token in ("a", "b", "a", "b"):
+            with self.subTest(token=token):
+                response = CatalogService(
+                    "/api/v1/items/", special_headers={"X-Token": token}
+                ).service_response("get")
+                self.assertEqual(response.data, {"token": token})
+        self.assertEqual(mocked_request.call_count, 2)
@@ -0,0 +1,102 @@
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from requests import Session
+from requests.exceptions import ConnectionError
+from rest_framework import status
+
+from microservice_request.circuitbreaker import CircuitBreaker, DjangoCacheCircuitStorage
+from microservice_request.exceptions import CircuitOpenError
+from microservice_request.services import ConnectionService
+from microservice_request.test import RequestTestCaseMixin
+
+
+class PaymentService(ConnectionService):
+    service = "http://payments:8000"
+    error_status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    circuit_breaker = CircuitBreaker(minimum_calls=2, recovery_timeout=30)
+
+
+class RefundService(PaymentService):
+    service = "http://refunds:8000"
+
+
+class NamedPaymentService(PaymentService):
+    circuit_breaker = CircuitBreaker(name="payments")
+
+
+class CircuitBreakerTestCase(RequestTestCaseMixin, SimpleTestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker(name="test", minimum_calls=4, failure_rate_threshold=0.5)
+
+    def failing_call(self):
+        raise ConnectionError("connection refused")
+
+    def test_circuit_per_service(self):
+        self.assertEqual(PaymentService().circuit.name, "PaymentService:http://payments:8000")
+        self.assertEqual(RefundService().circuit.name, "RefundService:http://refunds:8000")
+        self.assertEqual(NamedPaymentService().circuit.name, "payments:http://payments:8000")
+        self.assertIs(PaymentService().circuit, PaymentService("/api/v1/").circuit)
+        PaymentService().circuit.open()
+        self.addCleanup(PaymentService().circuit.close)
+        self.assertEqual(RefundService().circuit.state, CircuitBreaker.CLOSED)
+
+    def test_opens_on_failure_rate(self):
+        self.breaker.call(self._mock_response, status_code=status.HTTP_200_OK)
+        self.breaker.call(self._mock_response, status_code=status.HTTP_502_BAD_GATEWAY)
+        with self.assertRaises(ConnectionError):
+            self.breaker.call(self.failing_call)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        with self.assertRaises(ConnectionError):
+            self.breaker.call(self.failing_call)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.call(self._mock_response)
+
+    def test_half_open(self):
+        self.breaker.open()
+        with mock.patch("microservice_request.circuitbreaker.time.time", return_value=10**10):
+            self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+            with self.assertRaises(ConnectionError):
+                self.breaker.call(self.failing_call)
+            self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with mock.patch("microservice_request.circuitbreaker.time.time", return_value=10**10 + 60):
+            self.assertTrue(self.breaker.allow_request())
+            self.assertFalse(self.breaker.allow_request())
+            self.breaker.record_success()
+            self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_slow_calls(self):
+        def slow_call():
+            time.sleep(0.05)
+            return self._mock_response(status_code=status.HTTP_200_OK)
+
+        breaker = CircuitBreaker(name="slow", minimum_calls=1, slow_call_threshold=0.01)
+        breaker.call(slow_call)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+    @override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    def test_shared_storage(self):
+        first = CircuitBreaker(name="shared", storage=DjangoCacheCircuitStorage())
+        second = CircuitBreaker(name="shared", storage=DjangoCacheCircuitStorage())
+        first.open()
+        self.assertEqual(second.state, CircuitBreaker.OPEN)
+        second.close()
+        self.assertEqual(first.state, CircuitBreaker.CLOSED)
+
+
+@mock.patch.object(Session, "request")
+class ServiceCircuitBreakerTestCase(SimpleTestCase):
+    def tearDown(self):
+        PaymentService().circuit.close()
+
+    def test_open_circuit_fails_fast(self, mocked_request):
+        mocked_request.side_effect = ConnectionError("connection refused")
+        for _ in range(2):
+            response = PaymentService("/api/v1/payments/").service_response("post", json={})
+            self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(PaymentService().circuit.state, CircuitBreaker.OPEN)
+        response = PaymentService("/api/v1/payments/").service_response("post", json={})
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(mocked_request.call_count, 2)
@@ -0,0 +1,61 @@
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+from requests import Session
+from rest_framework import status
+
+from microservice_request.deadline import deadline, get_remaining, request_deadline
+from microservice_request.services import ConnectionService
+from microservice_request.test import RequestTestCaseMixin
+
+
+class InventoryService(ConnectionService):
+    service = "http://inventory:8000"
+    connect_timeout = 1
+    read_timeout = 5
+
+
+class DeadlineTestCase(RequestTestCaseMixin, SimpleTestCase):
+    def test_nested_deadline(self):
+        self.assertIsNone(get_remaining())
+        with deadline(10) as outer:
+            with deadline(60) as inner:
+                self.assertEqual(inner, outer)
+            with deadline(1):
+                self.assertLessEqual(get_remaining(), 1)
+            self.assertEqual(request_deadline.get(), outer)
+        self.assertIsNone(request_deadline.get())
+
+    def test_service_timeouts(self):
+        service = InventoryService("/api/v1/stock/")
+        self.assertEqual(service.get_timeout(), (1, 5))
+        self.assertIsNone(ConnectionService().get_timeout())
+        with deadline(2):
+            connect_timeout, read_timeout = service.get_timeout()
+            self.assertEqual(connect_timeout, 1)
+            self.assertLessEqual(read_timeout, 2)
+        token = request_deadline.set(0.5)
+        with mock.patch("microservice_request.deadline.time.time", return_value=0):
+            self.assertEqual(service.get_timeout(), (0.5, 0.5))
+            self.assertEqual(service.get_async_timeout(), (0.5, 0.5, 0.5, 0.5))
+        request_deadline.reset(token)
+
+    @mock.patch.object(Session, "request")
+    def test_deadline_forwarded(self, mocked_request):
+        mocked_request.return_value = self._mock_response(json={}, status_code=status.HTTP_200_OK)
+        with deadline(30) as value:
+            InventoryService("/api/v1/stock/").service_response("get")
+        kwargs = mocked_request.call_args.kwargs
+        self.assertEqual(kwargs["headers"]["X-Request-Deadline"], f"{value:.3f}")
+        self.assertLessEqual(kwargs["timeout"][1], 5)
+
+    @mock.patch.object(Session, "request")
+    def test_fail_fast(self, mocked_request):
+        token = request_deadline.set(time.time() - 1)
+        try:
+            response = InventoryService("/api/v1/stock/").service_response("get")
+        finally:
+            request_deadline.reset(token)
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        mocked_request.assert_not_called()
@@ -0,0 +1,232 @@
+import datetime
+import gzip
+import json
+from decimal import Decimal
+from unittest import mock
+
+import cbor2
+import httpx
+import msgpack
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+from requests import Session
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from microservice_request.encoding import CBORCodec, JSONCodec, MsgPackCodec, get_codec, get_json_backend
+from microservice_request.exceptions import MicroserviceException
+from microservice_request.parsers import CBORParser, JSONParser, MsgPackParser
+from microservice_request.renderers import CBORRenderer, MsgPackRenderer
+from microservice_request.services import ConnectionService
+from microservice_request.test import RequestTestCaseMixin
+
+from .test_async_services import mock_transport
+
+
+class AnalyticsService(ConnectionService):
+    service = "http://analytics:8000"
+    codec = MsgPackCodec()
+    compress_request = True
+    compress_min_size = 64
+
+
+class EchoView(APIView):
+    parser_classes = (JSONParser, MsgPackParser, CBORParser)
+    renderer_classes = (MsgPackRenderer, CBORRenderer)
+
+    def post(self, request):
+        return Response(request.data)
+
+
+class CodecTestCase(SimpleTestCase):
+    def test_round_trip(self):
+        data = {"id": 1, "tags": ["a", "b"], "nested": {"ok": True, "value": None}}
+        for codec in (JSONCodec(), MsgPackCodec(), CBORCodec()):
+            with self.subTest(codec=codec.media_type):
+                self.assertEqual(codec.decode(codec.encode(data)), data)
+
+    def test_drf_types(self):
+        data = {"price": Decimal("9.99"), "created": datetime.date(2022, 6, 19)}
+        self.assertEqual(
+            msgpack.unpackb(MsgPackCodec().encode(data)), {"price": 9.99, "created": "2022-06-19"}
+        )
+        self.assertEqual(json.loads(JSONCodec().encode(data)), {"price": 9.99, "created": "2022-06-19"})
+
+    def test_get_codec(self):
+        self.assertIsInstance(get_codec("application/msgpack"), MsgPackCodec)
+        self.assertIsInstance(get_codec("application/x-msgpack"), MsgPackCodec)
+        self.assertIsInstance(get_codec("application/json; charset=utf-8"), JSONCodec)
+        self.assertIsNone(get_codec("text/html"))
+        self.assertIsNone(get_codec(None))
+
+    def test_accept(self):
+        self.assertEqual(MsgPackCodec().accept, "application/msgpack, application/json;q=0.9")
+        self.assertEqual(JSONCodec().accept, "application/json")
+
+
+class JSONBackendTestCase(RequestTestCaseMixin, SimpleTestCase):
+    def test_backend_setting(self):
+        self.assertEqual(get_json_backend().name, "json")
+        with override_settings(REQUEST_JSON_BACKEND="orjson"):
+            self.assertEqual(get_json_backend().name, "orjson")
+        with override_settings(REQUEST_JSON_BACKEND="auto"):
+            self.assertEqual(get_json_backend().name, "orjson")
+        with override_settings(REQUEST_JSON_BACKEND="simplejson"):
+            with self.assertRaises(ImproperlyConfigured):
+                get_json_backend()
+        self.assertEqual(get_json_backend().name, "json")
+
+    @override_settings(REQUEST_JSON_BACKEND="orjson")
+    def test_drf_types(self):
+        data = {
+            "price": Decimal("9.99"),
+            "created": datetime.datetime(2022, 6, 19, 10, 30, 0, 123456),
+            1: "a",
+        }
+        self.assertEqual(
+            json.loads(JSONCodec().encode(data)),
+            {"price": 9.99, "created": "2022-06-19T10:30:00.123456", "1": "a"},
+        )
+
+    @override_settings(REQUEST_JSON_BACKEND="orjson")
+    @mock.patch.object(Session, "request")
+    def test_service(self, mocked_request):
+        mocked_request.return_value = self._mock_response(json={"id": 1}, status_code=status.HTTP_200_OK)
+        response = ConnectionService("http://localhost:9000").service_response("post", json={"title": "New"})
+        self.assertEqual(response.data, {"id": 1})
+        mocked_request.return_value.json.assert_not_called()
+        kwargs = mocked_request.call_args.kwargs
+        self.assertEqual(kwargs["data"], b'{"title":"New"}')
+        self.assertEqual(kwargs["headers"]["Content-Type"], "application/json")
+
+    @override_settings(REQUEST_JSON_BACKEND="orjson")
+    @mock.patch.object(Session, "request")
+    def test_decode_error(self, mocked_request):
+        mocked_request.return_value = response = self._mock_response(status_code=status.HTTP_502_BAD_GATEWAY)
+        response.content = b"<html><head><title>502 Bad Gateway</title></head></html>"
+        with self.assertRaises(MicroserviceException):
+            ConnectionService("http://localhost:9000").service_response("get")
+
+
+@mock.patch.object(Session, "request")
+class ServiceEncodingTestCase(RequestTestCaseMixin, SimpleTestCase):
+    def msgpack_response(self, data):
+        response = self._mock_response(
+            status_code=status.HTTP_200_OK, headers={"Content-Type": "application/msgpack"}
+        )
+        response.content = msgpack.packb(data)
+        return response
+
+    def test_request_encoding(self, mocked_request):
+        mocked_request.return_value = self.msgpack_response({"id": 1})
+        AnalyticsService("/api/v1/events/").service_response("post", json={"event": "click"})
+        kwargs = mocked_request.call_args.kwargs
+        self.assertEqual(msgpack.unpackb(kwargs["data"]), {"event": "click"})
+        self.assertNotIn("json", kwargs)
+        self.assertEqual(kwargs["headers"]["Content-Type"], "application/msgpack")
+        self.assertEqual(kwargs["headers"]["Accept"], "application/msgpack, application/json;q=0.9")
+        self.assertNotIn("Content-Encoding", kwargs["headers"])
+
+    def test_request_compression(self, mocked_request):
+        mocked_request.return_value = self.msgpack_response({"id": 1})
+        events = [{"event": "click", "id": i} for i in range(20)]
+        AnalyticsService("/api/v1/events/").service_response("post", json=events, headers={"X-Batch": "1"})
+        kwargs = mocked_request.call_args.kwargs
+        self.assertEqual(kwargs["headers"]["Content-Encoding"], "gzip")
+        self.assertEqual(kwargs["headers"]["X-Batch"], "1")
+        self.assertEqual(msgpack.unpackb(gzip.decompress(kwargs["data"])), events)
+
+    def test_response_decoding(self, mocked_request):
+        mocked_request.return_value = self.msgpack_response({"id": 1, "name": "report"})
+        response = AnalyticsService("/api/v1/reports/1/").service_response("get")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"id": 1, "name": "report"})
+        self.assertIsNone(response.content_type)
+
+    def test_response_decode_error(self, mocked_request):
+        response = self._mock_response(
+            status_code=status.HTTP_200_OK, headers={"Content-Type": "application/cbor"}
+        )
+        response.content = b"\xff\xff"
+        mocked_request.return_value = response
+        with self.assertRaises(Exception):
+            AnalyticsService("/api/v1/reports/1/").service_response("get")
+
+
+class AsyncServiceEncodingTestCase(SimpleTestCase):
+    async def test_request_encoding(self):
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(
+                status.HTTP_201_CREATED,
+                content=cbor2.dumps({"id": 1}),
+                headers={"Content-Type": "application/cbor"},
+            )
+
+        with mock_transport(handler):
+            response = await AnalyticsService("/api/v1/events/").aservice_response(
+                "post", json={"event": "click"}
+            )
+        self.assertEqual(response.data, {"id": 1})
+        self.assertEqual(msgpack.unpackb(requests[0].content), {"event": "click"})
+        self.assertEqual(requests[0].headers["Content-Type"], "application/msgpack")
+
+
+class ParserRendererTestCase(SimpleTestCase):
+    factory = APIRequestFactory()
+
+    def test_msgpack(self):
+        body = msgpack.packb({"event": "click"})
+        request = self.factory.post(
+            "/", body, content_type="application/msgpack", HTTP_ACCEPT="application/msgpack"
+        )
+        response = EchoView.as_view()(request)
+        response.render()
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(response.content), {"event": "click"})
+
+    def test_compressed_body(self):
+        for content_type, body in (
+            ("application/json", b'{"event": "click"}'),
+            ("application/cbor", cbor2.dumps({"event": "click"})),
+        ):
+            with self.subTest(content_type=content_type):
+                request = self.factory.post(
+                    "/",
+                    gzip.compress(body),
+                    content_type=content_type,
+                    HTTP_ACCEPT="application/cbor",
+                    HTTP_CONTENT_ENCODING="gzip",
+                )
+                response = EchoView.as_view()(request)
+                response.render()
+                self.assertEqual(cbor2.loads(response.content), {"event": "click"})
+
+    @override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=64 * 1024)
+    def test_decompression_limit(self):
+        # the compressed body passes Django's own check, the decompressed one doesn't
+        for size, status_code in (
+            (64 * 1024, status.HTTP_200_OK),
+            (10 * 1024 * 1024, status.HTTP_400_BAD_REQUEST),
+        ):
+            with self.subTest(size=size):
+                body = json.dumps({"event": "x" * (size - 13)}).encode()
+                self.assertEqual(len(body), size)
+                request = self.factory.post(
+                    "/", gzip.compress(body), content_type="application/json", HTTP_CONTENT_ENCODING="gzip"
+                )
+                response = EchoView.as_view()(request)
+                self.assertEqual(response.status_code, status_code)
+
+    def test_parse_error(self):
+        for content_encoding, body in (("", b"\xc1"), ("gzip", b"not gzip"), ("br", b"\x80")):
+            with self.subTest(content_encoding=content_encoding):
+                request = self.factory.post(
+                    "/", body, content_type="application/msgpack", HTTP_CONTENT_ENCODING=content_encoding
+                )
+                response = EchoView.as_view()(request)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
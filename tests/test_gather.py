@@ -0,0 +1,95 @@
+import time
+from unittest import mock
+
+import httpx
+from django.test import SimpleTestCase
+from requests.exceptions import ConnectionError
+from rest_framework import status
+
+from microservice_request.gather import RequestSpec
+from microservice_request.pool import async_client_registry
+from microservice_request.services import ConnectionService
+from microservice_request.test import RequestTestCaseMixin
+
+
+class UserService(ConnectionService):
+    service = "http://users:8000"
+
+
+class OrderService(ConnectionService):
+    service = "http://orders:8000"
+
+
+class GatherTestCase(RequestTestCaseMixin, SimpleTestCase):
+    def _fake_method(self, delays: dict):
+        def method(service, method, **kwargs):
+            delay = delays[service.url]
+            if delay is None:
+                raise ConnectionError("connection refused")
+            time.sleep(delay)
+            return self._mock_response(json={"url": service.url, **kwargs}, status_code=status.HTTP_200_OK)
+
+        return mock.patch.object(ConnectionService, "_method", autospec=True, side_effect=method)
+
+    def test_results_in_order(self):
+        delays = {"http://users:8000/api/v1/users/1/": 0.2, "http://orders:8000/api/v1/orders/": 0.2}
+        with self._fake_method(delays):
+            started = time.monotonic()
+            users, orders = ConnectionService.gather(
+                [
+                    (UserService("/api/v1/users/1/"), "get"),
+                    RequestSpec(OrderService("/api/v1/orders/"), "GET", {"params": {"user": 1}}),
+                ]
+            )
+            elapsed = time.monotonic() - started
+        self.assertLess(elapsed, 0.4)
+        self.assertEqual(users.json(), {"url": "http://users:8000/api/v1/users/1/"})
+        self.assertEqual(orders.json(), {"url": "http://orders:8000/api/v1/orders/", "params": {"user": 1}})
+
+    def test_errors_and_deadline(self):
+        delays = {
+            "http://users:8000/api/v1/users/1/": 0,
+            "http://users:8000/api/v1/users/2/": None,
+            "http://orders:8000/api/v1/orders/": 1,
+        }
+        with self._fake_method(delays):
+            results = ConnectionService.gather(
+                [
+                    (UserService("/api/v1/users/1/"), "get"),
+                    (UserService("/api/v1/users/2/"), "get"),
+                    (OrderService("/api/v1/orders/"), "get"),
+                ],
+                timeout=0.3,
+            )
+        self.assertEqual(results[0].status_code, status.HTTP_200_OK)
+        self.assertIsNone(results[1])
+        self.assertIsNone(results[2])
+
+    @mock.patch("requests.Session.request")
+    def test_transport_timeout(self, mocked_request):
+        mocked_request.return_value = self._mock_response(json={}, status_code=status.HTTP_200_OK)
+        for timeout, expected in ((0.5, 0.5), (None, 30)):
+            with self.subTest(timeout=timeout):
+                ConnectionService.gather([(UserService("/api/v1/users/1/"), "get")], timeout=timeout)
+                connect_timeout, read_timeout = mocked_request.call_args.kwargs["timeout"]
+                self.assertAlmostEqual(read_timeout, expected, delta=0.1)
+                self.assertLessEqual(read_timeout, expected)
+
+    async def test_agather(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.host == "orders":
+                raise httpx.ConnectError("connection refused")
+            return httpx.Response(status.HTTP_200_OK, json={"path": request.url.path})
+
+        create_client = mock.patch.object(
+            async_client_registry,
+            "create_client",
+            side_effect=lambda options: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        )
+        with create_client:
+            users, orders = await ConnectionService.agather(
+                [(UserService("/api/v1/users/1/"), "get"), (OrderService("/api/v1/orders/"), "get")],
+                timeout=1,
+            )
+        self.assertEqual(users.json(), {"path": "/api/v1/users/1/"})
+        self.assertIsNone(orders)
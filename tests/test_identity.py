@@ -0,0 +1,90 @@
+from unittest import mock
+
+import httpx
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.test import TestCase
+from django.utils.functional import SimpleLazyObject
+from rest_framework import status
+from rest_framework.test import APIRequestFactory
+
+from microservice_request.identity import RemotePrincipal, get_principal
+from microservice_request.middleware import RemoteUserMiddleware
+from microservice_request.services import MicroServiceConnect
+
+from .test_async_services import mock_transport
+
+User = get_user_model()
+
+
+class GatewayService(MicroServiceConnect):
+    service = "http://orders:8000"
+    PROXY_REMOTE_USER = True
+
+
+class RemotePrincipalTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="test_admin", password="test_password", is_staff=True)
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+
+    @mock.patch("microservice_request.identity.TRUST_REMOTE_USER", True)
+    def test_from_headers(self):
+        request = self.factory.get("/", HTTP_REMOTE_USER="5", HTTP_REMOTE_USER_IS_STAFF="True")
+        principal = get_principal(request)
+        self.assertEqual(principal, RemotePrincipal(5, {"is_staff": "True"}))
+        self.assertTrue(principal.is_authenticated)
+        self.assertEqual(principal.headers, {"Remote-User": "5", "Remote-User-Is-Staff": "True"})
+        self.assertIs(get_principal(request), principal)
+
+    @mock.patch("microservice_request.identity.REMOTE_USER_CLAIMS", ("username", "is_staff"))
+    def test_from_user(self):
+        principal = RemotePrincipal.from_user(self.user)
+        self.assertEqual(principal.id, self.user.pk)
+        self.assertEqual(principal.claims, {"username": "test_admin", "is_staff": "True"})
+        self.assertIsNone(RemotePrincipal.from_user(AnonymousUser()))
+
+    @mock.patch("microservice_request.identity.TRUST_REMOTE_USER", True)
+    def test_proxy_headers_without_user(self):
+        request = self.factory.get("/", HTTP_REMOTE_USER="5", HTTP_REMOTE_USER_USERNAME="john")
+        request.user = SimpleLazyObject(mock.Mock(side_effect=AssertionError("user must not be loaded")))
+        headers = GatewayService(request, "/api/v1/orders/").headers
+        self.assertEqual(headers["Remote-User"], "5")
+        self.assertEqual(headers["Remote-User-Username"], "john")
+
+    def test_untrusted_headers(self):
+        for user, remote_user in ((AnonymousUser(), None), (self.user, str(self.user.pk))):
+            with self.subTest(user=user):
+                request = self.factory.get("/", HTTP_REMOTE_USER="1", HTTP_REMOTE_USER_IS_STAFF="True")
+                request.user = user
+                RemoteUserMiddleware(lambda request: None).process_request(request)
+                self.assertEqual(request.remote_user, 1)
+                headers = GatewayService(request, "/api/v1/orders/").headers
+                self.assertEqual(headers.get("Remote-User"), remote_user)
+                self.assertNotIn("Remote-User-Is-Staff", headers)
+
+    def test_lazy_remote_user(self):
+        request = self.factory.get("/")
+        get_user = mock.Mock(return_value=self.user)
+        request.user = SimpleLazyObject(get_user)
+        RemoteUserMiddleware(lambda request: None).process_request(request)
+        get_user.assert_not_called()
+        self.assertEqual(request.remote_user, self.user.pk)
+        self.assertEqual(GatewayService(request, "/api/v1/orders/").headers["Remote-User"], str(self.user.pk))
+        get_user.assert_called_once()
+
+    async def test_async_proxy_user(self):
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(status.HTTP_200_OK, json={})
+
+        request = self.factory.get("/")
+        request.user = SimpleLazyObject(mock.Mock(side_effect=AssertionError("sync user must not be loaded")))
+        request.auser = mock.AsyncMock(return_value=self.user)
+        with mock_transport(handler):
+            await GatewayService(request, "/api/v1/orders/").arequest_to_service("get")
+        self.assertEqual(requests[0].headers["Remote-User"], str(self.user.pk))
@@ -0,0 +1,179 @@
+import asyncio
+from unittest import mock
+
+import httpx
+from django.core.signals import request_finished
+from django.test import RequestFactory, SimpleTestCase
+from requests import Session
+from rest_framework import status
+
+from microservice_request.loader import DataLoader, batching, get_request_loader, request_loaders
+from microservice_request.middleware import RemoteUserMiddleware
+from microservice_request.services import ConnectionService
+from microservice_request.test import RequestTestCaseMixin
+
+from .test_async_services import mock_transport
+
+
+class UserService(ConnectionService):
+    service = "http://users:8000"
+    max_batch_size = 3
+
+    def batch_fetch(self, keys):
+        response = self.request_to_service("get", params={"id__in": ",".join(map(str, keys))})
+        return {user["id"]: user for user in response.json()}
+
+    async def abatch_fetch(self, keys):
+        response = await self.arequest_to_service("get", params={"id__in": ",".join(map(str, keys))})
+        return {user["id"]: user for user in response.json()}
+
+
+class DataLoaderTestCase(SimpleTestCase):
+    def test_load(self):
+        fetch = mock.Mock(side_effect=lambda keys: {key: key * 10 for key in keys if key != 3})
+        loader = DataLoader(fetch)
+        pending = [loader.load(key) for key in (1, 2, 1, 3)]
+        self.assertEqual([item.result() for item in pending], [10, 20, 10, None])
+        fetch.assert_called_once_with([1, 2, 3])
+        self.assertEqual(loader.load_many([2, 1]), [20, 10])
+        self.assertEqual(fetch.call_count, 1)
+
+    def test_error(self):
+        fetch = mock.Mock(side_effect=[ValueError("unavailable"), {1: "a"}])
+        loader = DataLoader(fetch)
+        with self.assertRaises(ValueError):
+            loader.load(1).result()
+        self.assertEqual(loader.load(1).result(), "a")
+
+    def test_max_batch_size(self):
+        fetch = mock.Mock(side_effect=lambda keys: dict.fromkeys(keys))
+        DataLoader(fetch, max_batch_size=2).load_many(range(5))
+        self.assertEqual([call.args[0] for call in fetch.call_args_list], [[0, 1], [2, 3], [4]])
+
+    async def test_aload(self):
+        calls = []
+
+        async def fetch(keys):
+            calls.append(keys)
+            return {key: key * 10 for key in keys}
+
+        loader = DataLoader(abatch_fetch=fetch)
+        self.assertEqual(
+            await asyncio.gather(loader.aload(1), loader.aload(2), loader.aload(1)), [10, 20, 10]
+        )
+        self.assertEqual(await loader.aload_many([1, 2]), [10, 20])
+        self.assertEqual(calls, [[1, 2]])
+
+    async def test_dispatch_task(self):
+        started = asyncio.Event()
+
+        async def fetch(keys):
+            started.set()
+            await asyncio.sleep(10)
+
+        loader = DataLoader(abatch_fetch=fetch)
+        load = asyncio.ensure_future(loader.aload(1))
+        await started.wait()
+        self.assertIsNotNone(task := loader._dispatch_task)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await load
+        self.assertIsNone(loader._dispatch_task)
+
+    def test_gather_loaders(self):
+        def method(service, method, **kwargs):
+            return get_request_loader(type(service), DataLoader)
+
+        with batching(), mock.patch.object(ConnectionService, "_method", autospec=True, side_effect=method):
+            loader = get_request_loader(UserService, DataLoader)
+            first, second = ConnectionService.gather(
+                [(UserService("/api/v1/users/"), "get"), (UserService("/api/v1/users/"), "get")]
+            )
+            self.assertNotIn(loader, (first, second))
+            self.assertFalse(first.memoize or second.memoize)
+            self.assertEqual(list(request_loaders.get()), [UserService])
+
+
+@mock.patch.object(Session, "request")
+class ServiceLoaderTestCase(RequestTestCaseMixin, SimpleTestCase):
+    def users(self, *args, params, **kwargs):
+        users = [{"id": int(key)} for key in params["id__in"].split(",")]
+        return self._mock_response(json=users, status_code=status.HTTP_200_OK)
+
+    def test_load(self, mocked_request):
+        mocked_request.side_effect = self.users
+        with batching():
+            pending = [UserService("/api/v1/users/").load(key) for key in range(1, 5)]
+            self.assertEqual([item.result() for item in pending], [{"id": key} for key in range(1, 5)])
+            self.assertEqual(mocked_request.call_count, 2)
+            self.assertEqual(UserService("/api/v1/users/").load_many([4, 1]), [{"id": 4}, {"id": 1}])
+            self.assertEqual(mocked_request.call_count, 2)
+        with batching():
+            UserService("/api/v1/users/").load(1).result()
+        self.assertEqual(mocked_request.call_count, 3)
+
+    def test_unscoped(self, mocked_request):
+        mocked_request.side_effect = self.users
+        pending = [UserService("/api/v1/users/").load(key) for key in (1, 2)]
+        self.assertEqual([item.result() for item in pending], [{"id": 1}, {"id": 2}])
+        self.assertEqual(mocked_request.call_count, 1)
+        for _ in range(2):
+            self.assertEqual(UserService("/api/v1/users/").load(1).result(), {"id": 1})
+        self.assertEqual(mocked_request.call_count, 3)
+        self.assertEqual(list(UserService("/api/v1/users/").loader._memo), [1])
+
+    def test_middleware_scope(self, mocked_request):
+        mocked_request.side_effect = self.users
+
+        def view(request):
+            return [UserService("/api/v1/users/").load(1).result() for _ in range(2)]
+
+        middleware = RemoteUserMiddleware(view)
+        for _ in range(2):
+            self.assertEqual(middleware(RequestFactory().get("/")), [{"id": 1}, {"id": 1}])
+        self.assertEqual(mocked_request.call_count, 2)
+        self.assertIsNone(request_loaders.get())
+
+    def test_request_finished(self, mocked_request):
+        mocked_request.side_effect = self.users
+        with batching():
+            UserService("/api/v1/users/").load(1).result()
+            request_finished.send(sender=None)
+            UserService("/api/v1/users/").load(1).result()
+        self.assertEqual(mocked_request.call_count, 2)
+
+    def test_not_implemented(self, mocked_request):
+        with self.assertRaises(NotImplementedError):
+            ConnectionService("http://users:8000/api/v1/users/").load(1).result()
+
+
+class AsyncServiceLoaderTestCase(SimpleTestCase):
+    async def test_aload(self):
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            keys = request.url.params["id__in"].split(",")
+            return httpx.Response(status.HTTP_200_OK, json=[{"id": int(key)} for key in keys])
+
+        with mock_transport(handler):
+            users = await asyncio.gather(*(UserService("/api/v1/users/").aload(key) for key in (1, 2, 2)))
+        self.assertEqual(users, [{"id": 1}, {"id": 2}, {"id": 2}])
+        self.assertEqual(len(requests), 1)
+
+    async def test_async_view(self):
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            keys = request.url.params["id__in"].split(",")
+            return httpx.Response(status.HTTP_200_OK, json=[{"id": int(key)} for key in keys])
+
+        async def view(request):
+            users = await asyncio.gather(*(UserService("/api/v1/users/").aload(key) for key in (1, 2, 3)))
+            return users + [await UserService("/api/v1/users/").aload(1)]
+
+        with mock_transport(handler):
+            users = await RemoteUserMiddleware(view)(RequestFactory().get("/"))
+        self.assertEqual(users, [{"id": 1}, {"id": 2}, {"id": 3}, {"id": 1}])
+        self.assertEqual(len(requests), 1)
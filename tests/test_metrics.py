@@ -0,0 +1,106 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import SimpleTestCase
+from requests import Session
+from requests.exceptions import ConnectionError
+from rest_framework import status
+
+from microservice_request.metrics import Histogram, MetricsCollector, metrics_view
+from microservice_request.services import ConnectionService
+from microservice_request.signals import service_request_finished, service_request_started
+from microservice_request.test import RequestTestCaseMixin
+
+
+class ReportService(ConnectionService):
+    service = "http://reports:8000"
+
+
+class HistogramTestCase(SimpleTestCase):
+    def test_render(self):
+        histogram = Histogram("latency_seconds", "Latency", ("service",), buckets=(0.1, 1))
+        histogram.observe("users", value=0.05)
+        histogram.observe("users", value=0.5)
+        histogram.observe("users", value=5)
+        self.assertEqual(histogram.get("users"), (3, 5.55))
+        self.assertEqual(
+            histogram.render(),
+            "\n".join(
+                [
+                    "# HELP latency_seconds Latency",
+                    "# TYPE latency_seconds histogram",
+                    'latency_seconds_bucket{service="users",le="0.1"} 1',
+                    'latency_seconds_bucket{service="users",le="1"} 2',
+                    'latency_seconds_bucket{service="users",le="+Inf"} 3',
+                    'latency_seconds_count{service="users"} 3',
+                    'latency_seconds_sum{service="users"} 5.55',
+                ]
+            ),
+        )
+
+
+@mock.patch.object(Session, "request")
+class MetricsCollectorTestCase(RequestTestCaseMixin, SimpleTestCase):
+    def setUp(self):
+        self.collector = MetricsCollector()
+        self.collector.connect()
+
+    def tearDown(self):
+        self.collector.disconnect()
+
+    def test_request_metrics(self, mocked_request):
+        response = self._mock_response(json={"id": 1}, status_code=status.HTTP_200_OK)
+        response.elapsed = timedelta(milliseconds=20)
+        response.raw.retries.history = ("retry",)
+        mocked_request.return_value = response
+        ReportService("/api/v1/reports/").service_response("get")
+        labels = ("ReportService", "get")
+        self.assertEqual(self.collector.requests.get(*labels, "200"), 1)
+        self.assertEqual(self.collector.in_flight.get(*labels), 0)
+        self.assertEqual(self.collector.retries.get(*labels), 1)
+        self.assertEqual(self.collector.duration.get(*labels)[0], 1)
+        self.assertEqual(self.collector.ttfb.get(*labels), (1, 0.02))
+        self.assertEqual(self.collector.decode.get(*labels)[0], 1)
+        self.assertEqual(self.collector.build.get(*labels)[0], 1)
+
+    def test_error_metrics(self, mocked_request):
+        mocked_request.side_effect = ConnectionError("connection refused")
+        ReportService("/api/v1/reports/").service_response("post", json={})
+        self.assertEqual(self.collector.errors.get("ReportService", "post", "ConnectionError"), 1)
+        self.assertEqual(self.collector.in_flight.get("ReportService", "post"), 0)
+
+    def test_hooks(self, mocked_request):
+        mocked_request.return_value = self._mock_response(json={}, status_code=status.HTTP_200_OK)
+        started, finished = mock.Mock(), mock.Mock()
+        service_request_started.connect(started, sender=ReportService)
+        service_request_finished.connect(finished, sender=ReportService)
+        try:
+            service = ReportService("/api/v1/reports/")
+            service.service_response("get")
+        finally:
+            service_request_started.disconnect(started, sender=ReportService)
+            service_request_finished.disconnect(finished, sender=ReportService)
+        started.assert_called_once_with(
+            signal=service_request_started, sender=ReportService, service=service, method="get"
+        )
+        self.assertEqual(finished.call_args.kwargs["response"], mocked_request.return_value)
+        self.assertIsNone(finished.call_args.kwargs["error"])
+
+    def test_prometheus_export(self, mocked_request):
+        mocked_request.return_value = self._mock_response(json={}, status_code=status.HTTP_200_OK)
+        ReportService("/api/v1/reports/").service_response("get")
+        ReportService().host.session.get_adapter("http://reports:8000").poolmanager.connection_from_url(
+            "http://reports:8000"
+        )
+        text = self.collector.render()
+        self.assertIn(
+            'microservice_request_requests_total{service="ReportService",method="get",status="200"} 1', text
+        )
+        self.assertIn('microservice_request_pool_size{origin="http://reports:8000"} 10', text)
+        self.assertIn("microservice_request_requests_total", self.collector.snapshot())
+
+    def test_metrics_view(self, mocked_request):
+        response = metrics_view(None)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertIn(b"# TYPE microservice_request_requests_total counter", response.content)
@@ -1,9 +1,14 @@
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
 from django.test import override_settings
 from django.utils.functional import SimpleLazyObject
 from rest_framework.request import Request
 from rest_framework.test import APIRequestFactory, APITestCase
 
+from microservice_request.deadline import request_deadline
 from microservice_request.middleware import RemoteUserMiddleware
 
 User = get_user_model()
@@ -51,3 +56,61 @@ class MiddlewareTestCase(APITestCase):
         self.middleware.process_request(request)
         self.assertIsInstance(request.remote_user, SimpleLazyObject)
         self.assertEqual(request.remote_user, 1)
+
+    def test_request_anonymous_user(self):
+        request = self.factory.get("/")
+        request.user = AnonymousUser()
+        self.middleware.process_request(request)
+        self.assertFalse(request.remote_user)
+        self.assertEqual(request.remote_user, None)
+
+    def test_request_deadline(self):
+        request = self.factory.get("/", **{"HTTP_X_REQUEST_DEADLINE": "1700000000.5"})
+        self.middleware.process_request(request)
+        self.assertEqual(request.deadline, 1700000000.5)
+        self.assertEqual(request_deadline.get(), 1700000000.5)
+        self.middleware.process_response(request, None)
+        self.assertIsNone(request_deadline.get())
+
+    def test_request_wrong_deadline(self):
+        request = self.factory.get("/", **{"HTTP_X_REQUEST_DEADLINE": "tomorrow"})
+        self.middleware.process_request(request)
+        self.assertIsNone(request.deadline)
+        self.assertIsNone(request_deadline.get())
+
+
+class AsyncMiddlewareTestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="test_admin", password="test_password")
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+
+    async def get_response(self, request):
+        return {"remote_user": request.remote_user, "deadline": request_deadline.get()}
+
+    async def test_async_mode(self):
+        middleware = RemoteUserMiddleware(self.get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        self.assertFalse(iscoroutinefunction(RemoteUserMiddleware(lambda request: None)))
+
+        request = self.factory.get("/", HTTP_REMOTE_USER="7", HTTP_X_REQUEST_DEADLINE="1700000000.5")
+        self.assertEqual(await middleware(request), {"remote_user": 7, "deadline": 1700000000.5})
+        self.assertIsNone(request_deadline.get())
+
+    async def test_async_auth_user(self):
+        async def get_response(request):
+            return request
+
+        middleware = RemoteUserMiddleware(get_response)
+        for user, remote_user in ((self.user, self.user.id), (AnonymousUser(), None)):
+            with self.subTest(user=user):
+                request = self.factory.get("/")
+                request.user = SimpleLazyObject(lambda: self.fail("user must not be loaded"))
+                request.auser = mock.AsyncMock(return_value=user)
+                request = await middleware(request)
+                request.auser.assert_not_called()
+                self.assertEqual(await request.aremote_user(), remote_user)
+                self.assertEqual(await request.aremote_user(), remote_user)
+                request.auser.assert_awaited_once()
@@ -0,0 +1,126 @@
+import io
+import threading
+from unittest import mock
+
+import httpx
+from django.core.files import File
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import MemoryFileUploadHandler
+from django.http.multipartparser import MultiPartParser
+from django.test import SimpleTestCase
+from requests import Request, Session
+from rest_framework import status
+
+from microservice_request.multipart import MultipartEncoder
+from microservice_request.services import ConnectionService
+from microservice_request.test import RequestTestCaseMixin
+
+from .test_async_services import mock_transport
+
+
+class UploadService(ConnectionService):
+    service = "http://storage:8000"
+    stream_upload = True
+    stream_chunk_size = 4
+
+
+def parse(encoder: MultipartEncoder, body: bytes):
+    meta = {"CONTENT_TYPE": encoder.content_type, "CONTENT_LENGTH": str(len(body))}
+    return MultiPartParser(meta, io.BytesIO(body), [MemoryFileUploadHandler()]).parse()
+
+
+class MultipartEncoderTestCase(SimpleTestCase):
+    def test_encode(self):
+        encoder = MultipartEncoder(
+            {"title": "Report", "tags": ["a", "b"]},
+            {
+                "file": ("report.csv", File(io.BytesIO(b"a,b\n1,2\n")), "text/csv"),
+                "raw": io.BytesIO(b"\x00\x01"),
+            },
+            chunk_size=2,
+        )
+        chunks = list(encoder)
+        body = b"".join(chunks)
+        self.assertEqual(encoder.len, len(body))
+        self.assertIn(b"a,", chunks)
+        self.assertNotIn(b"a,b\n1,2\n", chunks)
+        data, files = parse(encoder, body)
+        self.assertEqual(data.getlist("tags"), ["a", "b"])
+        self.assertEqual(data["title"], "Report")
+        self.assertEqual(files["file"].name, "report.csv")
+        self.assertEqual(files["file"].content_type, "text/csv")
+        self.assertEqual(files["file"].read(), b"a,b\n1,2\n")
+        self.assertEqual(files["raw"].name, "file")
+        self.assertEqual(files["raw"].read(), b"\x00\x01")
+
+    def test_skip_none(self):
+        encoder = MultipartEncoder({"title": None, "tags": ["a", None]}, {"file": None})
+        data, files = parse(encoder, b"".join(encoder))
+        self.assertEqual(dict(data.lists()), {"tags": ["a"]})
+        self.assertFalse(files)
+
+    async def test_aiter(self):
+        threads = []
+
+        class TrackedFile(io.BytesIO):
+            def read(self, size=-1):
+                threads.append(threading.get_ident())
+                return super().read(size)
+
+        encoder = MultipartEncoder({"title": "Report"}, {"file": TrackedFile(b"a,b\n1,2\n")}, chunk_size=2)
+        body = b"".join([chunk async for chunk in encoder.aiter()])
+        self.assertTrue(threads)
+        self.assertNotIn(threading.get_ident(), threads)
+        self.assertEqual(body, b"".join(encoder))
+
+    def test_content_length(self):
+        encoder = MultipartEncoder(files={"file": SimpleUploadedFile("a.txt", b"data")})
+        prepared = Request("POST", "http://storage:8000/", data=encoder).prepare()
+        self.assertEqual(prepared.headers["Content-Length"], str(len(b"".join(encoder))))
+
+    def test_unknown_size(self):
+        class Pipe:
+            def __init__(self):
+                self.chunks = [b"data", b""]
+
+            def read(self, size):
+                return self.chunks.pop(0)
+
+        encoder = MultipartEncoder(files={"file": ("pipe", Pipe())})
+        self.assertIsNone(encoder.len)
+        prepared = Request("POST", "http://storage:8000/", data=encoder).prepare()
+        self.assertEqual(prepared.headers["Transfer-Encoding"], "chunked")
+
+
+class StreamUploadTestCase(RequestTestCaseMixin, SimpleTestCase):
+    @mock.patch.object(Session, "request")
+    def test_send_file(self, mocked_request):
+        mocked_request.return_value = self._mock_response(json={"id": 1}, status_code=status.HTTP_201_CREATED)
+        upload = SimpleUploadedFile("photo.jpg", b"jpeg bytes", content_type="image/jpeg")
+        response = UploadService("/api/v1/files/").service_response("send_file", files={"file": upload})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        kwargs = mocked_request.call_args.kwargs
+        encoder = kwargs["data"]
+        self.assertIsInstance(encoder, MultipartEncoder)
+        self.assertNotIn("files", kwargs)
+        self.assertEqual(kwargs["headers"]["Content-Type"], encoder.content_type)
+        self.assertEqual(parse(encoder, b"".join(encoder))[1]["file"].read(), b"jpeg bytes")
+
+    async def test_asend_file(self):
+        received = []
+
+        def handler(request):
+            received.append((request.headers, request.read()))
+            return httpx.Response(status.HTTP_201_CREATED, json={"id": 1})
+
+        upload = SimpleUploadedFile("photo.jpg", b"jpeg bytes", content_type="image/jpeg")
+        with mock_transport(handler):
+            response = await UploadService("/api/v1/files/").aservice_response(
+                "send_file", files={"file": upload}, data={"album": "1"}
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        headers, body = received[0]
+        self.assertEqual(headers["Content-Length"], str(len(body)))
+        self.assertNotIn("Transfer-Encoding", headers)
+        self.assertIn(b"jpeg bytes", body)
+        self.assertIn(b'name="album"', body)
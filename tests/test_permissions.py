@@ -1,4 +1,5 @@
 from base64 import b64encode
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -6,12 +7,13 @@ from django.test import override_settings
 from django.urls import path
 from rest_framework import status
 from rest_framework.authentication import BasicAuthentication, SessionAuthentication
+from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
-from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory, APITestCase
 from rest_framework.views import APIView
 
-from microservice_request.permissions import HasApiKeyOrIsAuthenticated
+from microservice_request.permissions import ApiKeyAuthentication, HasApiKeyOrIsAuthenticated, verify_api_key
 
 User = get_user_model()
 
@@ -35,6 +37,11 @@ urlpatterns = [
         PermissionTestView.as_view(authentication_classes=(BasicAuthentication,)),
         name="basic_view_permission",
     ),
+    path(
+        "view/api-key/",
+        PermissionTestView.as_view(authentication_classes=(ApiKeyAuthentication, SessionAuthentication)),
+        name="api_key_view_permission",
+    ),
 ]
 
 
@@ -62,6 +69,63 @@ class PermissionTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data, {"detail": "OK"})
 
+    @override_settings(API_KEY="new-key", API_KEYS=["old-key"])
+    def test_rotating_api_keys(self):
+        self.assertTrue(verify_api_key("old-key"))
+        self.assertFalse(verify_api_key(settings.API_KEY_HEADER))
+        for key in ("new-key", "old-key"):
+            with self.subTest(key=key):
+                self.client.credentials(HTTP_AUTHORIZATION=f"{settings.API_KEY_HEADER} {key}")
+                response = self.client.post(self.url_without_auth, {"key": "value"})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(
+        MIDDLEWARE=[
+            "django.contrib.sessions.middleware.SessionMiddleware",
+            "django.contrib.auth.middleware.AuthenticationMiddleware",
+        ]
+    )
+    def test_wrong_api_key(self):
+        self.client.login(username="test_admin", password="test_password")
+        for header in (
+            settings.API_KEY_HEADER,
+            f"{settings.API_KEY_HEADER} ",
+            f"{settings.API_KEY_HEADER} wrong",
+        ):
+            with self.subTest(header=header):
+                self.client.credentials(HTTP_AUTHORIZATION=header)
+                response = self.client.post(self.url_session_auth, {"key": "value"})
+                self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.client.credentials()
+        response = self.client.post(self.url_session_auth, {"key": "value"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_api_key_skips_user(self):
+        request = Request(
+            APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"{settings.API_KEY_HEADER} {settings.API_KEY}")
+        )
+        with mock.patch.object(Request, "_authenticate") as authenticate:
+            self.assertTrue(HasApiKeyOrIsAuthenticated().has_permission(request, None))
+        authenticate.assert_not_called()
+
+    @override_settings(
+        MIDDLEWARE=[
+            "django.contrib.sessions.middleware.SessionMiddleware",
+            "django.contrib.auth.middleware.AuthenticationMiddleware",
+        ]
+    )
+    def test_api_key_authentication(self):
+        self.client.login(username="test_admin", password="test_password")
+        url = reverse("api_key_view_permission")
+        with mock.patch.object(SessionAuthentication, "authenticate") as session_authenticate:
+            self.client.credentials(HTTP_AUTHORIZATION=f"{settings.API_KEY_HEADER} {settings.API_KEY}")
+            self.assertEqual(self.client.post(url, {"key": "value"}).status_code, status.HTTP_200_OK)
+            self.client.credentials(HTTP_AUTHORIZATION=f"{settings.API_KEY_HEADER} wrong")
+            self.assertEqual(self.client.post(url, {"key": "value"}).status_code, status.HTTP_403_FORBIDDEN)
+        session_authenticate.assert_not_called()
+        self.client.credentials()
+        self.assertEqual(self.client.post(url, {"key": "value"}).status_code, status.HTTP_200_OK)
+
     @override_settings(
         MIDDLEWARE=[
             "django.contrib.sessions.middleware.SessionMiddleware",
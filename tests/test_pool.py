@@ -0,0 +1,140 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from microservice_request.pool import PoolOptions, SessionRegistry, get_origin
+from microservice_request.services import ConnectionService, HostService
+
+
+class PooledService(ConnectionService):
+    service = "http://pooled:8000"
+    pool_maxsize = 32
+    pool_idle_timeout = 60
+
+
+class SignedHost(HostService):
+    def session_request(self):
+        session = super().session_request()
+        session.headers["X-Signed"] = "1"
+        return session
+
+
+class SignedService(PooledService):
+    def __init__(self, url=None, **kwargs):
+        super().__init__(url, **kwargs)
+        self.host = SignedHost()
+
+
+class CookieHandler(BaseHTTPRequestHandler):
+    received = []
+
+    def do_GET(self):
+        self.received.append(self.headers.get("Cookie"))
+        self.send_response(200)
+        if self.path.startswith("/login/"):
+            self.send_header("Set-Cookie", "sessionid=userA; Path=/")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class SessionRegistryTestCase(SimpleTestCase):
+    def setUp(self):
+        self.registry = SessionRegistry()
+
+    def tearDown(self):
+        self.registry.clear()
+
+    def test_get_origin(self):
+        self.assertEqual(get_origin("https://API.host.com:8443/api/v1/?q=1"), "https://api.host.com:8443")
+        self.assertEqual(get_origin(None), "")
+
+    def test_same_origin_shares_session(self):
+        session = self.registry.get_session("http://web:8000/api/v1/users/")
+        self.assertIs(session, self.registry.get_session("http://web:8000/api/v1/products/"))
+        self.assertIsNot(session, self.registry.get_session("http://web:8001/api/v1/users/"))
+        self.assertEqual(len(self.registry), 2)
+
+    def test_pool_options(self):
+        options = PoolOptions(pool_connections=2, pool_maxsize=25)
+        session = self.registry.get_session("http://web:8000/", options)
+        adapter = session.get_adapter("http://web:8000/")
+        self.assertEqual(adapter._pool_maxsize, 25)
+        self.assertEqual(adapter._pool_connections, 2)
+
+    def test_idle_eviction(self):
+        options = PoolOptions(idle_timeout=10)
+        with mock.patch("microservice_request.pool.time.monotonic", return_value=100):
+            session = self.registry.get_session("http://web:8000/", options)
+        with mock.patch("microservice_request.pool.time.monotonic", return_value=105):
+            self.assertIs(session, self.registry.get_session("http://web:8000/", options))
+        with mock.patch("microservice_request.pool.time.monotonic", return_value=200):
+            self.assertEqual(self.registry.evict_idle(), 1)
+            self.assertIsNot(session, self.registry.get_session("http://web:8000/", options))
+
+    def test_in_use_session_not_evicted(self):
+        options = PoolOptions(idle_timeout=10)
+        with mock.patch("microservice_request.pool.time.monotonic", return_value=100):
+            entry = self.registry._acquire("http://web:8000/", options)
+        with mock.patch("microservice_request.pool.time.monotonic", return_value=200):
+            self.assertEqual(self.registry.evict_idle(), 0)
+            self.assertIs(entry.session, self.registry.get_session("http://web:8000/", options))
+            self.registry._release(entry)
+        with mock.patch("microservice_request.pool.time.monotonic", return_value=300):
+            self.assertEqual(self.registry.evict_idle(), 1)
+
+    def test_streamed_response_holds_session(self):
+        with mock.patch("requests.Session.request") as mocked_request:
+            response = self.registry.send("get", "http://web:8000/", stream=True)
+        entry = next(iter(self.registry._entries.values()))
+        self.assertEqual(entry.users, 1)
+        response.close()
+        response.close()
+        self.assertEqual(entry.users, 0)
+        mocked_request.assert_called_once_with(method="get", url="http://web:8000/", stream=True)
+
+    def test_cookies_not_shared(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), CookieHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        CookieHandler.received = []
+        url = f"http://127.0.0.1:{server.server_port}"
+        self.assertEqual(self.registry.send("get", f"{url}/login/").status_code, 200)
+        self.registry.send("get", f"{url}/profile/")
+        self.registry.send("get", f"{url}/profile/", cookies={"sessionid": "userB"})
+        self.assertEqual(CookieHandler.received, [None, None, "sessionid=userB"])
+        self.assertEqual(len(self.registry.get_session(url).cookies), 0)
+
+    def test_thread_safe_creation(self):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            sessions = list(executor.map(self.registry.get_session, ["http://web:8000/"] * 50))
+        self.assertEqual(len({id(session) for session in sessions}), 1)
+
+
+class ConnectionServicePoolTestCase(SimpleTestCase):
+    def test_service_reuses_session(self):
+        first = PooledService("/api/v1/users/")
+        second = PooledService("/api/v1/products/")
+        self.assertIs(first.host.session, second.host.session)
+
+    def test_service_pool_options(self):
+        service = PooledService()
+        self.assertEqual(service.pool_options.pool_maxsize, 32)
+        self.assertEqual(service.pool_options.idle_timeout, 60)
+        adapter = service.host.session.get_adapter(service.url)
+        self.assertEqual(adapter._pool_maxsize, 32)
+
+    @mock.patch("requests.Session.request", autospec=True)
+    def test_custom_host(self, mocked_request):
+        mocked_request.return_value = mock.Mock(status_code=200)
+        SignedService("/api/v1/users/").request_to_service("get")
+        PooledService("/api/v1/users/").request_to_service("get")
+        signed, plain = [call.args[0] for call in mocked_request.call_args_list]
+        self.assertEqual(signed.headers["X-Signed"], "1")
+        self.assertNotIn("X-Signed", plain.headers)
@@ -0,0 +1,111 @@
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+from requests import Session
+from requests.exceptions import ConnectionError
+from rest_framework import status
+
+from microservice_request.cache import LRUCacheBackend, ResponseCache
+from microservice_request.prefetch import PrefetchedResource, Prefetcher, prefetcher
+from microservice_request.services import ConnectionService
+from microservice_request.test import RequestTestCaseMixin
+
+
+class SettingsService(ConnectionService):
+    service = "http://settings:8000"
+    features = PrefetchedResource("/api/v1/features/", interval=60, params={"scope": "public"})
+    limits = PrefetchedResource("/api/v1/limits/", interval=0.05, retry_interval=0.01)
+
+
+@mock.patch.object(Session, "request")
+class PrefetchedResourceTestCase(RequestTestCaseMixin, SimpleTestCase):
+    def setUp(self):
+        for resource in (SettingsService.features, SettingsService.limits):
+            resource._value = PrefetchedResource()._value
+            resource.updated_at, resource.next_refresh, resource.last_error = None, 0.0, None
+        self.addCleanup(prefetcher.stop)
+
+    def test_name(self, mocked_request):
+        self.assertEqual(SettingsService.features.name, "SettingsService.features")
+
+    def test_first_read_fetches(self, mocked_request):
+        mocked_request.return_value = self._mock_response(json={"beta": True}, status_code=status.HTTP_200_OK)
+        self.assertFalse(SettingsService.features.is_ready)
+        for _ in range(3):
+            self.assertEqual(SettingsService.features.get(), {"beta": True})
+        mocked_request.assert_called_once()
+        self.assertEqual(mocked_request.call_args.kwargs["params"], {"scope": "public"})
+        self.assertIn(SettingsService.features, prefetcher.resources)
+
+    def test_failed_refresh_keeps_last_known_good(self, mocked_request):
+        mocked_request.return_value = self._mock_response(json={"beta": True}, status_code=status.HTTP_200_OK)
+        self.assertTrue(SettingsService.features.refresh())
+        for side_effect in (
+            [self._mock_response(json={}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)],
+            ConnectionError("connection refused"),
+        ):
+            with self.subTest(side_effect=side_effect):
+                mocked_request.side_effect = side_effect
+                with self.assertLogs("microservice_request.prefetch", "WARNING"):
+                    self.assertFalse(SettingsService.features.refresh())
+                self.assertEqual(SettingsService.features.get(), {"beta": True})
+                self.assertIsNotNone(SettingsService.features.last_error)
+                self.assertLessEqual(SettingsService.features.next_refresh - time.monotonic(), 5)
+
+    async def test_aget(self, mocked_request):
+        mocked_request.return_value = self._mock_response(json={"beta": True}, status_code=status.HTTP_200_OK)
+        self.assertEqual(await SettingsService.features.aget(), {"beta": True})
+        self.assertEqual(await SettingsService.features.aget(), {"beta": True})
+        mocked_request.assert_called_once()
+
+    def test_default_when_never_fetched(self, mocked_request):
+        mocked_request.side_effect = ConnectionError("connection refused")
+        with self.assertLogs("microservice_request.prefetch", "WARNING"):
+            self.assertEqual(SettingsService.features.get(default={}), {})
+
+    def test_cold_read_backs_off(self, mocked_request):
+        mocked_request.side_effect = ConnectionError("connection refused")
+        with self.assertLogs("microservice_request.prefetch", "WARNING"):
+            for _ in range(5):
+                self.assertIsNone(SettingsService.features.get())
+        mocked_request.assert_called_once()
+        SettingsService.features.next_refresh = time.monotonic()
+        mocked_request.side_effect = None
+        mocked_request.return_value = self._mock_response(json={"beta": True}, status_code=status.HTTP_200_OK)
+        self.assertEqual(SettingsService.features.get(), {"beta": True})
+
+    def test_bypass_response_cache(self, mocked_request):
+        class CachedSettingsService(SettingsService):
+            response_cache = ResponseCache(LRUCacheBackend(), timeout=60)
+            features = PrefetchedResource("/api/v1/features/")
+
+        for value in (1, 2):
+            mocked_request.return_value = self._mock_response(
+                json={"version": value}, status_code=status.HTTP_200_OK
+            )
+            CachedSettingsService.features.refresh()
+            self.assertEqual(CachedSettingsService.features.get(), {"version": value})
+
+    def test_refresh_due(self, mocked_request):
+        mocked_request.return_value = self._mock_response(json={"beta": True}, status_code=status.HTTP_200_OK)
+        scheduler = Prefetcher()
+        scheduler._resources = {id(SettingsService.features): SettingsService.features}
+        self.assertAlmostEqual(scheduler.refresh_due(), 60, delta=1)
+        self.assertAlmostEqual(scheduler.refresh_due(), 60, delta=1)
+        mocked_request.assert_called_once()
+
+    def test_background_refresh(self, mocked_request):
+        mocked_request.side_effect = [
+            self._mock_response(json={"rps": value}, status_code=status.HTTP_200_OK)
+            for value in range(1, 100)
+        ]
+        prefetcher.start(SettingsService.limits)
+        self.assertEqual(SettingsService.limits.get(), {"rps": 1})
+        deadline = time.monotonic() + 2
+        while SettingsService.limits.get() == {"rps": 1} and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertGreater(SettingsService.limits.get()["rps"], 1)
+        prefetcher.stop()
+        self.assertIsNone(prefetcher._thread)
+        self.assertEqual(prefetcher.resources, [])
@@ -0,0 +1,154 @@
+import threading
+import time
+from unittest import mock
+
+import httpx
+from django.test import SimpleTestCase, override_settings
+from requests import Session
+from rest_framework import status
+
+from microservice_request.exceptions import RateLimitExceeded
+from microservice_request.ratelimit import DjangoCacheRateLimitBackend, LocalRateLimitBackend, RateLimiter
+from microservice_request.services import ConnectionService
+from microservice_request.test import RequestTestCaseMixin
+
+from .test_async_services import mock_transport
+
+
+class ReportService(ConnectionService):
+    service = "http://reports:8000"
+    rate_limiter = RateLimiter(rate=1, burst=2, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+class ExportService(ReportService):
+    pass
+
+
+class RateLimiterTestCase(SimpleTestCase):
+    def test_name_from_service(self):
+        self.assertIsNone(ReportService.rate_limiter.name)
+        self.assertEqual(ReportService("/").limiter.name, "ReportService")
+        self.assertEqual(ExportService("/").limiter.name, "ExportService")
+        with mock.patch.object(ReportService.rate_limiter, "name", "reports"):
+            self.assertEqual(ExportService("/").limiter.name, "reports")
+
+    def test_token_bucket(self):
+        backend = LocalRateLimitBackend()
+        self.assertEqual(backend.take_token("key", rate=10, burst=2), 0)
+        self.assertEqual(backend.take_token("key", rate=10, burst=2), 0)
+        self.assertAlmostEqual(backend.take_token("key", rate=10, burst=2), 0.1, places=2)
+
+    def test_fail_fast(self):
+        limiter = RateLimiter(name="test", rate=1, burst=1)
+        limiter.acquire()
+        with self.assertRaises(RateLimitExceeded) as context:
+            limiter.acquire()
+        self.assertEqual(context.exception.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_queue_with_timeout(self):
+        limiter = RateLimiter(name="test", rate=50, burst=1, timeout=1)
+        started = time.monotonic()
+        for _ in range(3):
+            limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.03)
+
+    def test_max_in_flight(self):
+        limiter = RateLimiter(name="test", max_in_flight=2, timeout=0.05)
+        release, in_flight, peak = threading.Event(), [0], [0]
+        lock = threading.Lock()
+
+        def call():
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            release.wait(1)
+            with lock:
+                in_flight[0] -= 1
+
+        threads = [threading.Thread(target=limiter.call, args=(call,)) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        with self.assertRaises(RateLimitExceeded):
+            limiter.call(call)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(peak[0], 2)
+        limiter.call(lambda: None)
+
+    @override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    @mock.patch("microservice_request.ratelimit.time.time", return_value=1000.0)
+    def test_shared_backend(self, mocked_time):
+        first = RateLimiter(
+            name="shared", rate=1, burst=3, max_in_flight=1, backend=DjangoCacheRateLimitBackend()
+        )
+        second = RateLimiter(
+            name="shared", rate=1, burst=3, max_in_flight=1, backend=DjangoCacheRateLimitBackend()
+        )
+        first.acquire()
+        with self.assertRaises(RateLimitExceeded):
+            second.acquire()
+        first.release()
+        second.acquire()
+        second.release()
+        with self.assertRaisesMessage(RateLimitExceeded, "requests per second"):
+            first.acquire()
+
+    @override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    def test_shared_slots_ttl(self):
+        backend = DjangoCacheRateLimitBackend(slot_timeout=60)
+        with mock.patch.object(backend.cache, "touch", wraps=backend.cache.touch) as touch:
+            self.assertTrue(backend.acquire_slot("slots", 2))
+        touch.assert_called_once_with("slots", 60)
+        backend.cache.delete("slots")
+        backend.release_slot("slots")
+        backend.cache.set("slots", 0)
+        backend.release_slot("slots")
+        self.assertEqual(backend.cache.get("slots"), 0)
+        self.assertTrue(backend.acquire_slot("slots", 1))
+        self.assertFalse(backend.acquire_slot("slots", 1))
+
+    async def test_aacquire(self):
+        limiter = RateLimiter(name="test", rate=50, burst=1, max_in_flight=1, timeout=1)
+        await limiter.acall(mock.AsyncMock())
+        await limiter.acall(mock.AsyncMock())
+        with self.assertRaises(RateLimitExceeded):
+            await RateLimiter(name="test", max_in_flight=0).acall(mock.AsyncMock())
+
+
+@mock.patch.object(Session, "request")
+class ServiceRateLimitTestCase(RequestTestCaseMixin, SimpleTestCase):
+    def setUp(self):
+        ReportService.rate_limiter.backend = LocalRateLimitBackend()
+
+    def test_over_limit(self, mocked_request):
+        mocked_request.return_value = self._mock_response(json={}, status_code=status.HTTP_200_OK)
+        service = ReportService("/api/v1/reports/")
+        for _ in range(2):
+            self.assertEqual(service.service_response("get").status_code, status.HTTP_200_OK)
+        response = service.service_response("get")
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertIn("1 requests per second", response.data["detail"])
+        self.assertEqual(mocked_request.call_count, 2)
+
+    def test_subclass_limit(self, mocked_request):
+        mocked_request.return_value = self._mock_response(json={}, status_code=status.HTTP_200_OK)
+        for _ in range(2):
+            ReportService("/api/v1/reports/").service_response("get")
+        self.assertEqual(
+            ReportService("/api/v1/reports/").service_response("get").status_code,
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+        response = ExportService("/api/v1/exports/").service_response("get")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(mocked_request.call_count, 3)
+
+    async def test_async_over_limit(self, mocked_request):
+        with mock_transport(lambda request: httpx.Response(status.HTTP_200_OK, json={})):
+            statuses = [
+                (await ReportService("/api/v1/reports/").aservice_response("get")).status_code
+                for _ in range(3)
+            ]
+        self.assertEqual(
+            statuses, [status.HTTP_200_OK, status.HTTP_200_OK, status.HTTP_503_SERVICE_UNAVAILABLE]
+        )
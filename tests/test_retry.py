@@ -0,0 +1,129 @@
+from unittest import mock
+
+import httpx
+from django.test import SimpleTestCase
+from requests import Session
+from requests.exceptions import ConnectionError, ReadTimeout
+from rest_framework import status
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+from microservice_request.retry import RetryBudget, RetryPolicy, parse_retry_after
+from microservice_request.services import ConnectionService
+from microservice_request.signals import service_request_retried
+from microservice_request.test import RequestTestCaseMixin
+
+from .test_async_services import mock_transport
+
+
+class ShippingService(ConnectionService):
+    service = "http://shipping:8000"
+    retry_policy = RetryPolicy(max_attempts=3, budget_min_per_second=0)
+
+
+class RetryBudgetTestCase(SimpleTestCase):
+    def test_budget(self):
+        budget = RetryBudget(ratio=0.5, min_per_second=0, max_tokens=1)
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+        budget.deposit()
+        self.assertFalse(budget.withdraw())
+        budget.deposit()
+        self.assertTrue(budget.withdraw())
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after("2"), 2)
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0)
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertIsNone(parse_retry_after(None))
+
+    def test_backoff(self):
+        policy = RetryPolicy(base_delay=0.1, max_delay=1)
+        for previous in (0, 0.1, 0.5, 10):
+            self.assertTrue(0.1 <= policy.backoff(previous) <= 1)
+
+
+@mock.patch("microservice_request.retry.time.sleep")
+@mock.patch.object(Session, "request")
+class ServiceRetryTestCase(RequestTestCaseMixin, SimpleTestCase):
+    def setUp(self):
+        budget = ShippingService.retry_policy.get_budget(ShippingService.service)
+        budget._tokens = budget.max_tokens
+
+    def unavailable(self, retry_after: str = "0.5"):
+        return self._mock_response(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, headers={"Retry-After": retry_after}
+        )
+
+    def test_retry_status(self, mocked_request, mocked_sleep):
+        mocked_request.side_effect = [self.unavailable(), self._mock_response(json={}, status_code=200)]
+        retried = mock.Mock()
+        service_request_retried.connect(retried, sender=ShippingService)
+        try:
+            response = ShippingService("/api/v1/rates/").service_response("get")
+        finally:
+            service_request_retried.disconnect(retried, sender=ShippingService)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mocked_sleep.assert_called_once_with(0.5)
+        self.assertEqual(retried.call_args.kwargs["attempt"], 1)
+
+    def test_long_retry_after(self, mocked_request, mocked_sleep):
+        mocked_request.return_value = self.unavailable(retry_after="120")
+        response = ShippingService("/api/v1/rates/").service_response("get")
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(mocked_request.call_count, 1)
+
+    def test_not_idempotent(self, mocked_request, mocked_sleep):
+        mocked_request.return_value = self.unavailable()
+        response = ShippingService("/api/v1/shipments/").service_response("post", json={})
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        mocked_request.side_effect = ReadTimeout("read timeout")
+        ShippingService("/api/v1/shipments/").service_response("post", json={})
+        self.assertEqual(mocked_request.call_count, 2)
+
+    def test_idempotency_key(self, mocked_request, mocked_sleep):
+        mocked_request.side_effect = [self.unavailable(), self._mock_response(json={}, status_code=201)]
+        service = ShippingService("/api/v1/shipments/", special_headers={"Idempotency-Key": "abc"})
+        self.assertEqual(service.service_response("post", json={}).status_code, status.HTTP_201_CREATED)
+
+    def test_connect_error(self, mocked_request, mocked_sleep):
+        refused = ConnectionError(MaxRetryError(None, "/", NewConnectionError(None, "connection refused")))
+        mocked_request.side_effect = [refused, self._mock_response(json={}, status_code=201)]
+        response = ShippingService("/api/v1/shipments/").service_response("post", json={})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_max_attempts(self, mocked_request, mocked_sleep):
+        mocked_request.side_effect = ReadTimeout("read timeout")
+        response = ShippingService("/api/v1/rates/").service_response("get")
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(mocked_request.call_count, 3)
+
+    def test_budget_exhausted(self, mocked_request, mocked_sleep):
+        ShippingService.retry_policy.get_budget(ShippingService.service)._tokens = 0
+        mocked_request.side_effect = ReadTimeout("read timeout")
+        ShippingService("/api/v1/rates/").service_response("get")
+        self.assertEqual(mocked_request.call_count, 1)
+
+    def test_transport_retries_disabled(self, mocked_request, mocked_sleep):
+        adapter = ShippingService().host.session.get_adapter(ShippingService.service)
+        self.assertEqual(adapter.max_retries.total, 0)
+
+
+class AsyncServiceRetryTestCase(SimpleTestCase):
+    def setUp(self):
+        budget = ShippingService.retry_policy.get_budget(ShippingService.service)
+        budget._tokens = budget.max_tokens
+
+    @mock.patch("microservice_request.retry.asyncio.sleep")
+    async def test_retry(self, mocked_sleep):
+        responses = [httpx.ConnectError("connection refused"), httpx.Response(200, json={"id": 1})]
+
+        def handler(request):
+            if isinstance(response := responses.pop(0), Exception):
+                raise response
+            return response
+
+        with mock_transport(handler):
+            response = await ShippingService("/api/v1/shipments/").aservice_response("post", json={})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"id": 1})
+        mocked_sleep.assert_awaited_once()
@@ -1,7 +1,10 @@
+import gzip
+import io
 from unittest import mock
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
+from django.http import StreamingHttpResponse
 from django.test import override_settings
 from django.test.client import RequestFactory
 from django.urls import path
@@ -9,6 +12,7 @@ from django.views.generic import TemplateView
 from requests import Response
 from rest_framework import status
 from rest_framework.exceptions import MethodNotAllowed
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response as DRFResponse
 from rest_framework.reverse import reverse, reverse_lazy
 from rest_framework.test import APITestCase
@@ -16,6 +20,8 @@ from rest_framework.views import APIView
 
 from microservice_request.decorators import request_shell
 from microservice_request.exceptions import MicroserviceException
+from microservice_request.headers import HeaderPolicy
+from microservice_request.responses import RawResponse
 from microservice_request.services import ConnectionService, MicroServiceConnect
 from microservice_request.test import RequestTestCaseMixin
 
@@ -37,6 +43,32 @@ class TestConnectionService(ConnectionService):
         return self._method("post", data=kwargs.get("data"))
 
 
+class StreamingService(ConnectionService):
+    service = "http://storage:8000"
+    stream_response = True
+    stream_chunk_size = 4
+    custom_methods = ["send_report"]
+
+    @request_shell
+    def send_report(self, **kwargs):
+        return self._method("post", json={"report": 1})
+
+
+class RawService(ConnectionService):
+    service = "http://catalog:8000"
+    raw_response = True
+
+
+class LazyService(ConnectionService):
+    service = "http://catalog:8000"
+    lazy_decode = True
+
+
+class FilteredService(ConnectionService):
+    service = "http://catalog:8000"
+    header_policy = HeaderPolicy(allow=("Cache-Control", "ETag", "X-Internal"), deny=("X-Internal",))
+
+
 class GatewayProxyService(MicroServiceConnect):
     service = "http://container:8000"
     api_key = "sadwqe.qweoj23aQ"
@@ -49,9 +81,37 @@ class ProductProxyView(APIView):
         return GatewayProxyService(request, url).service_response(data=request.data)
 
 
+class CatalogView(APIView):
+    def get(self, request):
+        response = LazyService("/api/v1/items/").service_response("get")
+        if "count" in request.query_params:
+            response.data["count"] = len(response.data["results"])
+        return response
+
+
+class EnvelopeRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render({"data": data}, accepted_media_type, renderer_context)
+
+
+class PassthroughRenderer(JSONRenderer):
+    upstream_passthrough = True
+
+
+class EnvelopeCatalogView(CatalogView):
+    renderer_classes = [EnvelopeRenderer]
+
+
+class PassthroughCatalogView(CatalogView):
+    renderer_classes = [PassthroughRenderer]
+
+
 urlpatterns = [
     path("api/v1/test/", TemplateView.as_view(), name="test_external_url"),
     path("api/v2/products/", ProductProxyView.as_view(), name="test_proxy"),
+    path("api/v2/catalog/", CatalogView.as_view(), name="test_catalog"),
+    path("api/v2/catalog/envelope/", EnvelopeCatalogView.as_view(), name="test_envelope_catalog"),
+    path("api/v2/catalog/passthrough/", PassthroughCatalogView.as_view(), name="test_passthrough_catalog"),
 ]
 
 
@@ -135,6 +195,50 @@ class ChildServiceTestCase(RequestTestCaseMixin, APITestCase):
             self.service.authorization_header, {"Authorization": "ACCESS-KEY 12345-qwerty-98765"}
         )
 
+    def test_static_headers(self):
+        class StaticHeadersService(TestConnectionService):
+            static_headers = {"X-Client": "gateway"}
+
+        static_headers = StaticHeadersService.get_static_headers()
+        self.assertIs(static_headers, StaticHeadersService.get_static_headers())
+        self.assertEqual(
+            static_headers, {"Authorization": "ACCESS-KEY 12345-qwerty-98765", "X-Client": "gateway"}
+        )
+        with self.assertRaises(TypeError):
+            static_headers["X-Client"] = "other"
+        service = StaticHeadersService(special_headers={"X-Client": "special"})
+        self.assertEqual(
+            service.headers,
+            {
+                "Authorization": "ACCESS-KEY 12345-qwerty-98765",
+                "X-Client": "special",
+                "X-Custom-Field": "ABC",
+            },
+        )
+        service.api_key = "instance-key"
+        self.assertEqual(service.headers["Authorization"], "ACCESS-KEY instance-key")
+        StaticHeadersService.api_key = "rotated-key"
+        self.assertEqual(StaticHeadersService.get_static_headers()["Authorization"], "ACCESS-KEY rotated-key")
+
+    def test_dynamic_authorization(self):
+        class BearerService(TestConnectionService):
+            @property
+            def authorization_header(self) -> dict:
+                return {"Authorization": "Bearer token"}
+
+        class PropertyKeyService(TestConnectionService):
+            @property
+            def api_key(self) -> str:
+                return "property-key"
+
+        for service_class, authorization in (
+            (BearerService, "Bearer token"),
+            (PropertyKeyService, "ACCESS-KEY property-key"),
+        ):
+            with self.subTest(service_class=service_class):
+                self.assertIsNone(service_class.get_static_headers())
+                self.assertEqual(service_class().headers["Authorization"], authorization)
+
     def test_request_url(self):
         self.assertEqual(self.service.url, "https://api.external-service.com/api/v1/connect")
         self.service.set_url("without/prefix/slash/")
@@ -179,6 +283,204 @@ class ChildServiceTestCase(RequestTestCaseMixin, APITestCase):
         self.assertEqual(service.url, "https://google.com/recaptcha/api/siteverify")
 
 
+class StreamingServiceTestCase(RequestTestCaseMixin, APITestCase):
+    @mock.patch("microservice_request.services.ConnectionService._method")
+    def test_stream_response(self, mocked_request):
+        body = b'[{"id": 1}, {"id": 2}]'
+        headers = {
+            "Content-Type": "application/json",
+            "Content-Length": str(len(body)),
+            "Connection": "keep-alive, X-Internal",
+            "Keep-Alive": "timeout=5",
+            "X-Internal": "1",
+            "Transfer-Encoding": "chunked",
+            "X-Request-Id": "abc",
+        }
+        mocked_request.return_value = self._mock_stream_response(body, status.HTTP_200_OK, headers)
+        response = StreamingService("/api/v1/files/").service_response("get")
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(mocked_request.call_args.kwargs["stream"], True)
+        chunks = list(response.streaming_content)
+        self.assertEqual(b"".join(chunks), body)
+        self.assertEqual(len(chunks[0]), StreamingService.stream_chunk_size)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(response["X-Request-Id"], "abc")
+        for header in ("Connection", "Keep-Alive", "X-Internal", "Transfer-Encoding"):
+            self.assertFalse(response.has_header(header))
+
+    @mock.patch("requests.Session.request")
+    def test_stream_send_file(self, mocked_request):
+        body = b'{"id": 1}'
+        headers = {"Content-Type": "application/json", "Content-Length": str(len(body))}
+        mocked_request.return_value = self._mock_stream_response(body, status.HTTP_201_CREATED, headers)
+        response = StreamingService("/api/v1/files/").service_response(
+            "send_file", files={"file": io.BytesIO(b"data")}
+        )
+        self.assertTrue(mocked_request.call_args.kwargs["stream"])
+        self.assertEqual(b"".join(response.streaming_content), body)
+        self.assertEqual(response["Content-Length"], str(len(body)))
+
+    @mock.patch("microservice_request.services.ConnectionService._method")
+    def test_stream_consumed_response(self, mocked_request):
+        body = b'{"id": 1}'
+        compressed = gzip.compress(body)
+        headers = {
+            "Content-Type": "application/json",
+            "Content-Length": str(len(compressed)),
+            "Content-Encoding": "gzip",
+        }
+        mocked_request.return_value = upstream = self._mock_stream_response(
+            compressed, status.HTTP_201_CREATED, headers
+        )
+        upstream.content
+        response = StreamingService("/api/v1/reports/").service_response("send_report")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(b"".join(response.streaming_content), body)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertFalse(response.has_header("Content-Length"))
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    @mock.patch("microservice_request.services.ConnectionService._method")
+    def test_stream_connection_error(self, mocked_request):
+        mocked_request.return_value = None
+        response = StreamingService().service_response("get")
+        self.assertIsInstance(response, DRFResponse)
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class RawResponseTestCase(RequestTestCaseMixin, APITestCase):
+    @mock.patch("microservice_request.services.ConnectionService._method")
+    def test_raw_response(self, mocked_request):
+        body = b'{"results": [1, 2, 3]}'
+        compressed = gzip.compress(body)
+        headers = {
+            "Content-Type": "application/json",
+            "Content-Length": str(len(compressed)),
+            "Content-Encoding": "gzip",
+        }
+        upstream = self._mock_stream_response(compressed, status.HTTP_201_CREATED, headers)
+        upstream.json = mock.Mock(wraps=upstream.json)
+        mocked_request.return_value = upstream
+        response = RawService("/api/v1/items/").service_response("post", json={"id": 1})
+        self.assertIsInstance(response, RawResponse)
+        self.assertEqual(response.content, body)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertFalse(response.has_header("Content-Length"))
+        self.assertFalse(response.has_header("Content-Encoding"))
+        upstream.json.assert_not_called()
+        self.assertEqual(response.data, {"results": [1, 2, 3]})
+
+    @mock.patch("microservice_request.services.ConnectionService._method")
+    def test_raw_response_decode_error(self, mocked_request):
+        body = b"<html><head><title>502 Bad Gateway</title></head></html>"
+        mocked_request.return_value = self._mock_stream_response(body, status.HTTP_502_BAD_GATEWAY)
+        response = RawService().service_response("get")
+        self.assertEqual(response.content, body)
+        with self.assertRaises(MicroserviceException):
+            response.data
+
+
+@mock.patch("microservice_request.services.ConnectionService._method")
+class HeaderPolicyTestCase(RequestTestCaseMixin, APITestCase):
+    body = b'{"results": [1, 2, 3]}'
+    headers = {
+        "Content-Type": "application/json; charset=utf-8",
+        "Content-Length": "1000",
+        "Content-Encoding": "gzip",
+        "Transfer-Encoding": "chunked",
+        "Connection": "keep-alive, X-Trace",
+        "Keep-Alive": "timeout=5",
+        "X-Trace": "1",
+        "X-Internal": "1",
+        "Cache-Control": "max-age=60",
+        "ETag": '"v1"',
+    }
+
+    def test_rendered_response(self, mocked_request):
+        mocked_request.return_value = self._mock_stream_response(
+            gzip.compress(self.body), status.HTTP_200_OK, self.headers
+        )
+        response = ConnectionService("http://catalog:8000/api/v1/items/").service_response("get")
+        response.accepted_renderer = JSONRenderer()
+        response.accepted_media_type = "application/json"
+        response.renderer_context = {}
+        response.render()
+        self.assertEqual(response.data, {"results": [1, 2, 3]})
+        self.assertEqual(response["Content-Type"], "application/json; charset=utf-8")
+        self.assertEqual(response["Cache-Control"], "max-age=60")
+        self.assertEqual(response["X-Internal"], "1")
+        for header in (
+            "Content-Length",
+            "Content-Encoding",
+            "Transfer-Encoding",
+            "Connection",
+            "X-Trace",
+            "ETag",
+        ):
+            self.assertFalse(response.has_header(header), header)
+
+    def test_allow_deny(self, mocked_request):
+        mocked_request.return_value = self._mock_stream_response(
+            gzip.compress(self.body), status.HTTP_200_OK, self.headers
+        )
+        response = FilteredService("/api/v1/items/").service_response("get")
+        self.assertEqual(sorted(name for name, _ in response.items()), ["Cache-Control", "Content-Type"])
+
+    def test_policy(self, mocked_request):
+        policy = HeaderPolicy(deny=("Set-Cookie",))
+        self.assertEqual(
+            dict(policy.filter({"Set-Cookie": "a=1", "Upgrade": "h2c", "Connection": "", "Vary": "Accept"})),
+            {"Vary": "Accept"},
+        )
+        self.assertIs(policy.excluded(), policy.excluded())
+
+
+@override_settings(ROOT_URLCONF="tests.test_services")
+@mock.patch("microservice_request.services.ConnectionService._method")
+class LazyResponseTestCase(RequestTestCaseMixin, APITestCase):
+    body = b'{"results": [1, 2, 3]}'
+
+    def upstream(self):
+        upstream = self._mock_stream_response(
+            self.body, status.HTTP_200_OK, {"Content-Type": "application/json", "ETag": '"v1"'}
+        )
+        upstream.json = mock.Mock(wraps=upstream.json)
+        return upstream
+
+    def test_body_passed_as_is(self, mocked_request):
+        mocked_request.return_value = upstream = self.upstream()
+        response = self.client.get(reverse("test_catalog"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, self.body)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(response["ETag"], '"v1"')
+        upstream.json.assert_not_called()
+
+    def test_custom_renderer(self, mocked_request):
+        mocked_request.return_value = self.upstream()
+        response = self.client.get(reverse("test_envelope_catalog"))
+        self.assertEqual(response.json(), {"data": {"results": [1, 2, 3]}})
+        mocked_request.return_value = upstream = self.upstream()
+        response = self.client.get(reverse("test_passthrough_catalog"))
+        self.assertEqual(response.content, self.body)
+        upstream.json.assert_not_called()
+
+    def test_decoded_on_access(self, mocked_request):
+        mocked_request.return_value = self.upstream()
+        response = self.client.get(reverse("test_catalog"), {"count": 1})
+        self.assertEqual(response.json(), {"results": [1, 2, 3], "count": 3})
+        self.assertFalse(response.has_header("ETag"))
+
+    @override_settings(REQUEST_JSON_BACKEND="orjson")
+    def test_json_backend(self, mocked_request):
+        mocked_request.return_value = upstream = self.upstream()
+        response = self.client.get(reverse("test_catalog"), {"count": 1})
+        self.assertEqual(response.json(), {"results": [1, 2, 3], "count": 3})
+        upstream.json.assert_not_called()
+
+
 @override_settings(ROOT_URLCONF="tests.test_services")
 class ProxyTestCase(RequestTestCaseMixin, APITestCase):
     def setUp(self):
@@ -218,6 +520,14 @@ class ProxyTestCase(RequestTestCaseMixin, APITestCase):
         }
         self.assertEqual(service.headers, expected_headers)
 
+    def test_request_host_cached(self):
+        request = self.factory.get("/ping")
+        request.user = AnonymousUser()
+        with mock.patch.object(request, "get_host", return_value="testserver") as get_host:
+            GatewayProxyService(request, url="/ping/").headers
+            GatewayProxyService(request, url="/pong/").headers
+        get_host.assert_called_once()
+
     def test_headers_with_remote_user(self):
         user = User.objects.create_user(
             username="test_admin",
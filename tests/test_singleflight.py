@@ -0,0 +1,108 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.test import SimpleTestCase
+from requests import Session
+from requests.exceptions import ConnectionError
+from rest_framework import status
+
+from microservice_request.deadline import request_deadline
+from microservice_request.exceptions import CoalescedRequestTimeout
+from microservice_request.services import ConnectionService
+from microservice_request.singleflight import SingleFlight
+from microservice_request.test import RequestTestCaseMixin
+
+
+class FeatureService(ConnectionService):
+    service = "http://features:8000"
+    coalesce_requests = True
+
+
+class SingleFlightTestCase(SimpleTestCase):
+    def setUp(self):
+        self.group = SingleFlight()
+        self.calls = 0
+        self.started = threading.Event()
+
+    def slow_call(self, result="value", delay=0.2):
+        def func():
+            self.calls += 1
+            self.started.set()
+            time.sleep(delay)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        return func
+
+    def test_shared_result(self):
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            leader = executor.submit(self.group.do, "key", self.slow_call())
+            self.started.wait()
+            followers = [executor.submit(self.group.do, "key", self.slow_call()) for _ in range(4)]
+            results = [leader.result()] + [future.result() for future in followers]
+        self.assertEqual(results, ["value"] * 5)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(len(self.group), 0)
+
+    def test_shared_error(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            leader = executor.submit(self.group.do, "key", self.slow_call(ConnectionError("refused")))
+            self.started.wait()
+            follower = executor.submit(self.group.do, "key", self.slow_call())
+            self.assertRaises(ConnectionError, leader.result)
+            self.assertRaises(ConnectionError, follower.result)
+        self.assertEqual(self.calls, 1)
+
+    def test_waiter_timeout(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            executor.submit(self.group.do, "key", self.slow_call(delay=0.5))
+            self.started.wait()
+            follower = executor.submit(self.group.do, "key", self.slow_call(), 0.05)
+            self.assertRaises(CoalescedRequestTimeout, follower.result)
+
+
+class CoalescedServiceTestCase(RequestTestCaseMixin, SimpleTestCase):
+    @mock.patch.object(Session, "request")
+    def test_identical_requests_coalesced(self, mocked_request):
+        def request(**kwargs):
+            time.sleep(0.2)
+            return self._mock_response(json={"enabled": True}, status_code=status.HTTP_200_OK)
+
+        mocked_request.side_effect = request
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            futures = [
+                executor.submit(FeatureService("/api/v1/features/").service_response, "get") for _ in range(5)
+            ]
+            other = executor.submit(
+                FeatureService("/api/v1/features/").service_response, "get", params={"a": 1}
+            )
+            responses = [future.result() for future in futures]
+            other.result()
+        self.assertEqual([response.data for response in responses], [{"enabled": True}] * 5)
+        self.assertEqual(mocked_request.call_count, 2)
+
+    @mock.patch.object(Session, "request")
+    def test_not_coalesced_methods(self, mocked_request):
+        mocked_request.return_value = self._mock_response(json={}, status_code=status.HTTP_201_CREATED)
+        FeatureService("/api/v1/features/").service_response("post", json={})
+        FeatureService("/api/v1/features/").service_response("post", json={})
+        self.assertEqual(mocked_request.call_count, 2)
+
+    @mock.patch.object(Session, "request")
+    def test_coalescing_key(self, mocked_request):
+        service = FeatureService("/api/v1/features/")
+        with mock.patch("microservice_request.services.single_flight.do") as do:
+            for deadline in (time.time() + 10, time.time() + 5):
+                token = request_deadline.set(deadline)
+                service.request_to_service("get")
+                request_deadline.reset(token)
+            service.request_to_service("get", headers={"Accept-Language": "de"})
+            service.request_to_service("get", data={"q": "body"})
+        keys = [call.args[0] for call in do.call_args_list]
+        self.assertEqual(len(keys), 3)
+        self.assertEqual(keys[0], keys[1])
+        self.assertNotEqual(keys[0], keys[2])
+        mocked_request.assert_called_once()
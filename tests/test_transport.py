@@ -0,0 +1,108 @@
+import json
+import ssl
+from unittest import mock
+
+import httpx
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+from requests import Request
+from rest_framework import status
+
+from microservice_request.pool import PoolOptions, session_registry
+from microservice_request.services import ConnectionService
+from microservice_request.transport import HTTP2Adapter
+
+
+class MultiplexedService(ConnectionService):
+    service = "https://search:8443"
+    http2 = True
+
+
+class StreamingMultiplexedService(MultiplexedService):
+    stream_response = True
+
+
+class HTTP2AdapterTestCase(SimpleTestCase):
+    def setUp(self):
+        session_registry.clear()
+        self.requests = []
+        self.response = httpx.Response(status.HTTP_200_OK, json={"results": [1, 2]})
+        patcher = mock.patch.object(
+            HTTP2Adapter, "create_transport", return_value=httpx.MockTransport(self.handler)
+        )
+        self.create_transport = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(session_registry.clear)
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if isinstance(self.response, Exception):
+            raise self.response
+        return self.response
+
+    def test_adapter_mounted(self):
+        self.assertTrue(MultiplexedService().pool_options.http2)
+        adapter = MultiplexedService().host.session.get_adapter("https://search:8443/")
+        self.assertIsInstance(adapter, HTTP2Adapter)
+        self.assertEqual(list(session_registry.pool_stats()), [])
+
+    def test_service_response(self):
+        response = MultiplexedService("/api/v1/search/").service_response(
+            "post", json={"q": "phone"}, params={"page": 2}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"results": [1, 2]})
+        request = self.requests[0]
+        self.assertEqual(str(request.url), "https://search:8443/api/v1/search/?page=2")
+        self.assertEqual(json.loads(request.content), {"q": "phone"})
+        self.assertNotIn("Connection", request.headers)
+        self.assertIn("Authorization", request.headers)
+
+    def test_stream_response(self):
+        self.response = httpx.Response(status.HTTP_200_OK, stream=httpx.ByteStream(b"0123456789"))
+        response = StreamingMultiplexedService("/api/v1/export/").service_response("get")
+        self.assertEqual(b"".join(response.streaming_content), b"0123456789")
+
+    def test_errors(self):
+        for error in (httpx.ConnectError("connection refused"), httpx.ReadTimeout("read timeout")):
+            with self.subTest(error=error):
+                self.response = error
+                response = MultiplexedService("/api/v1/search/").service_response("get")
+                self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def send(self, adapter: HTTP2Adapter, **kwargs) -> None:
+        adapter.send(Request("GET", "https://search:8443/api/v1/search/").prepare(), **kwargs)
+
+    def test_tls_and_proxy(self):
+        adapter = HTTP2Adapter(PoolOptions(http2=True))
+        self.addCleanup(adapter.close)
+        self.send(adapter)
+        self.assertIs(self.create_transport.call_args.kwargs["verify"], True)
+        self.assertIsNone(self.create_transport.call_args.kwargs["proxy"])
+        self.send(adapter, verify=False, proxies={"https": "http://proxy:3128"})
+        context = self.create_transport.call_args.kwargs["verify"]
+        self.assertEqual(context.verify_mode, ssl.CERT_NONE)
+        self.assertEqual(str(self.create_transport.call_args.kwargs["proxy"].url), "http://proxy:3128")
+        self.send(adapter, verify=False, proxies={"https": "http://proxy:3128"})
+        self.assertEqual(self.create_transport.call_count, 2)
+        with mock.patch.object(ssl.SSLContext, "load_cert_chain") as load_cert_chain:
+            self.send(adapter, cert=("client.crt", "client.key"))
+        load_cert_chain.assert_called_once_with("client.crt", "client.key")
+        self.assertEqual(len(self.requests), 4)
+
+    def test_unsupported_tls_and_proxy(self):
+        adapter = HTTP2Adapter(PoolOptions(http2=True))
+        self.addCleanup(adapter.close)
+        for kwargs in ({"verify": "/missing/ca.pem"}, {"proxies": {"https": "ftp://proxy:21"}}):
+            with self.subTest(kwargs=kwargs), self.assertRaises(ImproperlyConfigured):
+                self.send(adapter, **kwargs)
+
+    def test_timeout(self):
+        self.assertEqual(HTTP2Adapter._timeout((1, 5)), httpx.Timeout(connect=1, read=5, write=5, pool=1))
+
+
+class HTTP2TransportTestCase(SimpleTestCase):
+    def test_create_transport(self):
+        transport = HTTP2Adapter.create_transport(PoolOptions(pool_maxsize=4, transport_retries=False))
+        self.assertIsInstance(transport, httpx.HTTPTransport)
+        transport.close()